@@ -0,0 +1,722 @@
+"""
+RAMQ Billing Assistant - Moteur IA Hybride
+API LLM compatible OpenAI en priorité, moteur local en repli
+
+- Budget: compteurs en mémoire (aucune E/S par requête), écrits périodiquement
+  et atomiquement dans un fichier par worker (data/usage/usage_{date}_{pid}.json);
+  le total du jour additionne les fichiers de tous les workers. Chaque appel
+  réserve un coût estimé avant de partir (les appels concurrents ne dépassent
+  pas le budget ensemble), soldé avec les tokens facturés dès la réponse reçue,
+  avant toute validation; appel échoué ou illisible: estimation facturée
+- Client async (httpx) avec délai maximal strict
+- Disjoncteur: après quelques échecs ou lenteurs, repli local immédiat
+  pendant un délai, puis un appel d'essai
+
+- Mode spéculatif (RAMQ_SPECULATIVE=1 ou ?speculative=true): réponse locale
+  immédiate, raffinement distant en arrière-plan; le résultat raffiné remplace
+  l'entrée de ai_cache et se récupère par refinement_id (sondage ou SSE)
+
+Activé avec RAMQ_ENGINE=hybrid (OPENAI_API_KEY et/ou OPENAI_BASE_URL)
+"""
+
+import asyncio
+import json
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+from app.core import db
+from app.core.ai_local import LocalAIEngine
+from app.core.instrumentation import instrumentation
+
+if TYPE_CHECKING:
+    # httpx importé à la création du client (premier appel distant)
+    import httpx
+
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1")
+OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
+DAILY_API_BUDGET = float(os.getenv("DAILY_API_BUDGET", "5.0"))
+REMOTE_TIMEOUT_MS = float(os.getenv("REMOTE_TIMEOUT_MS", "3000"))
+BUDGET_FLUSH_INTERVAL = float(os.getenv("BUDGET_FLUSH_INTERVAL", "5"))
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("BREAKER_FAILURE_THRESHOLD", "3"))
+BREAKER_RESET_SECONDS = float(os.getenv("BREAKER_RESET_SECONDS", "30"))
+SPECULATIVE_REFINEMENT = os.getenv("RAMQ_SPECULATIVE", "0").lower() in (
+    "1",
+    "true",
+    "yes",
+)
+
+# Raffinements conservés (par worker) pour le sondage / SSE
+REFINEMENT_MAX_ENTRIES = 1000
+REFINEMENT_TTL_SECONDS = 600.0
+
+# Ids émis gardés dans ai_refinements aussi longtemps que le résultat dans ai_cache
+REFINEMENT_ID_RETENTION = timedelta(days=7)
+# Raffinement d'un autre worker: intervalle de relecture de son statut (s)
+REFINEMENT_POLL_SECONDS = 0.5
+
+# Tokens réservés par appel avant la réponse (prompt ~150 + max_tokens 200)
+ESTIMATED_CALL_TOKENS = int(os.getenv("REMOTE_ESTIMATED_TOKENS", "400"))
+
+# USD par 1K tokens
+PRICING = {
+    "gpt-3.5-turbo": 0.0015,
+    "gpt-4o-mini": 0.00015,
+}
+
+SYSTEM_PROMPT = "Tu es un expert en facturation RAMQ pour urgences au Québec. Réponds en JSON uniquement."
+
+
+class BudgetTracker:
+    """
+    Dépenses du jour: lecture/écriture en mémoire sous verrou,
+    persistance périodique par un thread (un fichier par processus)
+    """
+
+    def __init__(
+        self,
+        directory: str = "data/usage",
+        daily_budget: float = DAILY_API_BUDGET,
+        flush_interval: float = BUDGET_FLUSH_INTERVAL,
+    ):
+        self.directory = Path(directory)
+        self.daily_budget = daily_budget
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._day = None
+        self._cost = 0.0
+        self._calls = 0
+        self._reserved = 0.0
+        self._others_cost = 0.0
+        self._dirty = False
+        self._pid = None
+
+    def _shard_path(self, day: str, pid: int) -> Path:
+        return self.directory / f"usage_{day}_{pid}.json"
+
+    def _roll_day(self):
+        """Nouveau jour: compteurs à zéro (appelé sous verrou)"""
+        today = datetime.now().strftime("%Y-%m-%d")
+        if today == self._day:
+            return
+        self._day = today
+        own = self._read_shard(self._shard_path(today, os.getpid()))
+        self._cost = own.get("total_cost", 0.0)
+        self._calls = own.get("calls", 0)
+        self._others_cost = self._read_others(today)
+
+    @staticmethod
+    def _read_shard(path: Path) -> Dict:
+        try:
+            return json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return {}
+
+    def _read_others(self, day: str) -> float:
+        """Dépenses du jour des autres processus (dernier état écrit)"""
+        own = self._shard_path(day, os.getpid())
+        return sum(
+            self._read_shard(path).get("total_cost", 0.0)
+            for path in self.directory.glob(f"usage_{day}_*.json")
+            if path != own
+        )
+
+    def _ensure_flusher(self):
+        # Thread propre au processus (relancé dans un worker issu d'un fork)
+        if self._pid == os.getpid():
+            return
+        self._pid = os.getpid()
+        self._day = None
+        threading.Thread(
+            target=self._flush_loop, name="ramq-budget-flush", daemon=True
+        ).start()
+
+    def _flush_loop(self):
+        while True:
+            time.sleep(self.flush_interval)
+            self.flush()
+
+    def can_spend(self, estimate: float = 0.0) -> bool:
+        """
+        Réserve estimate si le budget le permet, réservations en cours comprises
+        Toute réservation accordée se termine par settle() ou release()
+        """
+        with self._lock:
+            self._ensure_flusher()
+            self._roll_day()
+            committed = self._cost + self._others_cost + self._reserved
+            if (
+                committed >= self.daily_budget
+                or committed + estimate > self.daily_budget
+            ):
+                return False
+            self._reserved += estimate
+            return True
+
+    def settle(self, reserved: float, cost: float):
+        """Remplace une réservation par le coût réel de l'appel"""
+        with self._lock:
+            self._ensure_flusher()
+            self._roll_day()
+            self._reserved = max(self._reserved - reserved, 0.0)
+            self._cost += cost
+            self._calls += 1
+            self._dirty = True
+
+    def release(self, reserved: float):
+        """Réservation d'un appel qui n'a pas eu lieu"""
+        with self._lock:
+            self._reserved = max(self._reserved - reserved, 0.0)
+
+    def record(self, cost: float):
+        self.settle(0.0, cost)
+
+    def flush(self):
+        """Écriture atomique du fichier de ce processus + relecture des autres"""
+
+        with self._lock:
+            self._roll_day()
+            day, dirty = self._day, self._dirty
+            data = {
+                "date": day,
+                "pid": os.getpid(),
+                "total_cost": round(self._cost, 6),
+                "calls": self._calls,
+            }
+            self._dirty = False
+
+        try:
+            if dirty:
+                self.directory.mkdir(parents=True, exist_ok=True)
+                path = self._shard_path(day, os.getpid())
+                tmp_path = path.with_suffix(".tmp")
+                tmp_path.write_text(json.dumps(data, indent=2), encoding="utf-8")
+                os.replace(tmp_path, path)
+            others = self._read_others(day)
+            with self._lock:
+                if self._day == day:
+                    self._others_cost = others
+        except OSError as e:
+            print(f"⚠️ Erreur écriture budget: {e}")
+            with self._lock:
+                self._dirty = True
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            self._roll_day()
+            total = self._cost + self._others_cost
+            return {
+                "date": self._day,
+                "daily_budget": self.daily_budget,
+                "spent_this_worker": round(self._cost, 6),
+                "spent_total": round(total, 6),
+                "reserved_this_worker": round(self._reserved, 6),
+                "calls_this_worker": self._calls,
+                "remaining": round(max(self.daily_budget - total, 0.0), 6),
+            }
+
+
+class CircuitBreaker:
+    """
+    Fermé: appels permis. Ouvert (après N échecs consécutifs): repli immédiat
+    pendant reset_seconds. Mi-ouvert: un seul appel d'essai décide.
+    """
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(
+        self,
+        failure_threshold: int = BREAKER_FAILURE_THRESHOLD,
+        reset_seconds: float = BREAKER_RESET_SECONDS,
+    ):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = self.CLOSED
+        self.failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if (
+                self.state == self.OPEN
+                and time.monotonic() - self._opened_at >= self.reset_seconds
+            ):
+                self.state = self.HALF_OPEN
+                self._trial_in_flight = False
+            if self.state == self.HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_in_flight = False
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    print(
+                        f"⚡ Disjoncteur ouvert: repli local pendant {self.reset_seconds:.0f}s"
+                    )
+                self.state = self.OPEN
+                self._opened_at = time.monotonic()
+
+
+class RemoteLLMClient:
+    """Client async d'une API chat/completions compatible OpenAI"""
+
+    def __init__(
+        self,
+        base_url: str = OPENAI_BASE_URL,
+        api_key: Optional[str] = None,
+        model: str = OPENAI_MODEL,
+        timeout_ms: float = REMOTE_TIMEOUT_MS,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.api_key = api_key
+        self.model = model
+        self.timeout = timeout_ms / 1000
+        self._client: Optional["httpx.AsyncClient"] = None
+
+    def _http(self) -> "httpx.AsyncClient":
+        # Créé dans la boucle d'événements qui l'utilise (après un fork éventuel)
+        if self._client is None:
+            import httpx
+
+            headers = (
+                {"Authorization": f"Bearer {self.api_key}"} if self.api_key else {}
+            )
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                headers=headers,
+                timeout=httpx.Timeout(self.timeout),
+                limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+            )
+        return self._client
+
+    async def complete(self, prompt: str) -> Tuple[str, int]:
+        """Texte de la réponse du modèle et nombre de tokens facturés (0 si non indiqué)"""
+
+        response = await self._http().post(
+            "/chat/completions",
+            json={
+                "model": self.model,
+                "messages": [
+                    {"role": "system", "content": SYSTEM_PROMPT},
+                    {"role": "user", "content": prompt},
+                ],
+                "temperature": 0,
+                "max_tokens": 200,
+                "response_format": {"type": "json_object"},
+            },
+        )
+        response.raise_for_status()
+        body = response.json()
+        tokens = int(body.get("usage", {}).get("total_tokens", 0))
+        return body["choices"][0]["message"]["content"], tokens
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+def calculate_cost(tokens: int, model: str) -> float:
+    """Coût en USD"""
+    return tokens * PRICING.get(model, 0.002) / 1000
+
+
+def build_prompt(data: Dict) -> str:
+    """Prompt concis (minimum de tokens)"""
+
+    return f"""Cas urgence:
+- Triage: P{data.get('triage_level')}
+- Plainte: {data.get('chief_complaint', '')[:50]}
+- Procédures: {', '.join(data.get('procedures', [])[:3])}
+- Durée: {data.get('duration_minutes')}min
+
+Retourne JSON:
+{{
+  "primary_code": "XX.XXX",
+  "procedure_codes": ["XX.XX"],
+  "reasoning": "justification courte"
+}}"""
+
+
+class RefinementStore:
+    """
+    Raffinements distants lancés par ce worker (boucle d'événements unique:
+    pas de verrou). Un seul raffinement en cours par clé de cache.
+    Entrées: id, cache_key, status (pending | refined | failed), result, error
+
+    Avec db_path, chaque id émis et son statut sont écrits dans ai_refinements:
+    les autres workers les reconnaissent (issued), un id inventé est inconnu.
+    Accès SQLite dans le threadpool: la boucle d'événements n'attend pas le disque
+    """
+
+    def __init__(
+        self,
+        db_path: Optional[str] = None,
+        max_entries: int = REFINEMENT_MAX_ENTRIES,
+        ttl_seconds: float = REFINEMENT_TTL_SECONDS,
+    ):
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Dict]" = OrderedDict()
+        self._pending_by_key: Dict[str, str] = {}
+
+    def _write(self, statements: List[Tuple[str, tuple]]):
+        try:
+            conn = db.connect(self.db_path)
+            for sql, params in statements:
+                conn.execute(sql, params)
+            conn.commit()
+            conn.close()
+        except Exception as e:
+            print(f"⚠️ Erreur sauvegarde raffinement: {e}")
+
+    async def _persist(self, *statements: Tuple[str, tuple]):
+        if self.db_path is None:
+            return
+        await asyncio.get_running_loop().run_in_executor(
+            None, self._write, list(statements)
+        )
+
+    def _read_issued(self, refinement_id: str) -> Optional[Dict]:
+        conn = db.connect(self.db_path)
+        row = conn.execute(
+            "SELECT cache_key, status, error FROM ai_refinements WHERE refinement_id = ?",
+            (refinement_id,),
+        ).fetchone()
+        conn.close()
+        if row is None:
+            return None
+        return {"cache_key": row[0], "status": row[1], "error": row[2]}
+
+    async def issued(self, refinement_id: str) -> Optional[Dict]:
+        """Id émis par un worker (cache_key, status, error), None s'il n'a jamais été émis"""
+
+        if self.db_path is None:
+            return None
+        return await asyncio.get_running_loop().run_in_executor(
+            None, self._read_issued, refinement_id
+        )
+
+    def pending(self, cache_key: str) -> Optional[Dict]:
+        refinement_id = self._pending_by_key.get(cache_key)
+        return self._entries.get(refinement_id) if refinement_id else None
+
+    async def create(self, cache_key: str) -> Dict:
+        """Entrée enregistrée avant toute attente (un seul raffinement par clé), puis écrite"""
+
+        self._purge()
+        entry = {
+            "id": f"{cache_key}-{uuid.uuid4().hex}",
+            "cache_key": cache_key,
+            "status": "pending",
+            "result": None,
+            "error": None,
+            "created": time.monotonic(),
+            "done": asyncio.Event(),
+            "task": None,
+        }
+        self._entries[entry["id"]] = entry
+        self._pending_by_key[cache_key] = entry["id"]
+
+        now = datetime.now()
+        await self._persist(
+            (
+                "DELETE FROM ai_refinements WHERE created_at < ?",
+                (now - REFINEMENT_ID_RETENTION,),
+            ),
+            (
+                "INSERT INTO ai_refinements (refinement_id, cache_key, status, created_at) "
+                "VALUES (?, ?, 'pending', ?)",
+                (entry["id"], cache_key, now),
+            ),
+        )
+        return entry
+
+    async def finish(
+        self, entry: Dict, result: Optional[Dict] = None, error: Optional[str] = None
+    ):
+        entry["status"] = "refined" if error is None else "failed"
+        entry["result"] = result
+        entry["error"] = error
+        entry["task"] = None
+        if self._pending_by_key.get(entry["cache_key"]) == entry["id"]:
+            del self._pending_by_key[entry["cache_key"]]
+        entry["done"].set()
+        await self._persist(
+            (
+                "UPDATE ai_refinements SET status = ?, error = ? WHERE refinement_id = ?",
+                (entry["status"], error, entry["id"]),
+            )
+        )
+
+    def get(self, refinement_id: str) -> Optional[Dict]:
+        self._purge()
+        return self._entries.get(refinement_id)
+
+    def _purge(self):
+        """Retire les entrées terminées expirées, puis les plus anciennes au-delà du maximum"""
+        now = time.monotonic()
+        for refinement_id, entry in list(self._entries.items()):
+            over = len(self._entries) > self.max_entries
+            if not over and now - entry["created"] < self.ttl_seconds:
+                break
+            if entry["status"] == "pending" and not over:
+                continue
+            del self._entries[refinement_id]
+
+    @staticmethod
+    def public(entry: Dict) -> Dict:
+        return {key: entry[key] for key in ("id", "status", "result", "error")}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class HybridAIEngine:
+    """
+    Moteur hybride: LLM distant en priorité, LocalAIEngine en repli
+    Les autres attributs (catalogue, index, cache...) sont ceux du moteur local
+    """
+
+    def __init__(
+        self,
+        db_path: str = "data/ramq.db",
+        client: Optional[RemoteLLMClient] = None,
+        budget: Optional[BudgetTracker] = None,
+        breaker: Optional[CircuitBreaker] = None,
+    ):
+        self.local_engine = LocalAIEngine(db_path)
+        self.client = client or RemoteLLMClient(api_key=os.getenv("OPENAI_API_KEY"))
+        self.budget = budget or BudgetTracker(str(Path(db_path).parent / "usage"))
+        self.breaker = breaker or CircuitBreaker()
+        self.remote_enabled = bool(self.client.api_key or os.getenv("OPENAI_BASE_URL"))
+        self.refinements = RefinementStore(db_path)
+
+        if self.remote_enabled:
+            print(
+                f"✅ Mode hybride activé ({self.client.model} @ {self.client.base_url} + Local)"
+            )
+        else:
+            print("ℹ️ Pas de clé OpenAI ni d'URL, mode local uniquement")
+
+    def __getattr__(self, name):
+        return getattr(self.local_engine, name)
+
+    async def analyze_encounter_async(self, encounter_data: Dict) -> Dict:
+        """Cache, puis LLM distant si permis (budget, disjoncteur), sinon local"""
+
+        cached = self.local_engine.check_cache(encounter_data)
+        if cached:
+            cached["from_cache"] = True
+            return cached
+        self.local_engine.instrumentation.count("cache_misses")
+
+        reserved = self._reserve_remote()
+        if reserved is not None:
+            try:
+                result = await self.analyze_remote(encounter_data, reserved)
+                self.breaker.record_success()
+                self.local_engine.save_to_cache(
+                    encounter_data, result, model_used=self.client.model
+                )
+                result["from_cache"] = False
+                return result
+            except Exception as e:
+                # Délai dépassé, erreur HTTP ou réponse invalide: compte comme échec
+                self.breaker.record_failure()
+                instrumentation.count("remote_failures")
+                print(f"⚠️ Erreur LLM distant, repli local: {type(e).__name__}: {e}")
+
+        instrumentation.count("remote_fallbacks")
+        result = self.local_engine.analyze_encounter(encounter_data)
+        result["model_used"] = "local"
+        return result
+
+    def _reserve_remote(self) -> Optional[float]:
+        """Coût estimé réservé si un appel distant est permis (budget, disjoncteur), sinon None"""
+        if not self.remote_enabled:
+            return None
+        estimate = calculate_cost(ESTIMATED_CALL_TOKENS, self.client.model)
+        if not self.budget.can_spend(estimate):
+            return None
+        if not self.breaker.allow():
+            self.budget.release(estimate)
+            return None
+        return estimate
+
+    async def analyze_speculative(self, encounter_data: Dict) -> Dict:
+        """
+        Réponse locale immédiate; raffinement distant lancé en arrière-plan
+        Le résultat porte `refinement` (id et statut) quand un raffinement est
+        en cours; un cache déjà raffiné est retourné tel quel
+        """
+
+        cache_key = self.local_engine.cache_key(encounter_data)
+        cached = self.local_engine.cached_result(cache_key)
+        if cached and (cached.get("refined") or not self.remote_enabled):
+            cached["from_cache"] = True
+            return cached
+
+        result = cached or self.local_engine.analyze_encounter(encounter_data)
+        if cached:
+            result["from_cache"] = True
+        else:
+            self.local_engine.instrumentation.count("cache_misses")
+        result["model_used"] = "local"
+
+        entry = self.refinements.pending(cache_key)
+        reserved = self._reserve_remote() if entry is None else None
+        if reserved is not None:
+            entry = await self.refinements.create(cache_key)
+            entry["task"] = asyncio.get_running_loop().create_task(
+                self._refine(
+                    entry, dict(encounter_data), result.get("primary_code"), reserved
+                )
+            )
+            instrumentation.count("refinements_started")
+        if entry is not None:
+            result["refinement"] = {"id": entry["id"], "status": entry["status"]}
+        return result
+
+    async def _refine(
+        self,
+        entry: Dict,
+        encounter_data: Dict,
+        local_primary: Optional[str],
+        reserved: float,
+    ):
+        """Appel distant en arrière-plan; le résultat remplace l'entrée locale du cache"""
+
+        try:
+            result = await self.analyze_remote(encounter_data, reserved)
+            self.breaker.record_success()
+            result["refined"] = True
+            result["changed"] = result.get("primary_code") != local_primary
+            self.local_engine.save_to_cache(
+                encounter_data, result, model_used=self.client.model
+            )
+            instrumentation.count("refinements_completed")
+            if result["changed"]:
+                instrumentation.count("refinements_changed")
+            await self.refinements.finish(entry, result=result)
+        except Exception as e:
+            self.breaker.record_failure()
+            instrumentation.count("remote_failures")
+            print(f"⚠️ Raffinement distant échoué: {type(e).__name__}: {e}")
+            await self.refinements.finish(entry, error=f"{type(e).__name__}: {e}")
+
+    async def refinement_status(self, refinement_id: str) -> Optional[Dict]:
+        """
+        État d'un raffinement: entrée de ce worker, sinon id émis par un autre
+        worker (ai_refinements) et son résultat raffiné lu dans ai_cache
+        None: id jamais émis, ou résultat expiré
+        """
+
+        entry = self.refinements.get(refinement_id)
+        if entry is not None:
+            return self.refinements.public(entry)
+
+        issued = await self.refinements.issued(refinement_id)
+        if issued is None:
+            return None
+        status = {
+            "id": refinement_id,
+            "status": issued["status"],
+            "result": None,
+            "error": issued["error"],
+        }
+        if issued["status"] != "refined":
+            return status
+
+        cached = await asyncio.get_running_loop().run_in_executor(
+            None, self.local_engine.cached_result, issued["cache_key"]
+        )
+        if not cached or not cached.get("refined"):
+            return None
+        status["result"] = cached
+        return status
+
+    async def wait_refinement(
+        self, refinement_id: str, timeout: float
+    ) -> Optional[Dict]:
+        """
+        Attend la fin d'un raffinement (au plus timeout secondes): événement pour
+        ceux de ce worker, relecture de ai_refinements pour ceux d'un autre
+        """
+
+        entry = self.refinements.get(refinement_id)
+        if entry is not None and entry["status"] == "pending":
+            try:
+                await asyncio.wait_for(entry["done"].wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        elif entry is None:
+            status = await self.refinement_status(refinement_id)
+            if status is None or status["status"] != "pending":
+                return status
+            await asyncio.sleep(min(timeout, REFINEMENT_POLL_SECONDS))
+        return await self.refinement_status(refinement_id)
+
+    async def analyze_remote(self, data: Dict, reserved: float) -> Dict:
+        """
+        Appel distant (reserved: coût réservé par _reserve_remote, soldé ici)
+        Tokens facturés comptés dès la réponse reçue, avant validation
+        """
+
+        instrumentation.count("remote_calls")
+        try:
+            text, tokens = await self.client.complete(build_prompt(data))
+        except BaseException:
+            # Délai, erreur HTTP, corps illisible ou annulation: tokens inconnus,
+            # l'appel a pu être facturé
+            self.budget.settle(reserved, reserved)
+            raise
+        cost = calculate_cost(tokens, self.client.model) if tokens else reserved
+        self.budget.settle(reserved, cost)
+
+        content = json.loads(text)
+        if not isinstance(content, dict) or not isinstance(
+            content.get("primary_code"), str
+        ):
+            raise ValueError("primary_code manquant dans la réponse")
+
+        result = {
+            "primary_code": content["primary_code"],
+            "procedure_codes": [
+                str(code) for code in content.get("procedure_codes", [])
+            ],
+            "reasoning": content.get("reasoning", ""),
+            "confidence": 0.95,
+        }
+        # Tarifs et modificateurs calculés localement
+        result = self.local_engine.apply_modifiers(result, data)
+        result["model_used"] = self.client.model
+        result["remote_cost"] = round(cost, 6)
+        return result
+
+    async def close(self):
+        for entry in list(self.refinements._entries.values()):
+            if entry["task"] is not None:
+                entry["task"].cancel()
+        await self.client.close()
+        self.budget.flush()
@@ -5,334 +5,886 @@ Utilise règles déterministes + embeddings pour suggestions de codes
 
 import hashlib
 import json
-import sqlite3
+import os
+import re
+import time
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional
 from pathlib import Path
-import numpy as np
+
+from app.core import db
+from app.core.cache import MemoryCache
+from app.core.catalog import CodeCatalog, get_catalog_version
+from app.core.draft import DraftAnalyzer
+from app.core.embeddings import (
+    EMBEDDER_BACKEND,
+    MINILM_MODEL,
+    Embedder,
+    create_embedder,
+)
+from app.core.fuzzy import FuzzyCodeMatcher, FuzzyMatcher
+from app.core.instrumentation import instrumentation
+from app.core.search import LexicalIndex
+from app.core.serialization import dumps_text, loads
+from app.core.singleflight import SingleFlight
+from app.core.typeahead import TypeaheadIndex
+
+if TYPE_CHECKING:
+    # NumPy, l'index vectoriel et l'exécuteur d'inférence ne sont importés
+    # qu'au chargement des embeddings (règles et recherche lexicale sans NumPy)
+    import numpy as np
+
+    from app.core.inference import InferenceExecutor
+    from app.core.vector_index import EmbeddingIndex
+
+# Attente maximale du résultat d'un calcul identique déjà en cours (s)
+SINGLEFLIGHT_TIMEOUT = 60.0
+
+# Intervalle minimal entre deux vérifications de la version du catalogue
+CATALOG_CHECK_INTERVAL = 5.0
+
+# Matrice d'embeddings du catalogue sauvegardée en .npy (ouverte en mmap:
+# les workers d'un même serveur partagent les mêmes pages), quantifiée
+# selon RAMQ_EMBEDDING_PRECISION (voir vector_index)
+EMBEDDING_MODEL = MINILM_MODEL
+
+# Modèle dans un processus d'inférence dédié (micro-lots) plutôt que dans le worker API
+INFERENCE_EXECUTOR = os.getenv("RAMQ_INFERENCE_EXECUTOR", "0").lower() in (
+    "1",
+    "true",
+    "yes",
+)
+
+# Mots-clés reconnus par les règles de procédures (forme canonique)
+# Sert au correcteur orthographique: "sutre" -> suture, "eletrocardiogram" -> ecg
+PROCEDURE_KEYWORDS = {
+    "suture": "suture",
+    "plâtre": "plâtre",
+    "platre": "plâtre",
+    "ecg": "ecg",
+    "electrocardiogramme": "ecg",
+    "electrocardiogram": "ecg",
+    "électrocardiogramme": "ecg",
+}
+
 
 class LocalAIEngine:
     """
     IA locale utilisant règles + embeddings gratuits
     Pas besoin d'API externe - 100% gratuit
     """
-    
+
     def __init__(self, db_path: str = "data/ramq.db"):
         self.db_path = db_path
-        self.encoder = None  # Chargé à la demande
-        self.codes = []
-        self.code_embeddings = None
-        
+        self.embedder: Optional[Embedder] = None  # Chargé à la demande (RAMQ_EMBEDDER)
+        self.inference: Optional[
+            "InferenceExecutor"
+        ] = None  # RAMQ_INFERENCE_EXECUTOR=1
+        self.instrumentation = instrumentation
+        self.catalog = CodeCatalog()
+        self.embedding_index = None
+        self.typeahead = TypeaheadIndex(self.catalog)
+        self.lexical = LexicalIndex(self.catalog)
+        self.fuzzy = FuzzyCodeMatcher(self.catalog)
+        self.keyword_matcher = FuzzyMatcher(PROCEDURE_KEYWORDS)
+        self._catalog_checked_at = 0.0
+        self.memory_cache = MemoryCache()
+        self.inflight = SingleFlight()
+        # Analyse provisoire pendant la saisie (calculs intermédiaires mémorisés)
+        self.drafts = DraftAnalyzer(self)
+
         # Charger codes RAMQ en mémoire
         self.load_ramq_codes()
-        
+
     def load_ramq_codes(self):
         """Charge codes RAMQ depuis la base de données"""
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = db.connect(self.db_path)
             cursor = conn.cursor()
-            
-            cursor.execute("SELECT code, description, base_fee, category FROM ramq_codes")
-            self.codes = cursor.fetchall()
-            
+
+            self.catalog = CodeCatalog.load(cursor)
+
             conn.close()
-            print(f"✅ {len(self.codes)} codes RAMQ chargés")
+            print(f"✅ {len(self.catalog)} codes RAMQ chargés")
         except Exception as e:
             print(f"⚠️ Erreur chargement codes: {e}")
-            self.codes = []
-    
+            self.catalog = CodeCatalog()
+
+        # Index en mémoire dérivés du catalogue
+        self.typeahead = TypeaheadIndex(self.catalog)
+        self.lexical = LexicalIndex(self.catalog)
+        self.fuzzy = FuzzyCodeMatcher(self.catalog, PROCEDURE_KEYWORDS)
+        self._catalog_checked_at = time.monotonic()
+
+    def refresh_catalog_if_changed(self) -> bool:
+        """
+        Recharge le catalogue si sa version a changé en base
+        Vérifie au plus une fois par CATALOG_CHECK_INTERVAL secondes
+        """
+
+        now = time.monotonic()
+        if now - self._catalog_checked_at < CATALOG_CHECK_INTERVAL:
+            return False
+        self._catalog_checked_at = now
+
+        try:
+            conn = db.connect(self.db_path)
+            version = get_catalog_version(conn.cursor())
+            conn.close()
+        except Exception as e:
+            print(f"⚠️ Erreur vérification catalogue: {e}")
+            return False
+
+        if version == self.catalog_version:
+            return False
+
+        print(
+            f"🔄 Catalogue modifié (v{self.catalog_version} → v{version}), rechargement"
+        )
+        self.load_ramq_codes()
+        # Tarifs potentiellement modifiés: le niveau mémoire repart à vide
+        self.memory_cache.clear()
+        if self.semantic_available:
+            self.embedding_index = self.load_code_embeddings()
+        return True
+
+    @property
+    def catalog_version(self) -> int:
+        return self.catalog.version
+
+    @property
+    def semantic_available(self) -> bool:
+        """Modèle chargé (dans ce processus ou le processus d'inférence)"""
+        return (
+            self.embedder is not None or self.inference is not None
+        ) and self.embedding_index is not None
+
+    @property
+    def embedder_name(self) -> str:
+        """Nom de l'embedder actif (modèle du processus d'inférence sinon)"""
+        return self.embedder.name if self.embedder is not None else EMBEDDING_MODEL
+
+    def encode_texts(self, texts: List[str]) -> "np.ndarray":
+        """Embeddings d'une liste de textes (exécuteur d'inférence si actif)"""
+
+        if self.inference is not None:
+            return self.inference.embed_many(texts)
+        return self.embedder.encode(texts)
+
+    def embeddings_path(self) -> Path:
+        """Fichier .npy propre à l'embedder et au contenu du catalogue"""
+
+        descriptions = "\n".join(
+            f"{code} {text}"
+            for code, text in zip(self.catalog.codes, self.catalog.texts())
+        )
+        digest = hashlib.md5(descriptions.encode()).hexdigest()[:12]
+        return (
+            Path(self.db_path).parent
+            / "embeddings"
+            / f"{self.embedder_name}_{digest}.npy"
+        )
+
+    def load_code_embeddings(self) -> "EmbeddingIndex":
+        """
+        Index des embeddings du catalogue, ouvert en lecture seule (mmap)
+        Calculé puis sauvegardé au premier appel pour ce catalogue
+        """
+
+        from app.core.vector_index import EmbeddingIndex, save_npy_atomic
+
+        if self.embedder is not None:
+            # Poids appris sur le catalogue (idf): nécessaires aussi pour les requêtes
+            self.embedder.fit(self.catalog.texts())
+
+        path = self.embeddings_path()
+        if not path.exists():
+            save_npy_atomic(path, self.encode_texts(self.catalog.texts()))
+        return EmbeddingIndex.load(path)
+
     def load_embeddings_model(self):
         """Charge le modèle d'embeddings (une seule fois)"""
-        if self.encoder is None:
+        if self.embedder is not None or self.inference is not None:
+            return
+
+        # Embedder NumPy (ngram): léger, aucun intérêt à le déporter
+        if INFERENCE_EXECUTOR and EMBEDDER_BACKEND != "ngram":
             try:
-                from sentence_transformers import SentenceTransformer
-                print("📥 Chargement modèle embeddings local...")
-                self.encoder = SentenceTransformer('all-MiniLM-L6-v2')
-                
-                # Créer embeddings pour tous les codes
-                descriptions = [f"{code[1]} {code[3]}" for code in self.codes]
-                self.code_embeddings = self.encoder.encode(descriptions)
-                print("✅ Modèle embeddings prêt")
+                from app.core.inference import InferenceExecutor
+
+                print("📥 Démarrage du processus d'inférence...")
+                self.inference = InferenceExecutor(
+                    EMBEDDING_MODEL, on_batch=self._record_inference_batch
+                )
+                self.inference.start()
+                self.embedding_index = self.load_code_embeddings()
+                print("✅ Modèle embeddings prêt (processus d'inférence)")
+                return
             except Exception as e:
-                print(f"⚠️ Embeddings non disponibles: {e}")
-                self.encoder = None
-    
-    def analyze_encounter(self, encounter_data: Dict) -> Dict:
+                # Repli sur l'embedder en processus (n-grammes si torch est absent)
+                print(f"⚠️ Processus d'inférence non disponible: {e}")
+                if self.inference is not None:
+                    self.inference.shutdown()
+                self.inference = None
+
+        try:
+            print("📥 Chargement modèle embeddings local...")
+            self.embedder = create_embedder()
+
+            # Embeddings de tous les codes (calculés une fois, puis mmap)
+            self.embedding_index = self.load_code_embeddings()
+            print(f"✅ Modèle embeddings prêt ({self.embedder.name})")
+        except Exception as e:
+            print(f"⚠️ Embeddings non disponibles: {e}")
+            self.embedder = None
+
+    def _record_inference_batch(self, size: int):
+        self.instrumentation.count("inference_batches")
+        self.instrumentation.count("inference_items", size)
+
+    def analyze_encounter(
+        self, encounter_data: Dict, timings: Optional[Dict] = None
+    ) -> Dict:
         """
         Analyse un cas médical et suggère codes RAMQ
-        
+
         Args:
             encounter_data: Dict avec triage_level, chief_complaint, procedures, etc.
-            
+            timings: Dict optionnel rempli avec la durée (ms) de chaque étape
+
         Returns:
             Dict avec suggestions de codes et tarifs
         """
-        
-        # Vérifier cache d'abord
-        cached = self.check_cache(encounter_data)
-        if cached:
-            cached['from_cache'] = True
-            return cached
-        
+
+        stage = self.instrumentation.stage
+
+        with stage("analyze_encounter", timings):
+            # Vérifier cache d'abord
+            with stage("check_cache", timings):
+                cached = self.check_cache(encounter_data)
+            if cached:
+                cached["from_cache"] = True
+                return cached
+            self.instrumentation.count("cache_misses")
+
+            # Un seul calcul par clé à la fois: les cas identiques concurrents
+            # attendent le résultat du premier au lieu de recalculer
+            suggestions, leader = self.inflight.do(
+                self.cache_key(encounter_data),
+                lambda: self._compute_analysis(encounter_data, timings),
+                snapshot=dumps_text,
+            )
+
+        if not leader:
+            self.instrumentation.count("singleflight_saved")
+            suggestions = loads(suggestions)
+            suggestions["from_cache"] = True
+            return suggestions
+
+        suggestions["from_cache"] = False
+        return suggestions
+
+    def _compute_analysis(
+        self, encounter_data: Dict, timings: Optional[Dict] = None
+    ) -> Dict:
+        """Règles + sémantique + tarifs, puis sauvegarde en cache"""
+
+        stage = self.instrumentation.stage
+
         # Analyse basée sur règles
-        suggestions = self.rule_based_analysis(encounter_data)
-        
+        with stage("rule_based_analysis", timings):
+            suggestions = self.rule_based_analysis(encounter_data)
+
         # Enrichir avec recherche sémantique si disponible
-        if encounter_data.get("chief_complaint") and self.encoder:
-            semantic_matches = self.semantic_search(
-                encounter_data["chief_complaint"],
-                encounter_data.get("procedures", [])
-            )
-            suggestions = self.merge_suggestions(suggestions, semantic_matches)
-        
+        if encounter_data.get("chief_complaint") and self.semantic_available:
+            with stage("semantic_search", timings):
+                semantic_matches = self.semantic_search(
+                    encounter_data["chief_complaint"],
+                    encounter_data.get("procedures", []),
+                )
+                suggestions = self.merge_suggestions(suggestions, semantic_matches)
+
         # Calculer tarifs avec modificateurs
-        suggestions = self.apply_modifiers(suggestions, encounter_data)
-        
+        with stage("apply_modifiers", timings):
+            suggestions = self.apply_modifiers(suggestions, encounter_data)
+
         # Sauvegarder en cache
-        self.save_to_cache(encounter_data, suggestions)
-        
-        suggestions['from_cache'] = False
+        with stage("save_to_cache", timings):
+            self.save_to_cache(encounter_data, suggestions)
+
         return suggestions
-    
+
+    def analyze_batch(self, encounters: List[Dict]) -> List[Dict]:
+        """
+        Analyse plusieurs cas en une passe (requêtes concurrentes regroupées)
+
+        Même résultat que des appels successifs à analyze_encounter: les cas de
+        même clé de cache sont calculés une fois, les suivants reçoivent une
+        copie marquée from_cache. Cache, encodage sémantique, lecture des tarifs
+        et écriture du cache sont faits une seule fois pour tout le lot.
+
+        Un cas en erreur n'échoue pas le lot: son exception est renvoyée à sa
+        place dans la liste (les autres cas reçoivent leur résultat).
+        """
+
+        stage = self.instrumentation.stage
+
+        with stage("analyze_batch"):
+            keys = [self.cache_key(data) for data in encounters]
+            leaders: Dict[str, int] = {}
+            for index, key in enumerate(keys):
+                leaders.setdefault(key, index)
+
+            with stage("check_cache"):
+                cached = self.check_cache_many(list(leaders))
+
+            missed = [key for key in leaders if key not in cached]
+            self.instrumentation.count("cache_misses", len(missed))
+
+            # Clés déjà en calcul ailleurs (autre lot, autre requête): on attendra leur résultat
+            flights = {key: self.inflight.acquire(key) for key in missed}
+            to_compute = [key for key in missed if flights[key][1]]
+
+            computed: Dict[str, Dict] = {}
+            errors: Dict[str, Exception] = {}
+            try:
+                self._compute_batch(encounters, leaders, to_compute, computed, errors)
+            except BaseException as e:
+                for key in to_compute:
+                    self.inflight.resolve(key, flights[key][0], error=e)
+                raise
+            for key in to_compute:
+                if key in errors:
+                    self.inflight.resolve(key, flights[key][0], error=errors[key])
+                else:
+                    self.inflight.resolve(
+                        key, flights[key][0], computed[key], snapshot=dumps_text
+                    )
+
+            # Nos propres calculs publiés avant d'attendre ceux des autres (pas d'interblocage)
+            shared = {}
+            for key, (call, leader) in flights.items():
+                if leader:
+                    continue
+                try:
+                    shared[key] = SingleFlight.wait(call, timeout=SINGLEFLIGHT_TIMEOUT)
+                except Exception as e:
+                    errors[key] = e
+            self.instrumentation.count("singleflight_saved", len(shared))
+
+        results = []
+        for index, key in enumerate(keys):
+            if key in errors:
+                # Erreur propre à ce cas (et à ses doublons): les autres ne sont pas touchés
+                results.append(errors[key])
+                continue
+            if key in computed and leaders[key] == index:
+                result = computed[key]
+                result["from_cache"] = False
+            elif key in computed:
+                # Doublon dans le lot: comme un appel successif, servi par le cache
+                self.instrumentation.count("coalesced_duplicates")
+                result = loads(dumps_text(computed[key]))
+                result["from_cache"] = True
+            elif key in shared:
+                result = loads(shared[key])
+                result["from_cache"] = True
+            else:
+                result = loads(cached[key])
+                result["from_cache"] = True
+            results.append(result)
+        return results
+
+    def _compute_batch(
+        self,
+        encounters: List[Dict],
+        leaders: Dict[str, int],
+        to_compute: List[str],
+        computed: Dict[str, Dict],
+        errors: Dict[str, Exception],
+    ):
+        """
+        Calcul groupé des clés de to_compute (résultats dans computed)
+        Les erreurs propres à un cas (données invalides) vont dans errors, par clé
+        """
+
+        stage = self.instrumentation.stage
+
+        def each(keys: List[str], fn: Callable[[str], Dict]):
+            for key in keys:
+                if key in errors:
+                    continue
+                try:
+                    computed[key] = fn(key)
+                except Exception as e:
+                    errors[key] = e
+                    computed.pop(key, None)
+
+        if not to_compute:
+            return
+
+        with stage("rule_based_analysis"):
+            each(
+                to_compute,
+                lambda key: self.rule_based_analysis(encounters[leaders[key]]),
+            )
+
+        queries: Dict[str, str] = {}
+        for key in to_compute:
+            data = encounters[leaders[key]]
+            if key in errors or not data.get("chief_complaint"):
+                continue
+            try:
+                queries[
+                    key
+                ] = f"{data['chief_complaint']} {' '.join(data.get('procedures', []))}"
+            except Exception as e:
+                errors[key] = e
+                computed.pop(key, None)
+        if queries and self.semantic_available:
+            with stage("semantic_search"):
+                matches = dict(
+                    zip(queries, self.semantic_search_batch(list(queries.values())))
+                )
+                each(
+                    list(matches),
+                    lambda key: self.merge_suggestions(computed[key], matches[key]),
+                )
+
+        with stage("apply_modifiers"):
+            fees = self.get_base_fees(
+                [code for key in computed for code in self._fee_codes(computed[key])]
+            )
+            each(
+                to_compute,
+                lambda key: self.apply_modifiers(
+                    computed[key], encounters[leaders[key]], fees
+                ),
+            )
+
+        with stage("save_to_cache"):
+            self.save_many_to_cache(
+                [
+                    (key, encounters[leaders[key]], computed[key])
+                    for key in to_compute
+                    if key in computed
+                ]
+            )
+
     def rule_based_analysis(self, data: Dict) -> Dict:
         """
         Analyse par règles déterministes basées sur le guide RAMQ
         """
-        
+
         triage = data.get("triage_level", 3)
         duration = data.get("duration_minutes", 30)
         procedures = data.get("procedures", [])
-        
+
         # Mapping triage -> code de base selon complexité
         base_codes = {
             1: "08.48C",  # P1: Très complexe (réanimation)
             2: "08.48B",  # P2: Complexe (très urgent)
             3: "08.48A",  # P3: Ordinaire (urgent)
             4: "08.48A",  # P4: Ordinaire (moins urgent)
-            5: "08.48A"   # P5: Ordinaire (non urgent)
+            5: "08.48A",  # P5: Ordinaire (non urgent)
         }
-        
+
         primary_code = base_codes.get(triage, "08.48A")
-        
+
         # Ajuster selon durée (consultation vs examen)
         if duration > 60 and triage <= 2:
             primary_code = "08.49B"  # Consultation complexe
         elif duration > 45 and triage == 3:
             primary_code = "08.49A"  # Consultation ordinaire
-        
+
         # Identifier procédures additionnelles
         procedure_codes = []
         for proc in procedures:
-            proc_lower = proc.lower()
-            if "suture" in proc_lower:
-                if "simple" in proc_lower or len(proc_lower) < 15:
-                    procedure_codes.append("15.01")
-                else:
-                    procedure_codes.append("15.02")
-            elif "plâtre" in proc_lower or "platre" in proc_lower:
-                if "supérieur" in proc_lower or "bras" in proc_lower:
-                    procedure_codes.append("15.05")
-                else:
-                    procedure_codes.append("15.06")
-            elif "ecg" in proc_lower:
-                procedure_codes.append("00.44")
-        
+            proc_code = self.procedure_code(proc)
+            if proc_code:
+                procedure_codes.append(proc_code)
+
         return {
             "primary_code": primary_code,
             "procedure_codes": procedure_codes,
             "confidence": 0.85,
-            "reasoning": f"Basé sur triage P{triage}, durée {duration}min"
+            "reasoning": f"Basé sur triage P{triage}, durée {duration}min",
         }
-    
+
+    def embed_query(self, text: str) -> Optional["np.ndarray"]:
+        """Embedding d'un texte libre (None si le modèle n'est pas chargé)"""
+
+        if self.inference is not None:
+            return self.inference.embed(text)
+        if self.embedder is None:
+            return None
+        return self.embedder.encode([text])[0]
+
+    def procedure_code(self, proc: str) -> Optional[str]:
+        """Code RAMQ d'une procédure saisie, fautes de frappe corrigées (None si inconnue)"""
+
+        proc_lower = proc.lower()
+        proc_code = self.match_procedure(proc_lower)
+        if proc_code is None:
+            # Fautes de frappe: corriger vers les mots-clés des règles
+            corrected = self.correct_procedure(proc_lower)
+            if corrected != proc_lower:
+                proc_code = self.match_procedure(corrected)
+        return proc_code
+
+    def match_procedure(self, proc_lower: str) -> Optional[str]:
+        """Code RAMQ d'une procédure selon les mots-clés (None si inconnue)"""
+
+        if "suture" in proc_lower:
+            if "simple" in proc_lower or len(proc_lower) < 15:
+                return "15.01"
+            return "15.02"
+        elif "plâtre" in proc_lower or "platre" in proc_lower:
+            if "supérieur" in proc_lower or "bras" in proc_lower:
+                return "15.05"
+            return "15.06"
+        elif "ecg" in proc_lower:
+            return "00.44"
+        return None
+
+    def correct_procedure(self, proc_lower: str) -> str:
+        """
+        Remplace les mots proches d'un mot-clé de règle par sa forme canonique
+        Les autres mots (simple, bras, supérieur...) restent intacts
+        """
+
+        def replace(match):
+            word = match.group(0)
+            if len(word) < 3:
+                return word
+            corrected = self.keyword_matcher.correct(word)
+            return PROCEDURE_KEYWORDS.get(corrected, word) if corrected else word
+
+        return re.sub(r"\w+", replace, proc_lower)
+
     def semantic_search(self, complaint: str, procedures: List[str]) -> List[Dict]:
         """
         Recherche sémantique dans les codes RAMQ
         Utilise embeddings pour trouver codes similaires
         """
-        
-        if not self.encoder or self.code_embeddings is None:
+
+        if not self.semantic_available:
             return []
-        
+
         try:
             # Créer embedding de la requête
             query = f"{complaint} {' '.join(procedures)}"
-            query_embedding = self.encoder.encode([query])[0]
-            
-            # Calculer similarités cosinus
-            similarities = np.dot(self.code_embeddings, query_embedding)
-            top_indices = np.argsort(similarities)[-5:][::-1]
-            
-            matches = []
-            for idx in top_indices:
-                code = self.codes[idx]
-                matches.append({
-                    "code": code[0],
-                    "description": code[1],
-                    "base_fee": code[2],
-                    "similarity": float(similarities[idx])
-                })
-            
-            return matches
+            query_embedding = self.embed_query(query)
+
+            # Similarités cosinus (k meilleurs, re-classés en float32 si quantifié)
+            indices, similarities = self.embedding_index.top_k(query_embedding, 5)
+            return self._top_matches(indices, similarities)
         except Exception as e:
             print(f"⚠️ Erreur recherche sémantique: {e}")
             return []
-    
+
+    def semantic_search_batch(self, queries: List[str]) -> List[List[Dict]]:
+        """Recherche sémantique de plusieurs requêtes: un seul encodage, un seul produit matriciel"""
+
+        if not self.semantic_available or not queries:
+            return [[] for _ in queries]
+
+        try:
+            query_embeddings = self.encode_texts(queries)
+            return [
+                self._top_matches(indices, similarities)
+                for indices, similarities in self.embedding_index.top_k_many(
+                    query_embeddings, 5
+                )
+            ]
+        except Exception as e:
+            print(f"⚠️ Erreur recherche sémantique: {e}")
+            return [[] for _ in queries]
+
+    def _top_matches(
+        self, indices: "np.ndarray", similarities: "np.ndarray"
+    ) -> List[Dict]:
+        matches = []
+        for idx, similarity in zip(indices, similarities):
+            match = self.catalog.entry(idx, ("code", "description", "base_fee"))
+            match["similarity"] = float(similarity)
+            matches.append(match)
+        return matches
+
     def merge_suggestions(self, rule_based: Dict, semantic: List[Dict]) -> Dict:
         """Fusionne suggestions basées sur règles et recherche sémantique"""
-        
+
         # Pour l'instant, on garde les règles comme base
         # et on ajoute les matches sémantiques comme alternatives
-        rule_based['semantic_alternatives'] = semantic[:3]
-        
+        rule_based["semantic_alternatives"] = semantic[:3]
+
         return rule_based
-    
-    def apply_modifiers(self, suggestions: Dict, data: Dict) -> Dict:
+
+    def apply_modifiers(
+        self, suggestions: Dict, data: Dict, fees: Optional[Dict[str, float]] = None
+    ) -> Dict:
         """
         Applique modificateurs tarifaires selon contexte
         - Nuit (23h-7h): +30%
         - Fin de semaine: +20%
         - Jour férié: +50%
+
+        fees: tarifs déjà lus (get_base_fees), sinon lus en une requête
         """
-        
+
         encounter_time = data.get("encounter_datetime")
         if isinstance(encounter_time, str):
             encounter_time = datetime.fromisoformat(encounter_time)
         elif encounter_time is None:
             encounter_time = datetime.now()
-        
+
         modifiers = []
         multiplier = 1.0
-        
+
         # Vérifier nuit (23h-7h)
         if encounter_time.hour >= 23 or encounter_time.hour < 7:
             modifiers.append("NUIT")
             multiplier *= 1.3
-        
+
         # Vérifier fin de semaine (samedi=5, dimanche=6)
         if encounter_time.weekday() >= 5:
             modifiers.append("FDS")
             multiplier *= 1.2
-        
+
         # Vérifier jour férié (liste simplifiée 2024-2025)
         if self.is_holiday(encounter_time):
             modifiers.append("FÉRIÉ")
             multiplier *= 1.5
-        
+
         # Calculer tarif total
-        base_fee = self.get_base_fee(suggestions["primary_code"])
+        if fees is None:
+            fees = self.get_base_fees(self._fee_codes(suggestions))
+        base_fee = fees.get(suggestions["primary_code"], 0.0)
         total_fee = base_fee * multiplier
-        
+
         # Ajouter frais procédures
         procedure_fees = []
         for proc_code in suggestions.get("procedure_codes", []):
-            proc_fee = self.get_base_fee(proc_code)
+            proc_fee = fees.get(proc_code, 0.0)
             procedure_fees.append({"code": proc_code, "fee": proc_fee})
             total_fee += proc_fee
-        
+
         suggestions["modifiers"] = modifiers
         suggestions["multiplier"] = round(multiplier, 2)
         suggestions["base_fee"] = base_fee
         suggestions["procedure_fees"] = procedure_fees
         suggestions["total_fee"] = round(total_fee, 2)
-        
+
         return suggestions
-    
+
     def get_base_fee(self, code: str) -> float:
         """Récupère le tarif de base d'un code RAMQ"""
-        
-        try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute("SELECT base_fee FROM ramq_codes WHERE code = ?", (code,))
-            result = cursor.fetchone()
-            
-            conn.close()
-            
-            return float(result[0]) if result else 0.0
-        except Exception as e:
-            print(f"⚠️ Erreur récupération tarif: {e}")
-            return 0.0
-    
+
+        return self.get_base_fees([code]).get(code, 0.0)
+
+    def get_base_fees(self, codes: List[str]) -> Dict[str, float]:
+        """Tarifs de base de plusieurs codes, lus dans le catalogue en mémoire (codes absents omis)"""
+
+        # Tarifs modifiés en base: rechargement (vérification au plus toutes les CATALOG_CHECK_INTERVAL s)
+        self.refresh_catalog_if_changed()
+        return self.catalog.fees_for(codes)
+
+    @staticmethod
+    def _fee_codes(suggestions: Dict) -> List[str]:
+        return [suggestions["primary_code"], *suggestions.get("procedure_codes", [])]
+
     def is_holiday(self, date: datetime) -> bool:
         """Vérifie si la date est un jour férié au Québec"""
-        
+
         # Jours fériés fixes 2024-2025
         holidays = [
-            '2024-01-01', '2024-04-01', '2024-05-20', '2024-06-24', 
-            '2024-07-01', '2024-09-02', '2024-10-14', '2024-12-25', '2024-12-26',
-            '2025-01-01', '2025-04-18', '2025-05-19', '2025-06-24',
-            '2025-07-01', '2025-09-01', '2025-10-13', '2025-12-25', '2025-12-26'
+            "2024-01-01",
+            "2024-04-01",
+            "2024-05-20",
+            "2024-06-24",
+            "2024-07-01",
+            "2024-09-02",
+            "2024-10-14",
+            "2024-12-25",
+            "2024-12-26",
+            "2025-01-01",
+            "2025-04-18",
+            "2025-05-19",
+            "2025-06-24",
+            "2025-07-01",
+            "2025-09-01",
+            "2025-10-13",
+            "2025-12-25",
+            "2025-12-26",
         ]
-        
-        date_str = date.strftime('%Y-%m-%d')
+
+        date_str = date.strftime("%Y-%m-%d")
         return date_str in holidays
-    
+
+    def cache_key(self, data: Dict) -> str:
+        """Hash de l'input (sans datetime pour plus de hits)"""
+
+        cache_data = {
+            "triage": data.get("triage_level"),
+            "complaint": data.get("chief_complaint", "")[:50],
+            "procedures": sorted(data.get("procedures", [])),
+        }
+        return hashlib.md5(json.dumps(cache_data, sort_keys=True).encode()).hexdigest()
+
     def check_cache(self, data: Dict) -> Optional[Dict]:
-        """Vérifie si un résultat similaire existe en cache"""
-        
+        """
+        Vérifie si un résultat similaire existe en cache
+        Niveau 1: mémoire du worker; niveau 2: table ai_cache (partagée)
+        """
+
+        return self.cached_result(self.cache_key(data))
+
+    def cached_result(self, cache_key: str) -> Optional[Dict]:
+        """Résultat en cache d'une clé (mémoire, puis ai_cache)"""
+
         try:
-            # Créer hash de l'input (sans datetime pour plus de hits)
-            cache_data = {
-                'triage': data.get('triage_level'),
-                'complaint': data.get('chief_complaint', '')[:50],
-                'procedures': sorted(data.get('procedures', []))
-            }
-            cache_key = hashlib.md5(
-                json.dumps(cache_data, sort_keys=True).encode()
-            ).hexdigest()
-            
-            conn = sqlite3.connect(self.db_path)
+            cached = self.memory_cache.get(cache_key)
+            if cached is not None:
+                self.instrumentation.count("cache_hits_memory")
+                return loads(cached)
+
+            conn = db.connect(self.db_path)
             cursor = conn.cursor()
-            
-            cursor.execute("""
-                SELECT output_data FROM ai_cache 
+
+            now = datetime.now()
+            cursor.execute(
+                """
+                SELECT output_data, expires_at FROM ai_cache 
                 WHERE input_hash = ? AND expires_at > ?
-            """, (cache_key, datetime.now()))
-            
+            """,
+                (cache_key, now),
+            )
+
             result = cursor.fetchone()
             conn.close()
-            
+
             if result:
-                return json.loads(result[0])
-            
+                self.instrumentation.count("cache_hits_sqlite")
+                remaining = (
+                    datetime.fromisoformat(str(result[1])) - now
+                ).total_seconds()
+                self.memory_cache.put(cache_key, result[0], ttl_seconds=remaining)
+                return loads(result[0])
+
         except Exception as e:
             print(f"⚠️ Erreur cache: {e}")
-        
+
         return None
-    
-    def save_to_cache(self, input_data: Dict, output_data: Dict):
+
+    def check_cache_many(self, keys: List[str]) -> Dict[str, str]:
+        """
+        Résultats en cache (JSON) de plusieurs clés: mémoire, puis une seule
+        requête SQLite pour les clés restantes
+        """
+
+        found: Dict[str, str] = {}
+        missing = []
+        for key in keys:
+            cached = self.memory_cache.get(key)
+            if cached is not None:
+                found[key] = cached
+            else:
+                missing.append(key)
+        self.instrumentation.count("cache_hits_memory", len(found))
+
+        if not missing:
+            return found
+
+        try:
+            conn = db.connect(self.db_path)
+            cursor = conn.cursor()
+
+            now = datetime.now()
+            cursor.execute(
+                f"""
+                SELECT input_hash, output_data, expires_at FROM ai_cache 
+                WHERE input_hash IN ({', '.join('?' * len(missing))}) AND expires_at > ?
+            """,
+                (*missing, now),
+            )
+            rows = cursor.fetchall()
+            conn.close()
+
+            for key, output_json, expires_at in rows:
+                remaining = (
+                    datetime.fromisoformat(str(expires_at)) - now
+                ).total_seconds()
+                self.memory_cache.put(key, output_json, ttl_seconds=remaining)
+                found[key] = output_json
+            self.instrumentation.count("cache_hits_sqlite", len(rows))
+        except Exception as e:
+            print(f"⚠️ Erreur cache: {e}")
+
+        return found
+
+    def save_many_to_cache(self, entries: List[tuple]):
+        """Sauvegarde (clé, input, output) en une transaction, pour 7 jours"""
+
+        if not entries:
+            return
+
+        try:
+            expires = datetime.now() + timedelta(days=7)
+            rows = []
+            for cache_key, input_data, output_data in entries:
+                output_json = dumps_text(output_data)
+                self.memory_cache.put(cache_key, output_json)
+                rows.append(
+                    (
+                        cache_key,
+                        dumps_text(input_data),
+                        output_json,
+                        "local_rules_v1",
+                        expires,
+                    )
+                )
+
+            conn = db.connect(self.db_path)
+            conn.executemany(
+                """
+                INSERT OR REPLACE INTO ai_cache 
+                (input_hash, input_data, output_data, model_used, expires_at)
+                VALUES (?, ?, ?, ?, ?)
+            """,
+                rows,
+            )
+            conn.commit()
+            conn.close()
+
+        except Exception as e:
+            print(f"⚠️ Erreur sauvegarde cache: {e}")
+
+    def save_to_cache(
+        self, input_data: Dict, output_data: Dict, model_used: str = "local_rules_v1"
+    ):
         """Sauvegarde résultat en cache pour 7 jours"""
-        
+
         try:
-            cache_data = {
-                'triage': input_data.get('triage_level'),
-                'complaint': input_data.get('chief_complaint', '')[:50],
-                'procedures': sorted(input_data.get('procedures', []))
-            }
-            cache_key = hashlib.md5(
-                json.dumps(cache_data, sort_keys=True).encode()
-            ).hexdigest()
-            
+            cache_key = self.cache_key(input_data)
+            output_json = dumps_text(output_data)
+            self.memory_cache.put(cache_key, output_json)
+
             expires = datetime.now() + timedelta(days=7)
-            
-            conn = sqlite3.connect(self.db_path)
+
+            conn = db.connect(self.db_path)
             cursor = conn.cursor()
-            
-            cursor.execute("""
+
+            cursor.execute(
+                """
                 INSERT OR REPLACE INTO ai_cache 
                 (input_hash, input_data, output_data, model_used, expires_at)
                 VALUES (?, ?, ?, ?, ?)
-            """, (
-                cache_key,
-                json.dumps(input_data),
-                json.dumps(output_data),
-                "local_rules_v1",
-                expires
-            ))
-            
+            """,
+                (cache_key, dumps_text(input_data), output_json, model_used, expires),
+            )
+
             conn.commit()
             conn.close()
-            
+
         except Exception as e:
             print(f"⚠️ Erreur sauvegarde cache: {e}")
@@ -0,0 +1,63 @@
+"""
+RAMQ Billing Assistant - Cache mémoire du processus (niveau 1)
+LRU borné avec expiration, devant le cache SQLite partagé (ai_cache, niveau 2)
+Chaque worker a le sien: aucun verrou inter-processus, aucune cohérence à maintenir
+au-delà de l'expiration et du vidage au rechargement du catalogue
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+MEMORY_CACHE_SIZE = int(os.getenv("RAMQ_MEMORY_CACHE_SIZE", "2048"))
+
+
+class MemoryCache:
+    """
+    LRU clé -> JSON sérialisé
+    Les valeurs sont gardées en texte: chaque lecture produit une copie
+    indépendante (l'appelant peut modifier le dict retourné)
+    """
+
+    def __init__(
+        self, max_entries: int = MEMORY_CACHE_SIZE, ttl_seconds: float = 7 * 24 * 3600
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        if not self.max_entries:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def put(self, key: str, value: str, ttl_seconds: Optional[float] = None):
+        if not self.max_entries:
+            return
+        expires_at = time.monotonic() + (
+            ttl_seconds if ttl_seconds is not None else self.ttl_seconds
+        )
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -0,0 +1,209 @@
+"""
+RAMQ Billing Assistant - Catalogue des codes RAMQ
+Version du catalogue, projection des colonnes exposées par l'API et
+catalogue en mémoire par colonnes (CodeCatalog)
+"""
+
+import hashlib
+import sqlite3
+import sys
+from array import array
+from bisect import bisect_right
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Colonnes de ramq_codes exposées par /api/codes (ordre de sortie)
+CODE_FIELDS = ["code", "description", "base_fee", "category"]
+
+
+def get_catalog_version(cursor: sqlite3.Cursor) -> int:
+    """
+    Version courante du catalogue (incrémentée par trigger)
+    Retourne 0 si la base n'a pas encore été migrée
+    """
+
+    try:
+        cursor.execute("SELECT value FROM catalog_meta WHERE key = 'version'")
+        row = cursor.fetchone()
+        return int(row[0]) if row else 0
+    except sqlite3.OperationalError:
+        return 0
+
+
+def parse_fields(fields: Optional[str]) -> List[str]:
+    """
+    Valide la projection demandée (ex: "code,base_fee")
+    `code` est toujours inclus: il sert de curseur de pagination
+
+    Raises:
+        ValueError: champ inconnu
+    """
+
+    if not fields:
+        return list(CODE_FIELDS)
+
+    requested = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = [f for f in requested if f not in CODE_FIELDS]
+    if unknown:
+        raise ValueError(
+            f"Champs inconnus: {', '.join(unknown)} (choix: {', '.join(CODE_FIELDS)})"
+        )
+
+    if "code" not in requested:
+        requested.insert(0, "code")
+    # Ordre canonique: une même projection donne toujours le même ETag
+    return [f for f in CODE_FIELDS if f in requested]
+
+
+def make_etag(catalog_version: int, parts: Iterable) -> str:
+    """ETag faible dérivé de la version du catalogue et des paramètres"""
+
+    digest = hashlib.md5("|".join(str(p) for p in parts).encode()).hexdigest()[:16]
+    return f'W/"catalog-{catalog_version}-{digest}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Compare l'en-tête If-None-Match (liste ou *) à l'ETag courant"""
+
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
+
+
+class CodeCatalog:
+    """
+    Catalogue en mémoire par colonnes (une entrée par ligne de ramq_codes)
+
+    - codes, descriptions: chaînes internées; index: code -> ligne
+    - fees: tableau de doubles (array 'd')
+    - category_ids: petits entiers (array 'h'), categories: table de correspondance
+    Tableaux compacts de la bibliothèque standard: aucun import de NumPy
+    pour servir le catalogue (mode minimal)
+    - texts(): "description catégorie", texte commun aux index et aux embeddings
+      (construit à la demande, au chargement des index seulement)
+
+    Usage:
+        catalog = CodeCatalog.load(cursor)
+        fees = catalog.fees_for(["08.48A", "15.01"])
+    """
+
+    def __init__(self, rows: Sequence[tuple] = (), version: int = 0):
+        """
+        Args:
+            rows: lignes (code, description, base_fee, category)
+            version: version du catalogue (catalog_meta)
+        """
+        self.version = version
+        self.codes: List[str] = [sys.intern(str(row[0])) for row in rows]
+        self.descriptions: List[str] = [sys.intern(row[1] or "") for row in rows]
+        self.fees = array("d", [float(row[2] or 0.0) for row in rows])
+
+        self.categories: List[str] = sorted({row[3] or "" for row in rows})
+        category_ids = {category: i for i, category in enumerate(self.categories)}
+        self.category_ids = array("h", [category_ids[row[3] or ""] for row in rows])
+        self._category_lookup = category_ids
+
+        self.index: Dict[str, int] = {code: idx for idx, code in enumerate(self.codes)}
+
+        # Ordre de tri des codes (ORDER BY code) pour la pagination par curseur,
+        # global (None) et par catégorie
+        sorted_rows = array(
+            "i", sorted(range(len(self.codes)), key=self.codes.__getitem__)
+        )
+        by_category: Dict[int, array] = {
+            category_id: array("i") for category_id in range(len(self.categories))
+        }
+        for idx in sorted_rows:
+            by_category[self.category_ids[idx]].append(idx)
+        self._sorted: Dict[Optional[int], Tuple[List[str], array]] = {}
+        for key, rows in [(None, sorted_rows)] + list(by_category.items()):
+            self._sorted[key] = ([self.codes[idx] for idx in rows], rows)
+
+    @classmethod
+    def load(cls, cursor: sqlite3.Cursor) -> "CodeCatalog":
+        cursor.execute("SELECT code, description, base_fee, category FROM ramq_codes")
+        rows = cursor.fetchall()
+        return cls(rows, get_catalog_version(cursor))
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def texts(self) -> List[str]:
+        return [
+            f"{description} {self.categories[category_id]}".strip()
+            for description, category_id in zip(self.descriptions, self.category_ids)
+        ]
+
+    def category(self, idx: int) -> str:
+        return self.categories[self.category_ids[idx]]
+
+    def entry(self, idx: int, fields: Sequence[str] = CODE_FIELDS) -> Dict:
+        """Ligne idx en dict (colonnes de CODE_FIELDS demandées)"""
+        values = {
+            "code": self.codes[idx],
+            "description": self.descriptions[idx],
+            "base_fee": self.fees[idx],
+            "category": self.categories[self.category_ids[idx]],
+        }
+        return (
+            values
+            if fields is CODE_FIELDS
+            else {field: values[field] for field in fields}
+        )
+
+    def fee(self, code: str) -> Optional[float]:
+        idx = self.index.get(code)
+        return self.fees[idx] if idx is not None else None
+
+    def fees_for(self, codes: Iterable[str]) -> Dict[str, float]:
+        """Tarifs de base de plusieurs codes (codes absents omis)"""
+        index = self.index
+        fees = self.fees
+        return {code: fees[index[code]] for code in set(codes) if code in index}
+
+    def rows_in_category(self, category: str) -> List[int]:
+        """Lignes d'une catégorie, dans l'ordre du catalogue"""
+        category_id = self._category_lookup.get(category)
+        if category_id is None:
+            return []
+        return [
+            idx for idx, value in enumerate(self.category_ids) if value == category_id
+        ]
+
+    def page(
+        self,
+        category: Optional[str] = None,
+        after: Optional[str] = None,
+        limit: int = 100,
+    ) -> Tuple[List[int], int, bool]:
+        """
+        Page triée par code (comme ORDER BY code), filtrée par catégorie
+        Retourne (lignes, total du filtre, page suivante existe)
+        """
+        key = None if category is None else self._category_lookup.get(category, -1)
+        codes, indices = self._sorted.get(key, ([], ()))
+        start = bisect_right(codes, after) if after is not None else 0
+        rows = list(indices[start : start + limit + 1])
+        return rows[:limit], len(indices), len(rows) > limit
+
+    def stats(self) -> Dict:
+        """Nombre de codes et tarifs (min, moyenne, max) par catégorie"""
+        fees_by_category: Dict[int, List[float]] = {}
+        for category_id, fee in zip(self.category_ids, self.fees):
+            fees_by_category.setdefault(category_id, []).append(fee)
+        by_category = {}
+        for category_id, category in enumerate(self.categories):
+            fees = fees_by_category.get(category_id)
+            if not fees:
+                continue
+            by_category[category] = {
+                "codes": len(fees),
+                "fee_min": round(min(fees), 2),
+                "fee_mean": round(sum(fees) / len(fees), 2),
+                "fee_max": round(max(fees), 2),
+            }
+        return {
+            "version": self.version,
+            "codes": len(self.codes),
+            "categories": by_category,
+        }
@@ -0,0 +1,107 @@
+"""
+RAMQ Billing Assistant - Regroupement des requêtes concurrentes (micro-lots)
+Les appels qui arrivent pendant qu'un lot s'exécute attendent le lot suivant
+(au plus window_ms): le moteur traite alors N cas en une passe (analyze_batch).
+Requête isolée: envoyée immédiatement, aucune attente ajoutée.
+"""
+
+import asyncio
+import os
+from typing import Any, Callable, List, Optional, Tuple
+
+COALESCE_WINDOW_MS = float(os.getenv("RAMQ_COALESCE_WINDOW_MS", "2"))
+COALESCE_MAX_BATCH = int(os.getenv("RAMQ_COALESCE_MAX_BATCH", "64"))
+
+
+class RequestCoalescer:
+    """
+    Regroupe les appels async en lots pour une fonction synchrone batch_fn(items) -> résultats
+    Un résultat qui est une exception n'échoue que l'appel correspondant.
+    batch_fn s'exécute dans le threadpool. Jusqu'à max_concurrent lots partent sans
+    attendre; au-delà, les appels attendent la fin d'un lot ou au plus la fenêtre
+
+    Usage:
+        coalescer = RequestCoalescer(engine.analyze_batch)
+        result = await coalescer.submit(encounter)
+    """
+
+    def __init__(
+        self,
+        batch_fn: Callable[[List[Any]], List[Any]],
+        window_ms: float = COALESCE_WINDOW_MS,
+        max_batch: int = COALESCE_MAX_BATCH,
+        max_concurrent: int = 1,
+        on_batch: Optional[Callable[[int], None]] = None,
+    ):
+        self.batch_fn = batch_fn
+        self.window = window_ms / 1000
+        self.max_batch = max_batch
+        self.max_concurrent = max_concurrent
+        self.on_batch = on_batch
+        self._pending: List[Tuple[Any, asyncio.Future]] = []
+        self._in_flight = 0
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+    async def submit(self, item: Any) -> Any:
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((item, future))
+        self._maybe_dispatch()
+        return await future
+
+    def _maybe_dispatch(self):
+        if not self._pending:
+            return
+        if (
+            self._in_flight < self.max_concurrent
+            or len(self._pending) >= self.max_batch
+        ):
+            self._dispatch()
+        elif self._timer is None:
+            # Lot en cours: attendre sa fin, ou au plus la fenêtre
+            self._timer = asyncio.get_running_loop().call_later(
+                self.window, self._on_timer
+            )
+
+    def _on_timer(self):
+        self._timer = None
+        if self._pending:
+            self._dispatch()
+
+    def _dispatch(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        batch, self._pending = (
+            self._pending[: self.max_batch],
+            self._pending[self.max_batch :],
+        )
+        self._in_flight += 1
+        asyncio.get_running_loop().create_task(self._run(batch))
+
+        if self._pending:
+            self._maybe_dispatch()
+
+    async def _run(self, batch: List[Tuple[Any, asyncio.Future]]):
+        items = [item for item, _ in batch]
+        try:
+            if self.on_batch:
+                self.on_batch(len(items))
+            results = await asyncio.get_running_loop().run_in_executor(
+                None, self.batch_fn, items
+            )
+            for (_, future), result in zip(batch, results):
+                if future.done():
+                    continue
+                # Erreur propre à un élément: seul son appelant la reçoit
+                if isinstance(result, BaseException):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+        finally:
+            self._in_flight -= 1
+            self._maybe_dispatch()
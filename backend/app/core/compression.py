@@ -0,0 +1,191 @@
+"""
+RAMQ Billing Assistant - Compression des réponses HTTP (gzip, brotli)
+Middleware ASGI: encodage négocié avec Accept-Encoding (brotli s'il est
+installé, sinon gzip), seulement au-delà d'un seuil de taille et pour les
+types texte (JSON, CSV, NDJSON, HTML). Les réponses en flux sont compressées
+bloc par bloc; les Server-Sent Events et les réponses déjà encodées passent
+telles quelles.
+
+Réglages: RAMQ_COMPRESSION=0 pour désactiver, RAMQ_COMPRESS_MIN_BYTES (seuil)
+"""
+
+import gzip
+import os
+import zlib
+from typing import Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - dépend de l'environnement
+    brotli = None
+
+COMPRESSION_ENABLED = os.getenv("RAMQ_COMPRESSION", "1").lower() in ("1", "true", "yes")
+
+# En dessous, l'en-tête et le coût CPU dépassent le gain
+COMPRESS_MIN_BYTES = int(os.getenv("RAMQ_COMPRESS_MIN_BYTES", "1024"))
+
+# Réponses dynamiques: niveaux rapides; corps mis en cache: compressés une
+# seule fois, au niveau maximal (voir ResponseCache)
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 4
+GZIP_LEVEL_MAX = 9
+BROTLI_QUALITY_MAX = 11
+
+COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson", "text/")
+# Chaque événement doit partir immédiatement: pas de compression en flux
+UNCOMPRESSED_TYPES = ("text/event-stream",)
+
+
+def supported_encodings():
+    return ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def choose_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """Meilleur encodage accepté par le client (br, puis gzip), None sinon"""
+
+    if not accept_encoding:
+        return None
+
+    accepted = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        quality = 1.0
+        if params.strip().startswith("q="):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip().lower()] = quality
+
+    for encoding in supported_encodings():
+        if accepted.get(encoding, accepted.get("*", 0.0)) > 0:
+            return encoding
+    return None
+
+
+def compress(body: bytes, encoding: str, best: bool = False) -> bytes:
+    """Corps complet compressé (best: niveau maximal, pour les corps réutilisés)"""
+
+    if encoding == "br":
+        return brotli.compress(
+            body, quality=BROTLI_QUALITY_MAX if best else BROTLI_QUALITY
+        )
+    return gzip.compress(
+        body, compresslevel=GZIP_LEVEL_MAX if best else GZIP_LEVEL, mtime=0
+    )
+
+
+def is_compressible(headers: Headers) -> bool:
+    content_type = headers.get("content-type", "")
+    return (
+        "content-encoding" not in headers
+        and content_type.startswith(COMPRESSIBLE_TYPES)
+        and not content_type.startswith(UNCOMPRESSED_TYPES)
+    )
+
+
+class _StreamCompressor:
+    """Compression incrémentale (réponses en flux: exports, fichiers)"""
+
+    def __init__(self, encoding: str):
+        if encoding == "br":
+            self._compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+            self.compress, self.finish = (
+                self._compressor.process,
+                self._compressor.finish,
+            )
+        else:
+            self._compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+            self.compress, self.finish = (
+                self._compressor.compress,
+                self._compressor.flush,
+            )
+
+
+class CompressionMiddleware:
+    """
+    Middleware ASGI de compression
+    Ajoute Content-Encoding et Vary: Accept-Encoding; les ETag faibles (W/)
+    restent valides pour toutes les variantes
+    """
+
+    def __init__(self, app, minimum_size: int = COMPRESS_MIN_BYTES, on_compress=None):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.on_compress = on_compress
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding"))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        state = {"start": None, "mode": None, "compressor": None}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                # Retenu jusqu'au premier bloc: la décision dépend du corps
+                state["start"] = message
+                return
+            if message["type"] != "http.response.body" or state["mode"] == "identity":
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+
+            if state["mode"] is None:
+                start = state["start"]
+                headers = MutableHeaders(raw=start["headers"])
+                small = not more_body and len(body) < self.minimum_size
+                if (
+                    start["status"] in (204, 304)
+                    or small
+                    or not is_compressible(headers)
+                ):
+                    state["mode"] = "identity"
+                    await send(start)
+                    await send(message)
+                    return
+
+                headers["Content-Encoding"] = encoding
+                headers.add_vary_header("Accept-Encoding")
+                if not more_body:
+                    state["mode"] = "done"
+                    compressed = compress(body, encoding)
+                    headers["Content-Length"] = str(len(compressed))
+                    if self.on_compress:
+                        self.on_compress(encoding, len(body), len(compressed))
+                    await send(start)
+                    await send({"type": "http.response.body", "body": compressed})
+                    return
+
+                state["mode"] = "stream"
+                state["compressor"] = _StreamCompressor(encoding)
+                if "content-length" in headers:
+                    del headers["Content-Length"]
+                await send(start)
+
+            compressor = state["compressor"]
+            chunk = compressor.compress(body)
+            if not more_body:
+                chunk += compressor.finish()
+            if chunk or not more_body:
+                await send(
+                    {
+                        "type": "http.response.body",
+                        "body": chunk,
+                        "more_body": more_body,
+                    }
+                )
+
+        await self.app(scope, receive, send_wrapper)
+        # Réponse sans corps (rare): l'en-tête retenu part quand même
+        if state["mode"] is None and state["start"] is not None:
+            await send(state["start"])
@@ -0,0 +1,100 @@
+"""
+RAMQ Billing Assistant - Accès SQLite instrumenté
+connect() remplace sqlite3.connect(): chaque requête exécutée est chronométrée
+et transmise aux observateurs enregistrés (métriques, journal des requêtes lentes)
+"""
+
+import sqlite3
+import time
+from typing import Callable, List
+
+# Observateurs: fn(sql, params, elapsed_seconds, cursor, failed)
+# failed: la requête a levé une exception (pas de résultat, pas de plan à demander)
+_query_observers: List[Callable] = []
+
+
+def add_query_observer(observer: Callable):
+    """Enregistre un observateur appelé après chaque requête"""
+    if observer not in _query_observers:
+        _query_observers.append(observer)
+
+
+def remove_query_observer(observer: Callable):
+    if observer in _query_observers:
+        _query_observers.remove(observer)
+
+
+def _notify(cursor: sqlite3.Cursor, sql: str, params, started: float, failed: bool):
+    elapsed = time.perf_counter() - started
+    for observer in _query_observers:
+        try:
+            observer(sql, params, elapsed, cursor, failed)
+        except Exception as e:
+            print(f"⚠️ Erreur observateur SQL: {e}")
+
+
+class TimedCursor(sqlite3.Cursor):
+    """Curseur qui chronomètre execute/executemany/executescript"""
+
+    def execute(self, sql, parameters=()):
+        if not _query_observers:
+            return super().execute(sql, parameters)
+        started = time.perf_counter()
+        failed = True
+        try:
+            result = super().execute(sql, parameters)
+            failed = False
+            return result
+        finally:
+            _notify(self, sql, parameters, started, failed)
+
+    def executemany(self, sql, seq_of_parameters):
+        if not _query_observers:
+            return super().executemany(sql, seq_of_parameters)
+        started = time.perf_counter()
+        failed = True
+        try:
+            result = super().executemany(sql, seq_of_parameters)
+            failed = False
+            return result
+        finally:
+            _notify(self, sql, None, started, failed)
+
+    def executescript(self, sql_script):
+        if not _query_observers:
+            return super().executescript(sql_script)
+        started = time.perf_counter()
+        failed = True
+        try:
+            result = super().executescript(sql_script)
+            failed = False
+            return result
+        finally:
+            _notify(self, sql_script, None, started, failed)
+
+
+class TimedConnection(sqlite3.Connection):
+    """Connexion dont les curseurs (et raccourcis execute) sont instrumentés"""
+
+    def cursor(self, factory=TimedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def executescript(self, sql_script):
+        return self.cursor().executescript(sql_script)
+
+
+def connect(db_path, **kwargs) -> sqlite3.Connection:
+    """sqlite3.connect() avec instrumentation des requêtes"""
+    return sqlite3.connect(str(db_path), factory=TimedConnection, **kwargs)
+
+
+def statement_kind(sql: str) -> str:
+    """Type de requête (select, insert, update...) pour les étiquettes de métriques"""
+    stripped = sql.lstrip()
+    return stripped.split(None, 1)[0].lower() if stripped else "unknown"
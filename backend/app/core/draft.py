@@ -0,0 +1,162 @@
+"""
+RAMQ Billing Assistant - Analyse provisoire pendant la saisie
+Codes et tarifs estimés à chaque modification du formulaire sans refaire
+l'analyse complète: chaque étape est mémorisée selon son entrée, seules
+celles dont l'entrée a changé sont recalculées
+- procédures: code de chaque libellé (règles + correction des fautes)
+- plainte: découpée en mots; pendant la frappe (typing), le mot inachevé est
+  ignoré: la requête sémantique ne change qu'à la fin d'un mot
+- sémantique: embedding de chaque requête (les préfixes déjà vus, après un
+  retour arrière, ne sont pas réencodés), mémos par version du catalogue
+- tarifs: catalogue en mémoire et modificateurs, recalculés (quelques µs)
+
+Rien n'est écrit dans ai_cache: l'analyse complète (/api/analyze) reste la référence.
+Taille des mémos: RAMQ_DRAFT_MEMO_SIZE entrées par étape et par worker
+"""
+
+import os
+import re
+import time
+from typing import TYPE_CHECKING, Dict, List, Tuple
+
+from app.core.cache import MemoryCache
+from app.core.instrumentation import instrumentation
+
+if TYPE_CHECKING:
+    from app.core.ai_local import LocalAIEngine
+
+DRAFT_MEMO_SIZE = int(os.getenv("RAMQ_DRAFT_MEMO_SIZE", "2048"))
+
+# Correspondances sémantiques conservées (comme semantic_search)
+SEMANTIC_TOP_K = 5
+
+_WORD_RE = re.compile(r"\w+")
+
+# Procédure sans code (None signifie: absente du mémo)
+_NO_CODE = ""
+
+
+def tokenize_complaint(text: str, typing: bool = False) -> Tuple[str, ...]:
+    """
+    Mots de la plainte, en minuscules
+    typing: le dernier mot, s'il n'est pas suivi d'un séparateur, est en cours de frappe et ignoré
+    """
+
+    words = _WORD_RE.findall(text.lower())
+    if typing and words and _WORD_RE.match(text[-1:]):
+        words.pop()
+    return tuple(words)
+
+
+class DraftAnalyzer:
+    """
+    Analyse provisoire d'un cas en cours de saisie (mémos partagés entre clients)
+
+    Usage:
+        draft = engine.drafts.analyze({"triage_level": 2, "chief_complaint": "douleur thor",
+                                       "typing": True, "duration_minutes": 30})
+        draft["reused"]   # étapes servies par les mémos: procedures, embedding, semantic
+    """
+
+    def __init__(self, engine: "LocalAIEngine", memo_size: int = DRAFT_MEMO_SIZE):
+        self.engine = engine
+        self.procedures = MemoryCache(memo_size)
+        self.embeddings = MemoryCache(memo_size)
+        self.matches = MemoryCache(memo_size)
+
+    def analyze(self, data: Dict) -> Dict:
+        """Codes, alternatives sémantiques et tarifs provisoires (données partielles acceptées)"""
+
+        started = time.perf_counter()
+        instrumentation.count("draft_updates")
+        reused: List[str] = []
+
+        procedures = [
+            proc.strip()
+            for proc in data.get("procedures") or []
+            if proc and proc.strip()
+        ]
+        words = tokenize_complaint(
+            data.get("chief_complaint") or "", data.get("typing", False)
+        )
+
+        # Code principal: triage et durée (règles, sans procédures)
+        suggestions = self.engine.rule_based_analysis({**data, "procedures": []})
+        suggestions["procedure_codes"], procedures_reused = self.procedure_codes(
+            procedures
+        )
+        if procedures_reused:
+            reused.append("procedures")
+
+        # Même requête que semantic_search, sur les mots achevés
+        query = " ".join((*words, *(proc.lower() for proc in procedures)))
+        semantic: List[Dict] = []
+        if words and self.engine.semantic_available:
+            semantic, semantic_reused = self.semantic_matches(query)
+            reused.extend(semantic_reused)
+        suggestions = self.engine.merge_suggestions(suggestions, semantic)
+
+        suggestions = self.engine.apply_modifiers(suggestions, data)
+        suggestions["provisional"] = True
+        suggestions["query"] = query
+        suggestions["reused"] = reused
+        suggestions["took_ms"] = round((time.perf_counter() - started) * 1000, 3)
+        return suggestions
+
+    def procedure_codes(self, procedures: List[str]) -> Tuple[List[str], bool]:
+        """Codes des procédures reconnues; True si tous viennent du mémo"""
+
+        codes = []
+        all_reused = bool(procedures)
+        for proc in procedures:
+            key = proc.lower()
+            code = self.procedures.get(key)
+            if code is None:
+                all_reused = False
+                instrumentation.count("draft_procedures_computed")
+                code = self.engine.procedure_code(proc) or _NO_CODE
+                self.procedures.put(key, code)
+            else:
+                instrumentation.count("draft_procedures_reused")
+            if code:
+                codes.append(code)
+        return codes, all_reused
+
+    def semantic_matches(self, query: str) -> Tuple[List[Dict], List[str]]:
+        """Correspondances sémantiques de la requête et étapes réutilisées (embedding, semantic)"""
+
+        key = f"{self.engine.catalog_version}:{query}"
+        # Vecteurs propres à l'embedder et à la version (IDF n-grammes réajusté au rechargement)
+        embedding_key = (
+            f"{self.engine.catalog_version}:{self.engine.embedder_name}:{query}"
+        )
+        matches = self.matches.get(key)
+        if matches is not None:
+            instrumentation.count("draft_semantic_reused")
+            # Copies: l'appelant peut modifier les correspondances
+            return [dict(match) for match in matches], ["embedding", "semantic"]
+
+        try:
+            reused = []
+            vector = self.embeddings.get(embedding_key)
+            if vector is None:
+                instrumentation.count("draft_embeddings_computed")
+                vector = self.engine.embed_query(query)
+                if vector is None:
+                    return [], []
+                self.embeddings.put(embedding_key, vector)
+            else:
+                instrumentation.count("draft_embeddings_reused")
+                reused.append("embedding")
+
+            instrumentation.count("draft_semantic_computed")
+            indices, similarities = self.engine.embedding_index.top_k(
+                vector, SEMANTIC_TOP_K
+            )
+            matches = self.engine._top_matches(indices, similarities)
+        except Exception as e:
+            print(f"⚠️ Erreur recherche sémantique (brouillon): {e}")
+            return [], []
+
+        self.matches.put(key, matches)
+        return [dict(match) for match in matches], reused
@@ -0,0 +1,153 @@
+"""
+RAMQ Billing Assistant - Embedders interchangeables
+Même contrat pour tous: encode(textes) -> matrice float32 normalisée (L2),
+la similarité cosinus est alors un simple produit scalaire (semantic_search)
+
+- minilm: sentence-transformers (torch), meilleure qualité sémantique
+- ngram:  n-grammes de caractères hachés + TF-IDF, NumPy seulement
+          (aucun modèle à télécharger, quelques Mo de mémoire, tolère les fautes)
+
+Choix avec RAMQ_EMBEDDER=auto|minilm|ngram (auto: minilm si installé, sinon ngram)
+"""
+
+import math
+import os
+import re
+import unicodedata
+import zlib
+from typing import TYPE_CHECKING, Dict, Iterable, List
+
+if TYPE_CHECKING:
+    # Importé dans les méthodes: le module reste léger tant qu'aucun embedder n'est créé
+    import numpy as np
+
+EMBEDDER_BACKEND = os.getenv("RAMQ_EMBEDDER", "auto").lower()
+
+MINILM_MODEL = "all-MiniLM-L6-v2"
+
+# Dimension du hachage (collisions négligeables pour un catalogue de quelques centaines de codes)
+NGRAM_DIM = int(os.getenv("RAMQ_NGRAM_DIM", "2048"))
+NGRAM_RANGE = (3, 5)
+
+
+class Embedder:
+    """Interface: name (identifie les vecteurs sauvegardés), dim, fit, encode"""
+
+    name = "base"
+    dim = 0
+
+    def fit(self, corpus: List[str]) -> "Embedder":
+        """Adapte l'embedder au corpus du catalogue (sans effet par défaut)"""
+        return self
+
+    def encode(self, texts: List[str]) -> "np.ndarray":
+        raise NotImplementedError
+
+
+class SentenceTransformerEmbedder(Embedder):
+    """Modèle sentence-transformers chargé dans ce processus"""
+
+    def __init__(self, model_name: str = MINILM_MODEL):
+        from sentence_transformers import SentenceTransformer
+
+        self.name = model_name
+        self.model = SentenceTransformer(model_name)
+        self.dim = self.model.get_sentence_embedding_dimension()
+
+    def encode(self, texts: List[str]) -> "np.ndarray":
+        import numpy as np
+
+        return np.asarray(
+            self.model.encode(texts, normalize_embeddings=True), dtype=np.float32
+        )
+
+
+def normalize_text(text: str) -> str:
+    """Minuscules, sans accents ni ponctuation ("Plâtre - Bras" -> "platre bras")"""
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    return " ".join(re.findall(r"\w+", text))
+
+
+def char_ngrams(text: str, ngram_range=NGRAM_RANGE) -> Iterable[str]:
+    """N-grammes de caractères de chaque mot, bordé d'espaces (" ecg ", " ec", ...)"""
+    low, high = ngram_range
+    for word in normalize_text(text).split():
+        padded = f" {word} "
+        for size in range(low, high + 1):
+            if len(padded) < size:
+                break
+            for start in range(len(padded) - size + 1):
+                yield padded[start : start + size]
+
+
+class HashedNgramEmbedder(Embedder):
+    """
+    TF-IDF sur n-grammes de caractères hachés (crc32, stable entre processus)
+    Poids: tf sous-linéaire (1 + log tf) x idf appris sur le catalogue (fit)
+    """
+
+    def __init__(self, dim: int = NGRAM_DIM, ngram_range=NGRAM_RANGE):
+        import numpy as np
+
+        self.dim = dim
+        self.ngram_range = ngram_range
+        self.name = f"ngram{ngram_range[0]}{ngram_range[1]}_{dim}"
+        self.idf = np.ones(dim, dtype=np.float32)
+
+    def _counts(self, text: str) -> Dict[int, int]:
+        counts: Dict[int, int] = {}
+        for ngram in char_ngrams(text, self.ngram_range):
+            bucket = zlib.crc32(ngram.encode()) % self.dim
+            counts[bucket] = counts.get(bucket, 0) + 1
+        return counts
+
+    def fit(self, corpus: List[str]) -> "HashedNgramEmbedder":
+        """idf lissé: log((1 + N) / (1 + df)) + 1, comme scikit-learn"""
+        import numpy as np
+
+        document_frequency = np.zeros(self.dim, dtype=np.float32)
+        for text in corpus:
+            document_frequency[list(self._counts(text))] += 1
+        self.idf = (np.log((1 + len(corpus)) / (1 + document_frequency)) + 1).astype(
+            np.float32
+        )
+        return self
+
+    def encode(self, texts: List[str]) -> "np.ndarray":
+        import numpy as np
+
+        matrix = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for bucket, count in self._counts(text).items():
+                matrix[row, bucket] = 1 + math.log(count)
+        matrix *= self.idf
+        return l2_normalize(matrix)
+
+
+def l2_normalize(matrix: "np.ndarray") -> "np.ndarray":
+    """Lignes de norme 1, sur place (lignes nulles inchangées)"""
+    import numpy as np
+
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    np.divide(matrix, norms, out=matrix, where=norms > 0)
+    return matrix
+
+
+def create_embedder(backend: str = EMBEDDER_BACKEND) -> Embedder:
+    """
+    Embedder du backend demandé; auto: MiniLM si sentence-transformers est
+    installé, sinon n-grammes (NumPy seulement)
+    """
+
+    if backend == "ngram":
+        return HashedNgramEmbedder()
+    if backend in ("minilm", "auto"):
+        try:
+            return SentenceTransformerEmbedder()
+        except ImportError:
+            if backend == "minilm":
+                raise
+            print("ℹ️ sentence-transformers absent: embeddings n-grammes (NumPy)")
+            return HashedNgramEmbedder()
+    raise ValueError(f"Embedder inconnu: {backend} (auto, minilm ou ngram)")
@@ -0,0 +1,278 @@
+"""
+RAMQ Billing Assistant - Export de l'historique des encounters
+Lecture en continu (curseur + fetchmany) vers CSV, NDJSON ou Parquet
+La mémoire reste constante, peu importe le nombre de lignes exportées
+"""
+
+import csv
+import io
+import json
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from app.core import db
+
+# Colonnes exportées (ordre stable pour CSV/Parquet)
+EXPORT_COLUMNS = [
+    "id",
+    "physician_id",
+    "triage_level",
+    "chief_complaint",
+    "procedures",
+    "duration_minutes",
+    "encounter_datetime",
+    "suggested_codes",
+    "selected_code",
+    "total_fee",
+    "created_at",
+]
+
+EXPORT_FORMATS = {
+    "csv": ("text/csv; charset=utf-8", "csv"),
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+
+# Nombre de lignes lues à la fois (et taille des row groups Parquet)
+DEFAULT_BATCH_SIZE = 5000
+
+
+def build_export_query(
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    physician_id: Optional[str] = None,
+) -> Tuple[str, List]:
+    """
+    Construit la requête SQL filtrée
+
+    - start: date/heure ISO incluse (encounter_datetime >= start)
+    - end: date/heure ISO exclue (encounter_datetime < end)
+    - physician_id: médecin exact
+    """
+
+    clauses = []
+    params: List = []
+
+    if start:
+        clauses.append("encounter_datetime >= ?")
+        params.append(start)
+    if end:
+        clauses.append("encounter_datetime < ?")
+        params.append(end)
+    if physician_id:
+        clauses.append("physician_id = ?")
+        params.append(physician_id)
+
+    query = f"SELECT {', '.join(EXPORT_COLUMNS)} FROM encounters"
+    if clauses:
+        query += " WHERE " + " AND ".join(clauses)
+    # Ordre par id: suit la clé primaire, aucun tri en mémoire côté SQLite
+    query += " ORDER BY id"
+
+    return query, params
+
+
+def iter_encounter_batches(
+    db_path: str,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    physician_id: Optional[str] = None,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+) -> Iterator[List[tuple]]:
+    """
+    Itère sur les encounters par lots de `batch_size` lignes
+
+    La connexion est ouverte avec check_same_thread=False: StreamingResponse
+    consomme les générateurs synchrones depuis le threadpool, chaque lot peut
+    donc être lu par un thread différent.
+    """
+
+    query, params = build_export_query(start, end, physician_id)
+
+    conn = db.connect(db_path, check_same_thread=False)
+    try:
+        cursor = conn.cursor()
+        cursor.arraysize = batch_size
+        cursor.execute(query, params)
+
+        while True:
+            rows = cursor.fetchmany()
+            if not rows:
+                break
+            yield rows
+    finally:
+        conn.close()
+
+
+def stream_csv(batches: Iterator[List[tuple]]) -> Iterator[bytes]:
+    """Sérialise les lots en CSV (en-tête + une ligne par encounter)"""
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+
+    for rows in batches:
+        writer.writerows(rows)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate(0)
+
+    # En-tête seul si aucun encounter
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+def stream_ndjson(batches: Iterator[List[tuple]]) -> Iterator[bytes]:
+    """Sérialise les lots en NDJSON (un objet JSON par ligne)"""
+
+    for rows in batches:
+        lines = [
+            json.dumps(dict(zip(EXPORT_COLUMNS, row)), ensure_ascii=False)
+            for row in rows
+        ]
+        yield ("\n".join(lines) + "\n").encode("utf-8")
+
+
+class _ChunkSink:
+    """
+    Fichier en écriture seule qui accumule les octets entre deux lectures
+    Permet à ParquetWriter d'écrire row group par row group sans tout garder
+    """
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def writable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return False
+
+    def readable(self) -> bool:
+        return False
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def parquet_available() -> bool:
+    """Vérifie si pyarrow est installé (optionnel)"""
+    try:
+        import pyarrow  # noqa: F401
+        import pyarrow.parquet  # noqa: F401
+
+        return True
+    except ImportError:
+        return False
+
+
+def stream_parquet(batches: Iterator[List[tuple]]) -> Iterator[bytes]:
+    """
+    Sérialise les lots en Parquet (un row group par lot)
+    Nécessite pyarrow (installé avec pandas)
+    """
+
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema(
+        [
+            ("id", pa.int64()),
+            ("physician_id", pa.string()),
+            ("triage_level", pa.int64()),
+            ("chief_complaint", pa.string()),
+            ("procedures", pa.string()),
+            ("duration_minutes", pa.int64()),
+            ("encounter_datetime", pa.string()),
+            ("suggested_codes", pa.string()),
+            ("selected_code", pa.string()),
+            ("total_fee", pa.float64()),
+            ("created_at", pa.string()),
+        ]
+    )
+
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema, compression="snappy")
+
+    try:
+        for rows in batches:
+            columns = [list(column) for column in zip(*rows)]
+            table = pa.Table.from_arrays(
+                [
+                    pa.array(values, type=field.type)
+                    for values, field in zip(columns, schema)
+                ],
+                schema=schema,
+            )
+            writer.write_table(table)
+            data = sink.drain()
+            if data:
+                yield data
+    finally:
+        writer.close()
+
+    # Pied de page Parquet (métadonnées)
+    data = sink.drain()
+    if data:
+        yield data
+
+
+def stream_export(
+    db_path: str,
+    export_format: str = "csv",
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    physician_id: Optional[str] = None,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+) -> Iterator[bytes]:
+    """
+    Retourne un générateur d'octets pour le format demandé
+
+    Raises:
+        ValueError: format inconnu
+        ImportError: Parquet demandé sans pyarrow
+    """
+
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(
+            f"Format inconnu: {export_format} (choix: {', '.join(EXPORT_FORMATS)})"
+        )
+    if export_format == "parquet" and not parquet_available():
+        raise ImportError("Export Parquet non disponible: installer pyarrow")
+
+    batches = iter_encounter_batches(db_path, start, end, physician_id, batch_size)
+
+    if export_format == "csv":
+        return stream_csv(batches)
+    if export_format == "ndjson":
+        return stream_ndjson(batches)
+    return stream_parquet(batches)
+
+
+def export_filename(export_format: str, filters: Dict[str, Optional[str]]) -> str:
+    """Nom de fichier suggéré pour le téléchargement"""
+
+    parts = ["encounters"]
+    for key in ("physician_id", "start", "end"):
+        value = filters.get(key)
+        if value:
+            parts.append(str(value)[:10].replace(":", "-"))
+    return f"{'_'.join(parts)}.{EXPORT_FORMATS[export_format][1]}"
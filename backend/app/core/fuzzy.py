@@ -0,0 +1,237 @@
+"""
+RAMQ Billing Assistant - Correspondance tolérante aux fautes de frappe
+Dictionnaire de suppressions (style SymSpell) construit au chargement du catalogue
+"sutre" -> suture, "platre" -> plâtre, "eletrocardiogram" -> electrocardiogram
+"""
+
+import re
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from app.core.catalog import CodeCatalog
+from app.core.text import normalize_text
+
+# Distance d'édition maximale indexée
+DEFAULT_MAX_DISTANCE = 2
+
+# Seuls les N premiers caractères génèrent des suppressions (mémoire bornée)
+DEFAULT_PREFIX_LENGTH = 7
+
+_WORD_RE = re.compile(r"\w+")
+
+
+def allowed_distance(word: str, max_distance: int = DEFAULT_MAX_DISTANCE) -> int:
+    """Mots courts: une seule faute tolérée ("ecg" ne doit pas devenir "ecx")"""
+    return min(max_distance, 1 if len(word) <= 4 else 2)
+
+
+def edit_distance(a: str, b: str, max_distance: int) -> int:
+    """
+    Distance de Damerau-Levenshtein (transpositions adjacentes)
+    Arrêt anticipé: retourne max_distance + 1 dès que la borne est dépassée
+    """
+
+    if a == b:
+        return 0
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+
+    previous_previous = None
+    previous = list(range(len(b) + 1))
+
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        row_min = i
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            value = min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + cost,
+            )
+            if (
+                previous_previous is not None
+                and i > 1
+                and j > 1
+                and a[i - 1] == b[j - 2]
+                and a[i - 2] == b[j - 1]
+            ):
+                value = min(value, previous_previous[j - 2] + 1)
+            current[j] = value
+            row_min = min(row_min, value)
+
+        if row_min > max_distance:
+            return max_distance + 1
+        previous_previous, previous = previous, current
+
+    return previous[-1]
+
+
+def _deletes(word: str, max_distance: int) -> Set[str]:
+    """Toutes les variantes obtenues en supprimant jusqu'à max_distance caractères"""
+
+    results = {word}
+    frontier = {word}
+    for _ in range(max_distance):
+        next_frontier = set()
+        for variant in frontier:
+            for i in range(len(variant)):
+                deleted = variant[:i] + variant[i + 1 :]
+                if deleted not in results:
+                    next_frontier.add(deleted)
+        results |= next_frontier
+        frontier = next_frontier
+    return results
+
+
+class FuzzyMatcher:
+    """
+    Correcteur orthographique sur un vocabulaire fermé
+    La recherche ne compare que les termes partageant une suppression
+    avec le mot saisi (quelques dizaines au lieu du vocabulaire entier)
+    """
+
+    def __init__(
+        self,
+        words: Iterable[str],
+        max_distance: int = DEFAULT_MAX_DISTANCE,
+        prefix_length: int = DEFAULT_PREFIX_LENGTH,
+    ):
+        self.max_distance = max_distance
+        self.prefix_length = prefix_length
+        # Terme normalisé -> fréquence, et forme d'origine la plus fréquente
+        self.frequencies: Dict[str, int] = {}
+        self.surface: Dict[str, str] = {}
+        self._surface_counts: Dict[Tuple[str, str], int] = {}
+        self._deletes: Dict[str, Set[str]] = {}
+
+        for word in words:
+            self.add(word)
+
+    def add(self, word: str):
+        """Ajoute un mot (forme d'origine conservée pour l'affichage et LIKE)"""
+
+        surface = word.lower()
+        term = normalize_text(surface)
+        if len(term) < 2:
+            return
+
+        self.frequencies[term] = self.frequencies.get(term, 0) + 1
+        key = (term, surface)
+        self._surface_counts[key] = self._surface_counts.get(key, 0) + 1
+        best = self.surface.get(term)
+        if (
+            best is None
+            or self._surface_counts[key] > self._surface_counts[(term, best)]
+        ):
+            self.surface[term] = surface
+
+        if self.frequencies[term] == 1:
+            for variant in _deletes(term[: self.prefix_length], self.max_distance):
+                self._deletes.setdefault(variant, set()).add(term)
+
+    def lookup(
+        self,
+        word: str,
+        max_distance: Optional[int] = None,
+        top_k: int = 5,
+    ) -> List[Tuple[str, int, int]]:
+        """
+        Retourne les termes les plus proches: (terme, distance, fréquence)
+        Triés par distance croissante puis fréquence décroissante
+        """
+
+        term = normalize_text(word.lower())
+        if not term:
+            return []
+        if max_distance is None:
+            max_distance = allowed_distance(term, self.max_distance)
+        max_distance = min(max_distance, self.max_distance)
+
+        candidates: Set[str] = set()
+        for variant in _deletes(term[: self.prefix_length], max_distance):
+            candidates |= self._deletes.get(variant, set())
+
+        matches = []
+        for candidate in candidates:
+            distance = edit_distance(term, candidate, max_distance)
+            if distance <= max_distance:
+                matches.append((candidate, distance, self.frequencies[candidate]))
+
+        matches.sort(key=lambda m: (m[1], -m[2], m[0]))
+        return matches[:top_k]
+
+    def correct(self, word: str) -> Optional[str]:
+        """Meilleure correction (forme d'origine) ou None si aucune"""
+
+        matches = self.lookup(word, top_k=1)
+        return self.surface[matches[0][0]] if matches else None
+
+    def correct_query(self, text: str) -> str:
+        """Corrige chaque mot inconnu; les mots connus restent inchangés"""
+
+        words = []
+        for word in _WORD_RE.findall(text.lower()):
+            if normalize_text(word) in self.frequencies:
+                words.append(word)
+            else:
+                words.append(self.correct(word) or word)
+        return " ".join(words)
+
+    def __len__(self) -> int:
+        return len(self.frequencies)
+
+
+class FuzzyCodeMatcher:
+    """Recherche tolérante aux fautes dans les descriptions du catalogue"""
+
+    def __init__(self, catalog: CodeCatalog, extra_words: Iterable[str] = ()):
+        """
+        Args:
+            catalog: catalogue en mémoire (CodeCatalog)
+            extra_words: mots-clés des règles, ajoutés au vocabulaire
+        """
+        self.catalog = catalog
+        self.rows_by_term: Dict[str, Set[int]] = {}
+
+        words = []
+        for idx, text in enumerate(catalog.texts()):
+            for word in _WORD_RE.findall(text.lower()):
+                words.append(word)
+                self.rows_by_term.setdefault(normalize_text(word), set()).add(idx)
+
+        self.matcher = FuzzyMatcher(list(words) + list(extra_words))
+
+    def search(self, query: str, top_k: int = 10) -> List[Dict]:
+        """
+        Codes dont la description contient les mots de la requête (ou proches)
+        Score: somme par mot de 1 / (1 + distance), ex-aequo dans l'ordre du catalogue
+        """
+
+        # Ligne -> mot saisi -> (terme retenu, poids): meilleur terme par mot
+        matched: Dict[int, Dict[str, Tuple[str, float]]] = {}
+
+        for word in _WORD_RE.findall(query.lower()):
+            if len(normalize_text(word)) < 2:
+                continue
+            for term, distance, _ in self.matcher.lookup(word, top_k=3):
+                weight = 1.0 / (1 + distance)
+                for idx in self.rows_by_term.get(term, ()):
+                    current = matched.setdefault(idx, {}).get(word)
+                    if current is None or weight > current[1]:
+                        matched[idx][word] = (self.matcher.surface[term], weight)
+
+        scores = {
+            idx: sum(weight for _, weight in words.values())
+            for idx, words in matched.items()
+        }
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:top_k]
+
+        results = []
+        for idx, score in ranked:
+            entry = self.catalog.entry(idx)
+            entry["score"] = round(score, 4)
+            entry["matched_terms"] = {
+                word: term for word, (term, _) in matched[idx].items()
+            }
+            results.append(entry)
+        return results
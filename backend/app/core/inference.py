@@ -0,0 +1,321 @@
+"""
+RAMQ Billing Assistant - Exécuteur d'inférence (embeddings) hors processus
+Le modèle vit dans un processus dédié: l'encodage ne tient plus le GIL du
+worker API. Les requêtes arrivent par une file, sont regroupées en micro-lots
+(fenêtre de quelques ms) et les vecteurs reviennent par mémoire partagée;
+seuls les numéros de case transitent par les files.
+
+Activé avec RAMQ_INFERENCE_EXECUTOR=1 (voir LocalAIEngine.load_embeddings_model)
+"""
+
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from multiprocessing import get_context
+from multiprocessing.shared_memory import SharedMemory
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+from app.core.embeddings import l2_normalize
+
+# Regroupement: attendre au plus BATCH_WINDOW_MS après la 1re requête du lot
+MAX_BATCH = int(os.getenv("RAMQ_INFERENCE_MAX_BATCH", "32"))
+BATCH_WINDOW_MS = float(os.getenv("RAMQ_INFERENCE_BATCH_WINDOW_MS", "2"))
+
+# Cases de résultat en mémoire partagée (requêtes simultanées max)
+RESULT_SLOTS = 256
+
+# Chargement du modèle dans le processus d'inférence
+STARTUP_TIMEOUT = 300.0
+
+# Attente des résultats: vie du processus vérifiée à cet intervalle (s); s'il
+# est mort, les requêtes en attente échouent aussitôt au lieu d'expirer
+LIVENESS_INTERVAL = 0.5
+
+
+def load_sentence_transformer(model_name: str):
+    """Fabrique par défaut (importée dans le processus d'inférence seulement)"""
+    from sentence_transformers import SentenceTransformer
+
+    return SentenceTransformer(model_name)
+
+
+def _worker_main(
+    encoder_factory: Callable,
+    model_name: str,
+    requests,
+    results,
+    max_batch: int,
+    batch_window: float,
+):
+    """Boucle du processus d'inférence"""
+
+    try:
+        encoder = encoder_factory(model_name)
+        dim = len(np.asarray(encoder.encode(["ramq"]))[0])
+    except Exception as e:
+        results.put(("error", str(e)))
+        return
+    results.put(("ready", dim))
+
+    # Le client crée la mémoire partagée une fois la dimension connue
+    _, shm_name, slots = requests.get()
+    shm = SharedMemory(name=shm_name)
+    vectors = np.ndarray((slots, dim), dtype=np.float32, buffer=shm.buf)
+
+    stopping = False
+    while not stopping:
+        item = requests.get()
+        if item is None:
+            break
+        batch = [item]
+
+        deadline = time.monotonic() + batch_window
+        while len(batch) < max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = requests.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is None:
+                stopping = True
+                break
+            batch.append(item)
+
+        slot_ids = [slot for _, slot, _ in batch]
+        try:
+            # Même contrat que les embedders en processus: lignes normalisées (L2)
+            encoded = l2_normalize(
+                np.array(
+                    encoder.encode([text for _, _, text in batch]), dtype=np.float32
+                )
+            )
+            vectors[slot_ids] = encoded
+            results.put(("done", slot_ids))
+        except Exception as e:
+            results.put(("failed", slot_ids, str(e)))
+
+    del vectors
+    shm.close()
+
+
+class InferenceExecutor:
+    """
+    Client du processus d'inférence (un par processus API)
+
+    Usage:
+        executor = InferenceExecutor("all-MiniLM-L6-v2")
+        executor.start()
+        vector = executor.embed("douleur thoracique")
+    """
+
+    def __init__(
+        self,
+        model_name: str,
+        encoder_factory: Callable = load_sentence_transformer,
+        max_batch: int = MAX_BATCH,
+        batch_window_ms: float = BATCH_WINDOW_MS,
+        slots: int = RESULT_SLOTS,
+        on_batch: Optional[Callable[[int], None]] = None,
+    ):
+        self.model_name = model_name
+        self.encoder_factory = encoder_factory
+        self.max_batch = max_batch
+        self.batch_window = batch_window_ms / 1000
+        self.slots = slots
+        self.on_batch = on_batch
+        self.dim = None
+        self._pid = None
+        self._start_lock = threading.Lock()
+
+    @property
+    def running(self) -> bool:
+        return self._pid == os.getpid() and self._process.is_alive()
+
+    def start(self):
+        """Démarre le processus d'inférence et attend le chargement du modèle"""
+
+        with self._start_lock:
+            if self.running:
+                return
+
+            # spawn: processus neuf, sans l'état (ni les threads) du worker API
+            ctx = get_context("spawn")
+            self._requests = ctx.Queue()
+            self._results = ctx.Queue()
+            self._process = ctx.Process(
+                target=_worker_main,
+                args=(
+                    self.encoder_factory,
+                    self.model_name,
+                    self._requests,
+                    self._results,
+                    self.max_batch,
+                    self.batch_window,
+                ),
+                name="ramq-inference",
+                daemon=True,
+            )
+            self._process.start()
+
+            message = self._wait_ready()
+            if message[0] == "error":
+                self._process.join(timeout=5)
+                raise RuntimeError(f"Processus d'inférence: {message[1]}")
+            self.dim = message[1]
+
+            self._shm = SharedMemory(create=True, size=self.slots * self.dim * 4)
+            self._vectors = np.ndarray(
+                (self.slots, self.dim), dtype=np.float32, buffer=self._shm.buf
+            )
+            self._requests.put(("attach", self._shm.name, self.slots))
+
+            self._free_slots: "queue.Queue[int]" = queue.Queue()
+            for slot in range(self.slots):
+                self._free_slots.put(slot)
+            self._pending: Dict[int, Future] = {}
+            self._pending_lock = threading.Lock()
+            self._closed = False
+            self._stopping = False
+
+            self._listener = threading.Thread(
+                target=self._listen, name="ramq-inference-results", daemon=True
+            )
+            self._listener.start()
+            self._pid = os.getpid()
+            print(
+                f"✅ Processus d'inférence prêt (pid {self._process.pid}, dim {self.dim})"
+            )
+
+    def _wait_ready(self):
+        """Premier message du processus (dimension ou erreur); échoue s'il meurt avant"""
+
+        deadline = time.monotonic() + STARTUP_TIMEOUT
+        while time.monotonic() < deadline:
+            try:
+                return self._results.get(timeout=0.5)
+            except queue.Empty:
+                if not self._process.is_alive():
+                    return (
+                        "error",
+                        f"arrêté au démarrage (code {self._process.exitcode})",
+                    )
+        self._process.terminate()
+        return ("error", "délai de démarrage dépassé")
+
+    def _listen(self):
+        """Résout les futures à partir des numéros de case retournés"""
+
+        # État de ce processus d'inférence (un redémarrage en crée un nouveau)
+        process, results, vectors, shm = (
+            self._process,
+            self._results,
+            self._vectors,
+            self._shm,
+        )
+        pending, pending_lock, free_slots = (
+            self._pending,
+            self._pending_lock,
+            self._free_slots,
+        )
+        while True:
+            try:
+                message = results.get(timeout=LIVENESS_INTERVAL)
+            except queue.Empty:
+                if process.is_alive() or self._stopping:
+                    continue
+                self._fail_pending(process, pending, pending_lock)
+                # Prochain appel: nouveau processus (start); l'ancienne mémoire partagée est libérée
+                del vectors
+                if self._process is process:
+                    del self._vectors
+                try:
+                    shm.close()
+                except BufferError:
+                    pass  # Tableau encore référencé: libéré avec lui
+                shm.unlink()
+                break
+            if message is None:
+                break
+            status, slot_ids = message[0], message[1]
+            if status == "done" and self.on_batch:
+                self.on_batch(len(slot_ids))
+            for slot in slot_ids:
+                with pending_lock:
+                    future = pending.pop(slot, None)
+                if status == "done":
+                    vector = vectors[slot].copy()
+                free_slots.put(slot)
+                if future is None:
+                    continue
+                if status == "done":
+                    future.set_result(vector)
+                else:
+                    future.set_exception(
+                        RuntimeError(f"Erreur d'inférence: {message[2]}")
+                    )
+
+    def _fail_pending(
+        self, process, pending: Dict[int, Future], pending_lock: threading.Lock
+    ):
+        """Processus mort: échec immédiat des requêtes en attente"""
+
+        reason = f"processus d'inférence arrêté (code {process.exitcode})"
+        with pending_lock:
+            if self._process is process:
+                self._closed = True
+            futures = list(pending.values())
+            pending.clear()
+        for future in futures:
+            future.set_exception(RuntimeError(f"Erreur d'inférence: {reason}"))
+        print(f"⚠️ {reason}: {len(futures)} requête(s) en échec")
+
+    def submit(self, text: str) -> Future:
+        """Soumet un texte; la future reçoit son vecteur (float32)"""
+
+        if not self.running:
+            # Premier appel, ou processus hérité d'un fork: exécuteur propre à ce processus
+            self.start()
+        slot = self._free_slots.get()
+        future: Future = Future()
+        with self._pending_lock:
+            if self._closed:
+                # Processus mort entre la vérification et l'envoi
+                raise RuntimeError("Erreur d'inférence: processus d'inférence arrêté")
+            self._pending[slot] = future
+        self._requests.put(("encode", slot, text))
+        return future
+
+    def embed(self, text: str, timeout: float = 30.0) -> np.ndarray:
+        return self.submit(text).result(timeout=timeout)
+
+    def embed_many(self, texts: List[str], timeout: float = 300.0) -> np.ndarray:
+        """Encode une liste (regroupée en lots par le processus d'inférence)"""
+
+        futures = [self.submit(text) for text in texts]
+        if not futures:
+            return np.zeros((0, self.dim or 0), dtype=np.float32)
+        return np.stack([future.result(timeout=timeout) for future in futures])
+
+    def shutdown(self):
+        """Arrête le processus d'inférence de ce processus (redémarré au prochain appel)"""
+
+        with self._start_lock:
+            if not self.running:
+                return
+            self._stopping = True
+            self._requests.put(None)
+            self._process.join(timeout=10)
+            if self._process.is_alive():
+                self._process.terminate()
+            self._results.put(None)
+            self._listener.join(timeout=5)
+            del self._vectors
+            self._shm.close()
+            self._shm.unlink()
+            self._pid = None
@@ -7,19 +7,72 @@ import sqlite3
 from pathlib import Path
 from datetime import datetime
 
+# Version du catalogue: incrémentée par trigger à chaque modification de ramq_codes
+# Sert aux ETags et à l'invalidation des index en mémoire
+CATALOG_VERSION_SCHEMA = """
+CREATE TABLE IF NOT EXISTS catalog_meta (
+    key VARCHAR(50) PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+
+INSERT OR IGNORE INTO catalog_meta (key, value) VALUES ('version', 1);
+
+CREATE TRIGGER IF NOT EXISTS trg_codes_version_insert AFTER INSERT ON ramq_codes
+BEGIN
+    UPDATE catalog_meta SET value = value + 1 WHERE key = 'version';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_codes_version_update AFTER UPDATE ON ramq_codes
+BEGIN
+    UPDATE catalog_meta SET value = value + 1 WHERE key = 'version';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_codes_version_delete AFTER DELETE ON ramq_codes
+BEGIN
+    UPDATE catalog_meta SET value = value + 1 WHERE key = 'version';
+END;
+"""
+
+
+# Raffinements distants émis (mode spéculatif): tout worker reconnaît un id
+# émis par un autre et répond 404 aux ids jamais émis
+REFINEMENTS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS ai_refinements (
+    refinement_id VARCHAR(128) PRIMARY KEY,
+    cache_key VARCHAR(64) NOT NULL,
+    status VARCHAR(20) NOT NULL DEFAULT 'pending',
+    error TEXT,
+    created_at TIMESTAMP NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_refinements_created ON ai_refinements(created_at);
+"""
+
+
+def migrate_database(db_path: str = "data/ramq.db"):
+    """Applique les ajouts de schéma aux bases existantes (idempotent)"""
+
+    conn = sqlite3.connect(db_path)
+    conn.executescript(CATALOG_VERSION_SCHEMA)
+    conn.executescript(REFINEMENTS_SCHEMA)
+    conn.commit()
+    conn.close()
+
+
 def init_database(db_path: str = "data/ramq.db"):
     """Initialise la base de données avec schéma et données"""
-    
+
     # Créer le dossier data si nécessaire
     Path(db_path).parent.mkdir(parents=True, exist_ok=True)
-    
+
     print(f"🗄️ Initialisation base de données: {db_path}")
-    
+
     conn = sqlite3.connect(db_path)
     cursor = conn.cursor()
-    
+
     # Créer tables
-    cursor.executescript("""
+    cursor.executescript(
+        """
     -- Table des codes RAMQ
     CREATE TABLE IF NOT EXISTS ramq_codes (
         id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -63,21 +116,23 @@ def init_database(db_path: str = "data/ramq.db"):
     CREATE INDEX IF NOT EXISTS idx_encounters_date ON encounters(encounter_datetime);
     CREATE INDEX IF NOT EXISTS idx_cache_hash ON ai_cache(input_hash);
     CREATE INDEX IF NOT EXISTS idx_codes_category ON ramq_codes(category);
-    """)
-    
+    """
+    )
+
+    cursor.executescript(CATALOG_VERSION_SCHEMA)
+    cursor.executescript(REFINEMENTS_SCHEMA)
+
     print("✅ Schéma créé")
-    
+
     # Insérer codes RAMQ de base
     sample_codes = [
         # Codes d'examen d'urgence
         ("08.48A", "Examen en urgence - Ordinaire", 89.85, "urgence"),
         ("08.48B", "Examen en urgence - Complexe", 134.80, "urgence"),
         ("08.48C", "Examen en urgence - Très complexe", 179.75, "urgence"),
-        
         # Codes de consultation d'urgence
         ("08.49A", "Consultation en urgence - Ordinaire", 107.00, "urgence"),
         ("08.49B", "Consultation en urgence - Complexe", 161.00, "urgence"),
-        
         # Procédures courantes
         ("15.01", "Suture simple (< 7.5 cm)", 45.00, "procedure"),
         ("15.02", "Suture complexe (> 7.5 cm)", 90.00, "procedure"),
@@ -85,38 +140,36 @@ def init_database(db_path: str = "data/ramq.db"):
         ("15.04", "Suture face complexe", 135.00, "procedure"),
         ("15.05", "Plâtre membre supérieur", 60.00, "procedure"),
         ("15.06", "Plâtre membre inférieur", 75.00, "procedure"),
-        
         # Interprétations
         ("00.44", "Interprétation ECG", 15.00, "interpretation"),
         ("00.45", "Interprétation radiographie", 20.00, "interpretation"),
-        
         # Codes spéciaux
         ("08.01", "Visite à domicile", 120.00, "special"),
         ("08.02", "Consultation téléphonique", 35.00, "special"),
-        
         # Modificateurs (pour référence)
         ("MOD_NUIT", "Majoration nuit (23h-7h) +30%", 1.3, "modificateur"),
         ("MOD_FDS", "Majoration fin de semaine +20%", 1.2, "modificateur"),
         ("MOD_FERIE", "Majoration jour férié +50%", 1.5, "modificateur"),
     ]
-    
+
     cursor.executemany(
         "INSERT OR IGNORE INTO ramq_codes (code, description, base_fee, category) VALUES (?, ?, ?, ?)",
-        sample_codes
+        sample_codes,
     )
-    
+
     conn.commit()
-    
+
     # Vérifier insertion
     cursor.execute("SELECT COUNT(*) FROM ramq_codes")
     count = cursor.fetchone()[0]
-    
+
     conn.close()
-    
+
     print(f"✅ {count} codes RAMQ chargés")
     print(f"✅ Base de données prête: {db_path}")
-    
+
     return db_path
 
+
 if __name__ == "__main__":
     init_database()
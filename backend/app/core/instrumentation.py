@@ -0,0 +1,193 @@
+"""
+RAMQ Billing Assistant - Instrumentation du chemin critique
+Chronomètres monotones par étape, histogrammes (p50/p95/p99) et compteurs
+Désactivée: stage() retourne un contexte nul partagé (aucune allocation),
+les compteurs restent actifs
+Mises à jour sous verrou: appelées depuis la boucle, le threadpool, le
+regroupeur et le thread d'écoute de l'inférence
+"""
+
+import math
+import os
+import threading
+import time
+from contextlib import nullcontext
+from typing import Dict, List, Optional
+
+# Histogramme log-linéaire: ~5% de précision de 1 µs à ~100 s
+_BUCKET_GROWTH = 1.05
+_MIN_NS = 1_000
+_BUCKET_COUNT = int(math.log(1e11 / _MIN_NS) / math.log(_BUCKET_GROWTH)) + 2
+_LOG_GROWTH = math.log(_BUCKET_GROWTH)
+
+_NULL_STAGE = nullcontext()
+
+
+class LatencyHistogram:
+    """Histogramme à seaux géométriques: enregistrement O(1), mémoire fixe"""
+
+    __slots__ = ("counts", "count", "total_ns", "max_ns")
+
+    def __init__(self):
+        self.counts: List[int] = [0] * _BUCKET_COUNT
+        self.count = 0
+        self.total_ns = 0
+        self.max_ns = 0
+
+    @staticmethod
+    def _bucket(elapsed_ns: int) -> int:
+        if elapsed_ns <= _MIN_NS:
+            return 0
+        return min(
+            int(math.log(elapsed_ns / _MIN_NS) / _LOG_GROWTH) + 1, _BUCKET_COUNT - 1
+        )
+
+    @staticmethod
+    def _upper_bound_ns(bucket: int) -> float:
+        return _MIN_NS * _BUCKET_GROWTH**bucket
+
+    def record(self, elapsed_ns: int):
+        self.counts[self._bucket(elapsed_ns)] += 1
+        self.count += 1
+        self.total_ns += elapsed_ns
+        if elapsed_ns > self.max_ns:
+            self.max_ns = elapsed_ns
+
+    def copy(self) -> "LatencyHistogram":
+        histogram = LatencyHistogram()
+        histogram.counts = list(self.counts)
+        histogram.count = self.count
+        histogram.total_ns = self.total_ns
+        histogram.max_ns = self.max_ns
+        return histogram
+
+    def percentile(self, q: float) -> float:
+        """Borne supérieure du seau contenant le quantile q (0-100), en ns"""
+
+        if not self.count:
+            return 0.0
+        rank = max(1, math.ceil(self.count * q / 100))
+        seen = 0
+        for bucket, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if seen >= rank:
+                return min(self._upper_bound_ns(bucket), float(self.max_ns))
+        return float(self.max_ns)
+
+    def summary(self) -> Dict:
+        """Résumé en millisecondes"""
+
+        if not self.count:
+            return {"count": 0}
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total_ns / self.count / 1e6, 3),
+            "p50_ms": round(self.percentile(50) / 1e6, 3),
+            "p95_ms": round(self.percentile(95) / 1e6, 3),
+            "p99_ms": round(self.percentile(99) / 1e6, 3),
+            "max_ms": round(self.max_ns / 1e6, 3),
+        }
+
+
+class _Stage:
+    """Chronomètre d'une étape (perf_counter_ns, horloge monotone)"""
+
+    __slots__ = ("registry", "name", "timings", "started")
+
+    def __init__(self, registry: "Instrumentation", name: str, timings: Optional[Dict]):
+        self.registry = registry
+        self.name = name
+        self.timings = timings
+
+    def __enter__(self):
+        self.started = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed = time.perf_counter_ns() - self.started
+        if self.registry.enabled:
+            self.registry.record(self.name, elapsed)
+        if self.timings is not None:
+            self.timings[self.name] = round(
+                self.timings.get(self.name, 0.0) + elapsed / 1e6, 3
+            )
+        return False
+
+
+class Instrumentation:
+    """
+    Registre des mesures du moteur
+
+    Usage:
+        with instrumentation.stage("check_cache", timings):
+            ...
+        instrumentation.count("cache_hits_sqlite")
+    """
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self.histograms: Dict[str, LatencyHistogram] = {}
+        self.counters: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def stage(self, name: str, timings: Optional[Dict] = None):
+        """
+        Chronomètre une étape
+        timings: dict de la requête à compléter (détail par requête),
+        mesuré même si l'instrumentation globale est désactivée
+        """
+        if not self.enabled and timings is None:
+            return _NULL_STAGE
+        return _Stage(self, name, timings)
+
+    def record(self, name: str, elapsed_ns: int):
+        with self._lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = LatencyHistogram()
+            histogram.record(elapsed_ns)
+
+    def count(self, name: str, value: int = 1):
+        # Toujours actif (une addition sous verrou): alimente aussi /metrics
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def counters_snapshot(self) -> Dict[str, int]:
+        """Copie cohérente des compteurs (lecture pendant les mises à jour d'autres threads)"""
+        with self._lock:
+            return dict(self.counters)
+
+    def histograms_snapshot(self) -> Dict[str, LatencyHistogram]:
+        """Copie des histogrammes par étape (chacun copié, sans enregistrement en cours)"""
+        with self._lock:
+            return {
+                name: histogram.copy() for name, histogram in self.histograms.items()
+            }
+
+    def snapshot(self) -> Dict:
+        """État courant: résumé par étape + compteurs + taux de cache"""
+
+        counters = self.counters_snapshot()
+        hits = sum(v for k, v in counters.items() if k.startswith("cache_hits_"))
+        lookups = hits + counters.get("cache_misses", 0)
+
+        return {
+            "enabled": self.enabled,
+            "stages": {
+                name: h.summary()
+                for name, h in sorted(self.histograms_snapshot().items())
+            },
+            "counters": counters,
+            "cache_hit_ratio": round(hits / lookups, 4) if lookups else None,
+        }
+
+    def reset(self):
+        with self._lock:
+            self.histograms = {}
+            self.counters = {}
+
+
+# Instance partagée par le moteur et l'API (RAMQ_INSTRUMENTATION=1 pour activer)
+instrumentation = Instrumentation(
+    enabled=os.getenv("RAMQ_INSTRUMENTATION", "0").lower() in ("1", "true", "yes")
+)
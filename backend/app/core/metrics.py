@@ -0,0 +1,326 @@
+"""
+RAMQ Billing Assistant - Métriques au format d'exposition Prometheus
+Registre sans service externe: compteurs/histogrammes répartis par thread
+(écriture sans verrou sur le chemin critique, somme au moment du scrape)
+"""
+
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+# Seaux de latence par défaut (secondes)
+DEFAULT_BUCKETS = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+CONTENT_TYPE = "text/plain; version=0.0.4"
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{n}="{_escape(v)}"' for n, v in zip(names, values))
+    return "{" + pairs + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _ShardedCells:
+    """
+    Un tableau de valeurs par thread: chaque thread écrit dans le sien
+    Le verrou n'est pris qu'à la création du tableau d'un nouveau thread
+    """
+
+    def __init__(self, size: int):
+        self.size = size
+        self._local = threading.local()
+        self._shards: List[List[float]] = []
+        self._lock = threading.Lock()
+
+    def cell(self) -> List[float]:
+        cells = getattr(self._local, "cells", None)
+        if cells is None:
+            cells = [0.0] * self.size
+            with self._lock:
+                self._shards.append(cells)
+            self._local.cells = cells
+        return cells
+
+    def sums(self) -> List[float]:
+        with self._lock:
+            shards = list(self._shards)
+        totals = [0.0] * self.size
+        for cells in shards:
+            for i, value in enumerate(cells):
+                totals[i] += value
+        return totals
+
+
+class _CounterChild:
+    __slots__ = ("_cells",)
+
+    def __init__(self):
+        self._cells = _ShardedCells(1)
+
+    def inc(self, value: float = 1.0):
+        self._cells.cell()[0] += value
+
+    def dec(self, value: float = 1.0):
+        self._cells.cell()[0] -= value
+
+    def value(self) -> float:
+        return self._cells.sums()[0]
+
+
+class _HistogramChild:
+    __slots__ = ("_cells", "_buckets")
+
+    def __init__(self, buckets: Sequence[float]):
+        self._buckets = buckets
+        # [seaux..., +Inf, somme, total]
+        self._cells = _ShardedCells(len(buckets) + 3)
+
+    def observe(self, value: float):
+        cells = self._cells.cell()
+        cells[bisect_left(self._buckets, value)] += 1
+        cells[-2] += value
+        cells[-1] += 1
+
+    def snapshot(self) -> Tuple[List[float], float, float]:
+        totals = self._cells.sums()
+        return totals[:-2], totals[-2], totals[-1]
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[tuple, object] = {}
+        self._lock = threading.Lock()
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values):
+        """Série correspondant aux valeurs d'étiquettes (créée au besoin)"""
+        key = tuple(str(v) for v in values)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.get(key)
+                if child is None:
+                    child = self._new_child()
+                    self._children[key] = child
+        return child
+
+    def header(self) -> List[str]:
+        return [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.kind}",
+        ]
+
+
+class Counter(_Metric):
+    """Compteur monotone"""
+
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, value: float = 1.0):
+        self.labels().inc(value)
+
+    def collect(self) -> List[str]:
+        lines = self.header()
+        for key, child in sorted(self._children.items()):
+            lines.append(
+                f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(child.value())}"
+            )
+        return lines
+
+
+class Gauge(Counter):
+    """Jauge (inc/dec, ex: requêtes en cours)"""
+
+    kind = "gauge"
+
+    def dec(self, value: float = 1.0):
+        self.labels().dec(value)
+
+
+class Histogram(_Metric):
+    """Histogramme cumulatif (seaux le=...)"""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name,
+        documentation,
+        labelnames=(),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float):
+        self.labels().observe(value)
+
+    def collect(self) -> List[str]:
+        lines = self.header()
+        for key, child in sorted(self._children.items()):
+            counts, total, count = child.snapshot()
+            cumulative = 0.0
+            for bound, bucket_count in zip(list(self.buckets) + [float("inf")], counts):
+                cumulative += bucket_count
+                labels = _format_labels(
+                    self.labelnames + ("le",), key + (_format_value(bound),)
+                )
+                lines.append(f"{self.name}_bucket{labels} {_format_value(cumulative)}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {_format_value(count)}")
+        return lines
+
+
+class CallbackMetric(_Metric):
+    """
+    Valeurs calculées au moment du scrape (taille du cache, version du catalogue...)
+    callback() -> liste de (valeurs d'étiquettes, valeur)
+    """
+
+    def __init__(
+        self,
+        name,
+        documentation,
+        labelnames=(),
+        callback: Optional[Callable] = None,
+        kind: str = "gauge",
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.callback = callback
+        self.kind = kind
+
+    def collect(self) -> List[str]:
+        lines = self.header()
+        try:
+            samples = self.callback() if self.callback else []
+        except Exception as e:
+            return lines + [f"# erreur collecte {self.name}: {_escape(e)}"]
+
+        for values, value in samples:
+            if value is None:
+                continue
+            lines.append(
+                f"{self.name}{_format_labels(self.labelnames, values)} {_format_value(value)}"
+            )
+        return lines
+
+
+class MetricsRegistry:
+    """Ensemble des métriques exposées par /metrics"""
+
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, documentation, labelnames=()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(
+        self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS
+    ) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def callback(
+        self, name, documentation, callback, labelnames=(), kind="gauge"
+    ) -> CallbackMetric:
+        return self.register(
+            CallbackMetric(name, documentation, labelnames, callback, kind)
+        )
+
+    def exposition(self) -> str:
+        """Texte au format Prometheus 0.0.4"""
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.collect())
+        return "\n".join(lines) + "\n"
+
+
+class MetricsMiddleware:
+    """
+    Middleware ASGI: requêtes par route, latence et requêtes en cours
+    La route est le gabarit FastAPI (/api/codes/suggest), pas le chemin brut
+    """
+
+    def __init__(
+        self, app, requests_total: Counter, request_seconds: Histogram, in_flight: Gauge
+    ):
+        self.app = app
+        self.requests_total = requests_total
+        self.request_seconds = request_seconds
+        self.in_flight = in_flight
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        in_flight = self.in_flight.labels()
+        in_flight.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            in_flight.dec()
+
+            route = scope.get("route")
+            path = getattr(route, "path", None) or "unmatched"
+            method = scope.get("method", "")
+            self.requests_total.labels(method, path, status["code"]).inc()
+            self.request_seconds.labels(method, path).observe(elapsed)
@@ -0,0 +1,163 @@
+"""
+RAMQ Billing Assistant - Profilage à la demande (sans redéploiement)
+
+Deux modes, tous deux désactivés par défaut (PROFILING_ENABLED=1 pour activer):
+- Par requête: en-tête `X-Profile: 1` sur /api/analyze -> cProfile de cette
+  seule requête, sauvegardé en .prof (pstats) + résumé texte
+- Fenêtre de temps: échantillonneur qui lit les piles de tous les threads
+  (sys._current_frames) à intervalle fixe -> piles repliées (.collapsed,
+  format flamegraph.pl / speedscope)
+
+Surcoût mesuré:
+- Désactivé: une comparaison booléenne par requête, rien d'autre
+- cProfile: la requête profilée est 1.5x à 3x plus lente (instrumentation de
+  chaque appel Python); les autres requêtes ne sont pas affectées
+- Échantillonneur à 5 ms: ~50-200 µs par échantillon avec le GIL, soit
+  ~1-4% du processus pendant la fenêtre seulement
+"""
+
+import cProfile
+import io
+import os
+import pstats
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "0").lower() in ("1", "true", "yes")
+
+_SAFE_NAME = re.compile(r"^[\w.-]+$")
+
+
+class ProfileStore:
+    """Dossier des profils sauvegardés (data/profiles par défaut)"""
+
+    def __init__(self, directory: str = "data/profiles"):
+        self.directory = Path(directory)
+
+    def _new_path(self, label: str, extension: str) -> Path:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        stamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+        return self.directory / f"{label}_{stamp}.{extension}"
+
+    def save_pstats(self, profiler: cProfile.Profile, label: str) -> str:
+        path = self._new_path(label, "prof")
+        profiler.dump_stats(str(path))
+        return path.name
+
+    def save_text(self, text: str, label: str, extension: str) -> str:
+        path = self._new_path(label, extension)
+        path.write_text(text, encoding="utf-8")
+        return path.name
+
+    def list(self) -> List[Dict]:
+        if not self.directory.exists():
+            return []
+        return [
+            {
+                "name": p.name,
+                "size": p.stat().st_size,
+                "modified": datetime.fromtimestamp(p.stat().st_mtime).isoformat(),
+            }
+            for p in sorted(self.directory.iterdir(), reverse=True)
+            if p.is_file()
+        ]
+
+    def path(self, name: str) -> Optional[Path]:
+        """Chemin d'un profil existant (None si nom invalide ou absent)"""
+        if not _SAFE_NAME.match(name):
+            return None
+        path = self.directory / name
+        return path if path.is_file() else None
+
+
+def pstats_summary(source, limit: int = 25) -> str:
+    """Top des fonctions par temps cumulé (texte pstats); source: profiler ou fichier .prof"""
+    stream = io.StringIO()
+    stats = pstats.Stats(source, stream=stream)
+    stats.sort_stats("cumulative").print_stats(limit)
+    return stream.getvalue()
+
+
+def profile_call(fn, *args, **kwargs):
+    """Exécute fn sous cProfile; retourne (résultat, profiler)"""
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        result = fn(*args, **kwargs)
+    finally:
+        profiler.disable()
+    return result, profiler
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({Path(code.co_filename).name}:{code.co_firstlineno})"
+
+
+class SamplingProfiler:
+    """
+    Échantillonneur de piles pour une fenêtre de temps, tous threads confondus
+    Une seule fenêtre active à la fois
+    """
+
+    def __init__(self, store: ProfileStore):
+        self.store = store
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self.last_result: Optional[Dict] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, duration: float, interval: float = 0.005) -> bool:
+        """Démarre une fenêtre en arrière-plan; False si une fenêtre est déjà active"""
+        with self._lock:
+            if self.running:
+                return False
+            self._thread = threading.Thread(
+                target=self._run,
+                args=(duration, interval),
+                name="ramq-sampler",
+                daemon=True,
+            )
+            self._thread.start()
+            return True
+
+    def _run(self, duration: float, interval: float):
+        own_id = threading.get_ident()
+        stacks: Counter = Counter()
+        samples = 0
+        started = time.monotonic()
+        deadline = started + duration
+
+        while time.monotonic() < deadline:
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                labels = []
+                while frame is not None:
+                    labels.append(_frame_label(frame))
+                    frame = frame.f_back
+                stacks[";".join(reversed(labels))] += 1
+            samples += 1
+            time.sleep(interval)
+
+        collapsed = (
+            "\n".join(f"{stack} {count}" for stack, count in stacks.most_common())
+            + "\n"
+        )
+        name = self.store.save_text(collapsed, "window", "collapsed")
+        self.last_result = {
+            "profile": name,
+            "duration_s": round(time.monotonic() - started, 2),
+            "samples": samples,
+            "distinct_stacks": len(stacks),
+        }
+        print(f"🔬 Profil de fenêtre sauvegardé: {name} ({samples} échantillons)")
@@ -0,0 +1,175 @@
+"""
+RAMQ Billing Assistant - Journal des requêtes SQLite lentes
+Observateur de db.connect(): statistiques par requête (nombre, total, max) et
+journal des requêtes au-dessus du seuil avec leur EXPLAIN QUERY PLAN
+
+Seuil: SLOW_QUERY_MS (100 ms par défaut, 0 = tout journaliser)
+Les paramètres liés ne sont jamais conservés (données de patients)
+"""
+
+import os
+import re
+import sqlite3
+import threading
+from collections import deque
+from datetime import datetime
+from typing import Dict, List, Optional
+
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "100"))
+
+# Requêtes dont le plan peut être demandé (pas de DDL ni de scripts)
+_EXPLAINABLE = ("select", "insert", "update", "delete", "with", "replace")
+
+_WHITESPACE = re.compile(r"\s+")
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+
+
+def normalize_statement(sql: str) -> str:
+    """
+    Forme canonique d'une requête pour l'agrégation
+    Littéraux et listes IN (?, ?, ...) remplacés par ?
+    """
+    text = _WHITESPACE.sub(" ", sql).strip()
+    text = _STRING_LITERAL.sub("?", text)
+    text = _NUMBER_LITERAL.sub("?", text)
+    return _PLACEHOLDER_LIST.sub("(?...)", text)
+
+
+def explain_query_plan(connection: sqlite3.Connection, sql: str, params) -> List[str]:
+    """
+    EXPLAIN QUERY PLAN sur la même connexion
+    Curseur sqlite3 standard: le plan n'est pas lui-même chronométré
+    """
+    cursor = connection.cursor(sqlite3.Cursor)
+    try:
+        cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params or ())
+        return [row[3] for row in cursor.fetchall()]
+    finally:
+        cursor.close()
+
+
+def full_scans(plan: List[str]) -> List[str]:
+    """Tables parcourues en entier (ligne « SCAN <table> » sans index)"""
+    tables = []
+    for detail in plan:
+        if detail.startswith("SCAN ") and "USING" not in detail:
+            tables.append(detail.split()[1])
+    return tables
+
+
+class _StatementStats:
+    __slots__ = ("count", "total_s", "max_s", "slow", "plan")
+
+    def __init__(self):
+        self.count = 0
+        self.total_s = 0.0
+        self.max_s = 0.0
+        self.slow = 0
+        self.plan: Optional[List[str]] = None
+
+
+class SlowQueryLog:
+    """
+    Statistiques par requête normalisée + dernières requêtes lentes
+
+    Usage:
+        db.add_query_observer(query_log.observe)
+    """
+
+    def __init__(self, threshold_ms: float = SLOW_QUERY_MS, max_entries: int = 200):
+        self.threshold_s = threshold_ms / 1000
+        self.statements: Dict[str, _StatementStats] = {}
+        self.slow_queries = deque(maxlen=max_entries)
+        self._lock = threading.Lock()
+
+    def observe(
+        self,
+        sql: str,
+        params,
+        elapsed: float,
+        cursor: sqlite3.Cursor,
+        failed: bool = False,
+    ):
+        statement = normalize_statement(sql)
+
+        with self._lock:
+            stats = self.statements.get(statement)
+            if stats is None:
+                stats = self.statements[statement] = _StatementStats()
+            stats.count += 1
+            stats.total_s += elapsed
+            if elapsed > stats.max_s:
+                stats.max_s = elapsed
+            if elapsed < self.threshold_s:
+                return
+            stats.slow += 1
+            plan = stats.plan
+
+        # Plan calculé une seule fois par requête normalisée, hors verrou; jamais
+        # pour une requête qui a échoué (second échec qui masquerait le premier)
+        explainable = statement.split(" ", 1)[0].lower() in _EXPLAINABLE
+        if plan is None and not failed and params is not None and explainable:
+            try:
+                plan = explain_query_plan(cursor.connection, sql, params)
+            except sqlite3.Error as e:
+                plan = [f"(plan indisponible: {e})"]
+            stats.plan = plan
+
+        entry = {
+            "statement": statement,
+            "duration_ms": round(elapsed * 1000, 3),
+            "at": datetime.now().isoformat(),
+            "plan": plan or [],
+            "full_scans": full_scans(plan or []),
+            "failed": failed,
+        }
+        with self._lock:
+            self.slow_queries.append(entry)
+        status = ", échec" if failed else ""
+        print(f"🐢 Requête lente ({entry['duration_ms']} ms{status}): {statement[:200]}")
+        for detail in entry["plan"]:
+            print(f"     ↳ {detail}")
+
+    def report(self, sort: str = "total", limit: int = 50) -> Dict:
+        """Statistiques triées par total, mean, max ou count (ms)"""
+
+        with self._lock:
+            rows = [
+                {
+                    "statement": statement,
+                    "count": stats.count,
+                    "total_ms": round(stats.total_s * 1000, 3),
+                    "mean_ms": round(stats.total_s / stats.count * 1000, 3),
+                    "max_ms": round(stats.max_s * 1000, 3),
+                    "slow": stats.slow,
+                    "plan": stats.plan,
+                    "full_scans": full_scans(stats.plan or []),
+                }
+                for statement, stats in self.statements.items()
+            ]
+            slow_queries = list(self.slow_queries)
+
+        key = {
+            "total": "total_ms",
+            "mean": "mean_ms",
+            "max": "max_ms",
+            "count": "count",
+        }[sort]
+        rows.sort(key=lambda row: row[key], reverse=True)
+
+        return {
+            "threshold_ms": round(self.threshold_s * 1000, 3),
+            "statements": rows[:limit],
+            "slow_queries": slow_queries[-limit:][::-1],
+        }
+
+    def reset(self):
+        with self._lock:
+            self.statements = {}
+            self.slow_queries.clear()
+
+
+# Instance partagée par l'API
+query_log = SlowQueryLog()
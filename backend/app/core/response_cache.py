@@ -0,0 +1,105 @@
+"""
+RAMQ Billing Assistant - Cache des réponses de lecture (côté serveur)
+Corps JSON déjà sérialisés des recherches fréquentes (/api/codes?search=,
+/api/search, /api/codes/fuzzy), avec leurs variantes compressées calculées
+une fois au niveau maximal. Valide pour une version du catalogue: la
+première requête qui voit une version plus récente vide le cache.
+
+Taille: RAMQ_RESPONSE_CACHE_SIZE entrées par worker (0 = désactivé)
+"""
+
+import os
+import threading
+from typing import Dict, Hashable, Optional
+
+from app.core.cache import MemoryCache
+from app.core.compression import (
+    COMPRESS_MIN_BYTES,
+    COMPRESSION_ENABLED,
+    choose_encoding,
+    compress,
+)
+from app.core.serialization import RawJSONResponse
+
+RESPONSE_CACHE_SIZE = int(os.getenv("RAMQ_RESPONSE_CACHE_SIZE", "512"))
+
+
+class CachedResponse:
+    """Corps sérialisé, son ETag et ses variantes compressées (br, gzip)"""
+
+    __slots__ = ("body", "etag", "variants")
+
+    def __init__(self, body: bytes, etag: str):
+        self.body = body
+        self.etag = etag
+        self.variants: Dict[str, bytes] = {}
+
+    def encoded(self, encoding: str) -> bytes:
+        variant = self.variants.get(encoding)
+        if variant is None:
+            # Course bénigne entre threads: même résultat, dernier écrit gagne
+            variant = self.variants[encoding] = compress(self.body, encoding, best=True)
+        return variant
+
+    def response(
+        self, accept_encoding: Optional[str], headers: Dict[str, str]
+    ) -> RawJSONResponse:
+        """Réponse dans l'encodage accepté (le middleware laisse passer Content-Encoding)"""
+
+        encoding = None
+        if COMPRESSION_ENABLED and len(self.body) >= COMPRESS_MIN_BYTES:
+            encoding = choose_encoding(accept_encoding)
+        if encoding is None:
+            return RawJSONResponse(self.body, headers=headers)
+        return RawJSONResponse(
+            self.encoded(encoding),
+            headers={
+                **headers,
+                "Content-Encoding": encoding,
+                "Vary": "Accept-Encoding",
+            },
+        )
+
+
+class ResponseCache:
+    """
+    LRU (clé de requête) -> CachedResponse pour la version courante du catalogue
+
+    Usage:
+        cached = responses.get(key, version)
+        if cached is None:
+            cached = responses.put(key, version, dumps(content), etag)
+        return cached.response(request.headers.get("accept-encoding"), headers)
+    """
+
+    def __init__(self, max_entries: int = RESPONSE_CACHE_SIZE):
+        self._entries = MemoryCache(max_entries)
+        self._lock = threading.Lock()
+        self.version: Optional[int] = None
+
+    def _current(self, version: int) -> bool:
+        """Vide le cache à la première version plus récente; False pour une version périmée"""
+        with self._lock:
+            if self.version is None or version > self.version:
+                self._entries.clear()
+                self.version = version
+            return version == self.version
+
+    def get(self, key: Hashable, version: int) -> Optional[CachedResponse]:
+        if not self._current(version):
+            return None
+        return self._entries.get(key)
+
+    def put(
+        self, key: Hashable, version: int, body: bytes, etag: str
+    ) -> CachedResponse:
+        cached = CachedResponse(body, etag)
+        if self._current(version):
+            self._entries.put(key, cached)
+        return cached
+
+    def clear(self):
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
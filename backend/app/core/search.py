@@ -0,0 +1,150 @@
+"""
+RAMQ Billing Assistant - Recherche classée des codes
+BM25 en mémoire pour les candidats, puis re-classement par embeddings
+Les deux classements sont fusionnés par Reciprocal Rank Fusion (RRF)
+"""
+
+import math
+from bisect import bisect_left
+from typing import Callable, Dict, List, Optional, Tuple
+
+from app.core.catalog import CodeCatalog
+from app.core.text import tokenize
+
+# Paramètres BM25 classiques
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Constante RRF (valeur usuelle de la littérature)
+DEFAULT_RRF_K = 60
+
+# Expansion par préfixe d'un mot absent du vocabulaire ("sut" -> "suture")
+MAX_PREFIX_EXPANSIONS = 5
+
+
+class LexicalIndex:
+    """Index inversé BM25 sur code + description + catégorie"""
+
+    def __init__(self, catalog: CodeCatalog):
+        """
+        Args:
+            catalog: catalogue en mémoire (CodeCatalog)
+        """
+        self.postings: Dict[str, List[Tuple[int, int]]] = {}
+        self.doc_lengths: List[int] = []
+
+        for idx, (code, text) in enumerate(zip(catalog.codes, catalog.texts())):
+            tokens = tokenize(f"{code} {text}")
+            self.doc_lengths.append(len(tokens))
+
+            counts: Dict[str, int] = {}
+            for token in tokens:
+                counts[token] = counts.get(token, 0) + 1
+            for token, tf in counts.items():
+                self.postings.setdefault(token, []).append((idx, tf))
+
+        self.vocabulary = sorted(self.postings)
+        n_docs = len(self.doc_lengths)
+        self.avg_length = (sum(self.doc_lengths) / n_docs) if n_docs else 0.0
+        self.idf = {
+            token: math.log(1 + (n_docs - len(posting) + 0.5) / (len(posting) + 0.5))
+            for token, posting in self.postings.items()
+        }
+
+    def expand(self, token: str) -> List[str]:
+        """Mot exact s'il existe, sinon les mots du vocabulaire qui le prolongent"""
+
+        if token in self.postings:
+            return [token]
+
+        expansions = []
+        pos = bisect_left(self.vocabulary, token)
+        while (
+            pos < len(self.vocabulary)
+            and self.vocabulary[pos].startswith(token)
+            and len(expansions) < MAX_PREFIX_EXPANSIONS
+        ):
+            expansions.append(self.vocabulary[pos])
+            pos += 1
+        return expansions
+
+    def search(self, query: str, top_n: int = 50) -> List[Tuple[int, float]]:
+        """Retourne les `top_n` (indice, score BM25) par score décroissant"""
+
+        scores: Dict[int, float] = {}
+
+        for token in tokenize(query):
+            for term in self.expand(token):
+                idf = self.idf[term]
+                for idx, tf in self.postings[term]:
+                    norm = 1 - BM25_B + BM25_B * self.doc_lengths[idx] / self.avg_length
+                    scores[idx] = scores.get(idx, 0.0) + idf * tf * (BM25_K1 + 1) / (
+                        tf + BM25_K1 * norm
+                    )
+
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+        return ranked[:top_n]
+
+
+def hybrid_search(
+    catalog: CodeCatalog,
+    lexical_index: LexicalIndex,
+    query: str,
+    embed_query: Optional[Callable] = None,
+    embedding_index=None,
+    limit: int = 10,
+    candidates: int = 50,
+    lexical_weight: float = 1.0,
+    semantic_weight: float = 1.0,
+    rrf_k: int = DEFAULT_RRF_K,
+) -> List[Dict]:
+    """
+    Recherche classée: BM25 sélectionne les candidats, les embeddings
+    ne sont calculés que pour ces candidats (pas de balayage complet)
+
+    Args:
+        embed_query: fonction texte -> vecteur (None = lexical seulement)
+        embedding_index: EmbeddingIndex aligné sur `catalog` (seules les lignes candidates sont lues)
+        candidates: nombre de candidats lexicaux re-classés
+        lexical_weight, semantic_weight: poids de chaque classement dans la RRF
+        rrf_k: constante de lissage RRF
+
+    Returns:
+        Liste de dicts avec score fusionné et scores de chaque composante
+    """
+
+    lexical = lexical_index.search(query, top_n=candidates)
+    if not lexical:
+        return []
+
+    indices = [idx for idx, _ in lexical]
+    lexical_rank = {idx: rank for rank, idx in enumerate(indices)}
+
+    semantic_scores: Dict[int, float] = {}
+    semantic_rank: Dict[int, int] = {}
+    if embed_query is not None and embedding_index is not None and semantic_weight > 0:
+        query_embedding = embed_query(query)
+        if query_embedding is not None:
+            similarities = embedding_index.score_rows(indices, query_embedding)
+            semantic_scores = {
+                idx: float(sim) for idx, sim in zip(indices, similarities)
+            }
+            ordered = sorted(indices, key=lambda idx: -semantic_scores[idx])
+            semantic_rank = {idx: rank for rank, idx in enumerate(ordered)}
+
+    results = []
+    for idx, lexical_score in lexical:
+        score = lexical_weight / (rrf_k + lexical_rank[idx] + 1)
+        if semantic_rank:
+            score += semantic_weight / (rrf_k + semantic_rank[idx] + 1)
+
+        entry = catalog.entry(idx)
+        entry["score"] = round(score, 6)
+        entry["lexical_score"] = round(lexical_score, 4)
+        entry["semantic_score"] = (
+            round(semantic_scores[idx], 4) if idx in semantic_scores else None
+        )
+        results.append(entry)
+
+    results.sort(key=lambda r: -r["score"])
+    return results[:limit]
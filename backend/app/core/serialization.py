@@ -0,0 +1,92 @@
+"""
+RAMQ Billing Assistant - Sérialisation JSON rapide
+orjson s'il est installé (sinon json de la bibliothèque standard, même sortie
+compacte en UTF-8), réponses qui écrivent directement le contenu produit par
+le moteur (sans validation pydantic ni jsonable_encoder) et corps de réponse
+déjà sérialisés pour les succès du cache mémoire
+"""
+
+import json
+from typing import Any, Optional
+
+from starlette.responses import JSONResponse, Response
+
+from app.core.cache import MEMORY_CACHE_SIZE, MemoryCache
+
+try:
+    import orjson
+
+    HAS_ORJSON = True
+    # Clés non textuelles et scalaires NumPy acceptés, comme avec json + float()
+    _ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+except ImportError:  # pragma: no cover - dépend de l'environnement
+    orjson = None
+    HAS_ORJSON = False
+
+
+def dumps(obj: Any) -> bytes:
+    """JSON compact en UTF-8"""
+    if orjson is not None:
+        return orjson.dumps(obj, option=_ORJSON_OPTIONS)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def dumps_text(obj: Any) -> str:
+    """JSON compact en texte (colonnes SQLite, cache mémoire)"""
+    if orjson is not None:
+        return orjson.dumps(obj, option=_ORJSON_OPTIONS).decode("utf-8")
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+
+
+def loads(data) -> Any:
+    """Texte ou octets JSON -> objet Python"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse sérialisée avec orjson si disponible (contenu déjà compatible JSON)"""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+class RawJSONResponse(Response):
+    """Corps JSON déjà sérialisé, envoyé tel quel"""
+
+    media_type = "application/json"
+
+
+class ResponseBodyCache:
+    """
+    Corps de réponse sérialisés, associés au texte du cache mémoire du moteur
+    dont ils sont dérivés. Un corps n'est servi que si ce cache contient encore
+    exactement le même texte (comparaison d'identité): une nouvelle sauvegarde,
+    un raffinement, l'expiration ou le vidage au changement de catalogue
+    l'invalident sans autre mécanisme.
+
+    Usage:
+        body = bodies.get(key, source)
+        if body is None:
+            body = bodies.put(key, source, dumps(render(loads(source))))
+    """
+
+    def __init__(self, max_entries: int = MEMORY_CACHE_SIZE):
+        self._entries = MemoryCache(max_entries)
+
+    def get(self, key: str, source: str) -> Optional[bytes]:
+        entry = self._entries.get(key)
+        if entry is None or entry[0] is not source:
+            return None
+        return entry[1]
+
+    def put(self, key: str, source: str, body: bytes) -> bytes:
+        self._entries.put(key, (source, body))
+        return body
+
+    def clear(self):
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -0,0 +1,100 @@
+"""
+RAMQ Billing Assistant - Single-flight: un seul calcul par clé en cours
+Les appels concurrents de même clé (même clé de cache d'analyse) attendent le
+résultat du premier (meneur) au lieu de recalculer et de réécrire ai_cache.
+Utile après l'expiration du cache ou un redéploiement (cache froid).
+"""
+
+import threading
+from typing import Any, Callable, Dict, Optional, Tuple
+
+
+class _Call:
+    __slots__ = ("done", "value", "error", "followers")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error: Optional[BaseException] = None
+        self.followers = 0
+
+
+class SingleFlight:
+    """
+    Calculs en cours par clé (threads du même processus)
+
+    Usage:
+        value, leader = flights.do(key, compute, snapshot=json.dumps)
+
+    snapshot(valeur) est appelé par le meneur avant de libérer les suiveurs
+    (seulement s'il y en a): ils reçoivent cette copie, le meneur reste libre
+    de modifier la sienne.
+    """
+
+    def __init__(self):
+        self._calls: Dict[str, _Call] = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, key: str) -> Tuple[_Call, bool]:
+        """Retourne (appel, True) au meneur, (appel en cours, False) aux suiveurs"""
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                call.followers += 1
+                return call, False
+            call = self._calls[key] = _Call()
+            return call, True
+
+    def resolve(
+        self,
+        key: str,
+        call: _Call,
+        value: Any = None,
+        error: Optional[BaseException] = None,
+        snapshot: Optional[Callable[[Any], Any]] = None,
+    ):
+        """Publie le résultat du meneur et libère les suiveurs"""
+        with self._lock:
+            if self._calls.get(key) is call:
+                del self._calls[key]
+            # Clé retirée: plus aucun suiveur ne peut s'ajouter
+            followers = call.followers
+        call.value = (
+            snapshot(value) if snapshot and followers and error is None else value
+        )
+        call.error = error
+        call.done.set()
+
+    @staticmethod
+    def wait(call: _Call, timeout: Optional[float] = None) -> Any:
+        if not call.done.wait(timeout):
+            raise TimeoutError("Calcul partagé non terminé")
+        if call.error is not None:
+            raise call.error
+        return call.value
+
+    def do(
+        self,
+        key: str,
+        fn: Callable[[], Any],
+        snapshot: Optional[Callable[[Any], Any]] = None,
+    ) -> Tuple[Any, bool]:
+        """
+        Exécute fn une seule fois pour les appels concurrents de même clé
+        Retourne (valeur, meneur): le meneur reçoit la valeur de fn, les
+        suiveurs snapshot(valeur) si fourni
+        """
+        call, leader = self.acquire(key)
+        if not leader:
+            return self.wait(call), False
+
+        try:
+            value = fn()
+        except BaseException as e:
+            self.resolve(key, call, error=e)
+            raise
+        self.resolve(key, call, value, snapshot=snapshot)
+        return value, True
+
+    def __len__(self) -> int:
+        return len(self._calls)
@@ -0,0 +1,158 @@
+"""
+RAMQ Billing Assistant - Suggestions en continu pendant la saisie
+Une session par connexion (WebSocket /ws/suggest): le client envoie chaque
+frappe {"id", "q", "limit", "category"}, la session ne garde que la dernière
+et annule la recherche précédente. Étapes, poussées au fil de l'eau:
+- prefix: index de préfixes en mémoire, immédiatement (quelques µs)
+- ranked: recherche classée (BM25 + sémantique, repli tolérant aux fautes),
+  après RAMQ_SUGGEST_DEBOUNCE_MS sans nouvelle frappe
+
+Chaque message: {"id", "q", "stage", "results", "count", "final", "took_ms"};
+le client ignore les id périmés.
+"""
+
+import asyncio
+import os
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+SUGGEST_DEBOUNCE_MS = float(os.getenv("RAMQ_SUGGEST_DEBOUNCE_MS", "120"))
+
+MAX_QUERY_LENGTH = 100
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 50
+
+# Filtre par catégorie appliqué après coup: candidats demandés en plus
+CATEGORY_OVERFETCH = 5
+
+# (nom, recherche(q, limit), après l'attente de fin de frappe)
+SuggestStage = Tuple[str, Callable[[str, int], Awaitable[List[Dict]]], bool]
+
+
+def parse_update(message: Dict) -> Dict:
+    """
+    Valide un message du client
+
+    Raises:
+        ValueError: message invalide
+    """
+
+    if not isinstance(message, dict):
+        raise ValueError("objet JSON attendu")
+    query = message.get("q", "")
+    if not isinstance(query, str):
+        raise ValueError("q doit être une chaîne")
+    try:
+        limit = int(message.get("limit", DEFAULT_LIMIT))
+    except (TypeError, ValueError):
+        raise ValueError("limit doit être un entier")
+    category = message.get("category") or None
+    if category is not None and not isinstance(category, str):
+        raise ValueError("category doit être une chaîne")
+
+    return {
+        "id": message.get("id"),
+        "q": query.strip()[:MAX_QUERY_LENGTH],
+        "limit": max(1, min(limit, MAX_LIMIT)),
+        "category": category,
+    }
+
+
+class SuggestSession:
+    """
+    Dernière requête d'une connexion et sa recherche en cours
+
+    Usage:
+        session = SuggestSession(stages, send)
+        session.update({"id": 3, "q": "sut"})   # annule la recherche précédente
+        await session.close()
+    """
+
+    def __init__(
+        self,
+        stages: Sequence[SuggestStage],
+        send: Callable[[Dict], Awaitable[None]],
+        debounce_ms: float = SUGGEST_DEBOUNCE_MS,
+        on_event: Optional[Callable[[str], None]] = None,
+    ):
+        self.stages = stages
+        self.send = send
+        self.debounce = debounce_ms / 1000
+        self.on_event = on_event or (lambda name: None)
+        self._task: Optional[asyncio.Task] = None
+
+    def update(self, message: Dict):
+        """Nouvelle frappe: remplace la requête en cours (ValueError si invalide)"""
+
+        update = parse_update(message)
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            self.on_event("suggest_superseded")
+        self.on_event("suggest_updates")
+        self._task = asyncio.create_task(self._run(update))
+
+    async def _run(self, update: Dict):
+        query, limit, category = update["q"], update["limit"], update["category"]
+        fetch = limit * CATEGORY_OVERFETCH if category else limit
+        waited = False
+
+        try:
+            if not query:
+                await self.send(
+                    {
+                        **self._header(update, None),
+                        "results": [],
+                        "count": 0,
+                        "final": True,
+                    }
+                )
+                return
+            for position, (stage, search, debounced) in enumerate(self.stages):
+                final = position == len(self.stages) - 1
+                if debounced and not waited:
+                    # Annulée ici si une frappe arrive pendant l'attente
+                    await asyncio.sleep(self.debounce)
+                    waited = True
+
+                started = time.perf_counter()
+                results = await search(query, fetch)
+                if category:
+                    results = [
+                        result
+                        for result in results
+                        if result.get("category") == category
+                    ]
+                results = results[:limit]
+                await self.send(
+                    {
+                        **self._header(update, stage),
+                        "results": results,
+                        "count": len(results),
+                        "final": final,
+                        "took_ms": round((time.perf_counter() - started) * 1000, 3),
+                    }
+                )
+        except Exception as e:
+            # Connexion fermée pendant l'envoi, ou erreur de recherche
+            self.on_event("suggest_errors")
+            try:
+                await self.send(
+                    {
+                        **self._header(update, None),
+                        "error": f"Erreur suggestions: {str(e)}",
+                    }
+                )
+            except Exception:
+                pass
+
+    @staticmethod
+    def _header(update: Dict, stage: Optional[str]) -> Dict:
+        return {"id": update["id"], "q": update["q"], "stage": stage}
+
+    async def close(self):
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
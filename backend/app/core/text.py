@@ -0,0 +1,25 @@
+"""
+RAMQ Billing Assistant - Normalisation de texte
+Minuscules, sans accents, découpage en mots (partagé par les index de recherche)
+"""
+
+import re
+import unicodedata
+from functools import lru_cache
+from typing import List
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+(?:\.[a-z0-9]+)*")
+
+
+@lru_cache(maxsize=4096)
+def normalize_text(text: str) -> str:
+    """Minuscules et accents retirés ("Plâtre" -> "platre")"""
+
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+    return "".join(c for c in decomposed if not unicodedata.combining(c))
+
+
+def tokenize(text: str, min_length: int = 2) -> List[str]:
+    """Découpe en mots normalisés (les codes "08.48a" restent entiers)"""
+
+    return [t for t in _TOKEN_RE.findall(normalize_text(text)) if len(t) >= min_length]
@@ -0,0 +1,108 @@
+"""
+RAMQ Billing Assistant - Index de saisie semi-automatique
+Tableau trié de clés (codes + mots des descriptions) interrogé par bisection
+"""
+
+from bisect import bisect_left
+from typing import Dict, List, Set, Tuple
+
+from app.core.catalog import CodeCatalog
+from app.core.text import normalize_text, tokenize
+
+
+class TypeaheadIndex:
+    """
+    Recherche par préfixe en mémoire
+    - Codes: "08.4" -> 08.48A, 08.48B, ... (préfixe seulement, pas d'infixe)
+    - Descriptions: "sut" -> codes dont un mot commence par "sut"
+    """
+
+    def __init__(self, catalog: CodeCatalog):
+        """
+        Args:
+            catalog: catalogue en mémoire (CodeCatalog)
+        """
+        self.catalog = catalog
+
+        code_keys: Dict[str, Set[int]] = {}
+        token_keys: Dict[str, Set[int]] = {}
+
+        for idx, (code, text) in enumerate(zip(catalog.codes, catalog.texts())):
+            code_keys.setdefault(normalize_text(code), set()).add(idx)
+            for token in tokenize(text):
+                token_keys.setdefault(token, set()).add(idx)
+
+        self._code_keys, self._code_rows = self._freeze(code_keys)
+        self._token_keys, self._token_rows = self._freeze(token_keys)
+
+    @staticmethod
+    def _freeze(keys: Dict[str, Set[int]]) -> Tuple[List[str], List[Tuple[int, ...]]]:
+        """Trie les clés; les lignes de chaque clé restent dans l'ordre du catalogue"""
+        ordered = sorted(keys)
+        return ordered, [tuple(sorted(keys[k])) for k in ordered]
+
+    @staticmethod
+    def _prefix_rows(keys: List[str], rows: List[Tuple[int, ...]], prefix: str):
+        """Itère sur les lignes des clés commençant par `prefix`"""
+        pos = bisect_left(keys, prefix)
+        while pos < len(keys) and keys[pos].startswith(prefix):
+            yield from rows[pos]
+            pos += 1
+
+    def _rows_with_token_prefix(self, prefix: str) -> Set[int]:
+        return set(self._prefix_rows(self._token_keys, self._token_rows, prefix))
+
+    def suggest(self, query: str, limit: int = 10) -> List[Dict]:
+        """
+        Retourne au plus `limit` codes correspondant au préfixe
+
+        Les correspondances sur le numéro de code passent en premier,
+        puis celles sur les mots de la description (tous les mots de la
+        requête doivent préfixer un mot, le dernier étant en cours de saisie)
+        """
+
+        normalized = normalize_text(query.strip())
+        if not normalized or limit <= 0:
+            return []
+
+        results: List[Dict] = []
+        seen: Set[int] = set()
+
+        def add(idx: int, match: str) -> bool:
+            if idx in seen:
+                return False
+            seen.add(idx)
+            entry = self.catalog.entry(idx)
+            entry["match"] = match
+            results.append(entry)
+            return len(results) >= limit
+
+        # 1. Préfixe du numéro de code
+        compact = normalized.replace(" ", "")
+        for idx in self._prefix_rows(self._code_keys, self._code_rows, compact):
+            if add(idx, "code"):
+                return results
+
+        # 2. Préfixes des mots de la description
+        tokens = tokenize(normalized, min_length=1)
+        if not tokens:
+            return results
+
+        *complete, partial = tokens
+        candidates = None
+        for token in complete:
+            rows = self._rows_with_token_prefix(token)
+            candidates = rows if candidates is None else candidates & rows
+            if not candidates:
+                return results
+
+        for idx in self._prefix_rows(self._token_keys, self._token_rows, partial):
+            if candidates is not None and idx not in candidates:
+                continue
+            if add(idx, "description"):
+                break
+
+        return results
+
+    def __len__(self) -> int:
+        return len(self._code_keys) + len(self._token_keys)
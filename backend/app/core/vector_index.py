@@ -0,0 +1,200 @@
+"""
+RAMQ Billing Assistant - Index d'embeddings quantifiés
+Stockage float32 ou int8 (échelle par ligne), chacun dans son .npy ouvert en
+mmap (pages partagées entre workers). Le score int8 se fait par blocs: chaque
+bloc est converti en float32 puis multiplié (BLAS); l'échelle est appliquée
+après le produit. Re-classement optionnel des meilleurs candidats avec les
+vecteurs float32 (seules ces lignes sont lues).
+
+Pas de float16: la conversion demi-précision de NumPy rend le score plusieurs
+fois plus lent que le float32, pour un gain de mémoire inférieur à l'int8.
+
+Choix avec RAMQ_EMBEDDING_PRECISION=float32|int8 et RAMQ_EMBEDDING_RERANK
+"""
+
+import os
+from pathlib import Path
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+PRECISIONS = ("float32", "int8")
+EMBEDDING_PRECISION = os.getenv("RAMQ_EMBEDDING_PRECISION", "float32").lower()
+
+# Candidats re-classés en float32: k x facteur (0 = pas de re-classement)
+RERANK_FACTOR = int(os.getenv("RAMQ_EMBEDDING_RERANK", "4"))
+
+# Lignes converties en float32 à la fois (dim 384: 0,75 Mo, reste dans le cache L2)
+SCORE_CHUNK_ROWS = 512
+
+
+def save_npy_atomic(path: Path, array: np.ndarray):
+    """Écriture atomique: un autre processus ne lit jamais un fichier partiel"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f"{path.stem}.{os.getpid()}.tmp.npy")
+    np.save(tmp_path, array)
+    os.replace(tmp_path, path)
+
+
+def quantize_int8(matrix: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """int8 symétrique par ligne: ligne ≈ quantifiée * échelle"""
+    matrix = np.asarray(matrix, dtype=np.float32)
+    scales = np.abs(matrix).max(axis=1) / 127
+    scales[scales == 0] = 1.0
+    quantized = np.rint(matrix / scales[:, None]).astype(np.int8)
+    return quantized, scales.astype(np.float32)
+
+
+class EmbeddingIndex:
+    """
+    Matrice d'embeddings (lignes normalisées) et recherche des k plus proches
+
+    Usage:
+        index = EmbeddingIndex.from_matrix(matrix, "int8")
+        indices, scores = index.top_k(query_vector, 5)
+    """
+
+    def __init__(
+        self,
+        vectors: np.ndarray,
+        scales: Optional[np.ndarray] = None,
+        exact: Optional[np.ndarray] = None,
+        rerank_factor: int = RERANK_FACTOR,
+    ):
+        self.vectors = vectors
+        self.scales = scales
+        self.exact = exact if vectors.dtype != np.float32 else None
+        self.rerank_factor = rerank_factor
+
+    @classmethod
+    def from_matrix(
+        cls,
+        matrix: np.ndarray,
+        precision: str = "float32",
+        rerank_factor: int = RERANK_FACTOR,
+    ) -> "EmbeddingIndex":
+        """Index en mémoire (la matrice float32 sert au re-classement)"""
+
+        matrix = np.asarray(matrix, dtype=np.float32)
+        if precision == "int8":
+            quantized, scales = quantize_int8(matrix)
+            return cls(quantized, scales, exact=matrix, rerank_factor=rerank_factor)
+        if precision == "float32":
+            return cls(matrix, rerank_factor=rerank_factor)
+        raise ValueError(f"Précision inconnue: {precision} ({', '.join(PRECISIONS)})")
+
+    @classmethod
+    def load(
+        cls,
+        path: Path,
+        precision: str = EMBEDDING_PRECISION,
+        rerank_factor: int = RERANK_FACTOR,
+    ) -> "EmbeddingIndex":
+        """
+        Index à partir du .npy float32 (path), en mmap; les versions quantifiées
+        sont calculées une fois et sauvegardées à côté (name.int8.npy, échelles)
+        """
+
+        exact = np.load(path, mmap_mode="r")
+        if precision == "float32":
+            return cls(exact, rerank_factor=rerank_factor)
+        if precision not in PRECISIONS:
+            raise ValueError(
+                f"Précision inconnue: {precision} ({', '.join(PRECISIONS)})"
+            )
+
+        vectors_path = path.with_name(f"{path.stem}.{precision}.npy")
+        scales_path = path.with_name(f"{path.stem}.{precision}_scales.npy")
+        if not vectors_path.exists() or not scales_path.exists():
+            quantized, scales = quantize_int8(exact)
+            save_npy_atomic(scales_path, scales)
+            save_npy_atomic(vectors_path, quantized)
+
+        return cls(
+            np.load(vectors_path, mmap_mode="r"),
+            np.load(scales_path, mmap_mode="r"),
+            exact=exact,
+            rerank_factor=rerank_factor,
+        )
+
+    @property
+    def precision(self) -> str:
+        return self.vectors.dtype.name
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return self.vectors.shape
+
+    @property
+    def nbytes(self) -> int:
+        """Taille des vecteurs de score (hors float32 de re-classement, lu à la demande)"""
+        return self.vectors.nbytes + (
+            self.scales.nbytes if self.scales is not None else 0
+        )
+
+    def __len__(self) -> int:
+        return len(self.vectors)
+
+    def _score_block(self, rows, queries: np.ndarray) -> np.ndarray:
+        block = self.vectors[rows]
+        if block.dtype != np.float32:
+            block = block.astype(np.float32)
+        scores = block @ queries
+        if self.scales is not None:
+            scales = self.scales[rows]
+            scores *= scales if scores.ndim == 1 else scales[:, None]
+        return scores
+
+    def scores(self, queries: np.ndarray) -> np.ndarray:
+        """Similarités de toutes les lignes: query (dim,) -> (n,), queries (dim, m) -> (n, m)"""
+
+        queries = np.asarray(queries, dtype=np.float32)
+        if self.vectors.dtype == np.float32:
+            return self.vectors @ queries
+
+        n = len(self.vectors)
+        out = np.empty((n,) + queries.shape[1:], dtype=np.float32)
+        for start in range(0, n, SCORE_CHUNK_ROWS):
+            rows = slice(start, min(start + SCORE_CHUNK_ROWS, n))
+            out[rows] = self._score_block(rows, queries)
+        return out
+
+    def score_rows(self, indices: Sequence[int], query: np.ndarray) -> np.ndarray:
+        """Similarités de quelques lignes seulement (float32 si disponible)"""
+
+        query = np.asarray(query, dtype=np.float32)
+        if self.exact is not None:
+            return np.asarray(self.exact[indices], dtype=np.float32) @ query
+        return self._score_block(np.asarray(indices), query)
+
+    def top_k(self, query: np.ndarray, k: int = 5) -> Tuple[np.ndarray, np.ndarray]:
+        """Indices et similarités des k lignes les plus proches, en ordre décroissant"""
+        return self.top_k_many(np.asarray(query)[None, :], k)[0]
+
+    def top_k_many(
+        self, queries: np.ndarray, k: int = 5
+    ) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """top_k de plusieurs requêtes (m, dim): un seul produit matriciel par bloc"""
+
+        queries = np.asarray(queries, dtype=np.float32)
+        similarities = self.scores(queries.T)
+        n = len(self.vectors)
+        rerank = self.exact is not None and self.rerank_factor > 0
+        candidates = min(n, k * self.rerank_factor if rerank else k)
+
+        results = []
+        for j in range(len(queries)):
+            column = similarities[:, j]
+            if candidates < n:
+                indices = np.argpartition(-column, candidates - 1)[:candidates]
+            else:
+                indices = np.arange(n)
+            if rerank:
+                # Lignes triées: lecture séquentielle du mmap float32
+                indices = np.sort(indices)
+                scores = np.asarray(self.exact[indices], dtype=np.float32) @ queries[j]
+            else:
+                scores = column[indices]
+            order = np.argsort(-scores, kind="stable")[:k]
+            results.append((indices[order], scores[order]))
+        return results
@@ -3,26 +3,66 @@ RAMQ Billing Assistant - API FastAPI
 Version locale avec moteur IA intégré
 """
 
-from fastapi import FastAPI, HTTPException
+from fastapi import (
+    FastAPI,
+    HTTPException,
+    Query,
+    Request,
+    Response,
+    WebSocket,
+    WebSocketDisconnect,
+)
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel, Field
+from fastapi.responses import FileResponse, StreamingResponse
+from pydantic import BaseModel, Field, field_validator
 from typing import List, Optional, Dict
 from datetime import datetime
+import json
 import os
 import sys
+import time
 from pathlib import Path
 
 # Ajouter le chemin pour imports
 sys.path.append(str(Path(__file__).parent.parent))
 
 from app.core.ai_local import LocalAIEngine
-from app.core.init_db import init_database
+from app.core.ai_hybrid import SPECULATIVE_REFINEMENT, HybridAIEngine
+from app.core.coalescer import RequestCoalescer
+from app.core.init_db import init_database, migrate_database
+from app.core.catalog import etag_matches, get_catalog_version, make_etag, parse_fields
+from app.core.export import EXPORT_FORMATS, export_filename, stream_export
+from app.core.search import DEFAULT_RRF_K, hybrid_search
+from app.core.instrumentation import instrumentation
+from app.core import db
+from app.core.metrics import CONTENT_TYPE, MetricsMiddleware, MetricsRegistry
+from app.core.query_log import query_log
+from app.core.compression import COMPRESSION_ENABLED, CompressionMiddleware
+from app.core.response_cache import ResponseCache
+from app.core.serialization import (
+    FastJSONResponse,
+    RawJSONResponse,
+    ResponseBodyCache,
+    dumps,
+    dumps_text,
+    loads,
+)
+from app.core.suggest_channel import SuggestSession
+from app.core.profiling import (
+    PROFILING_ENABLED,
+    ProfileStore,
+    SamplingProfiler,
+    profile_call,
+    pstats_summary,
+)
 
 # Initialisation
 app = FastAPI(
     title="RAMQ Billing Assistant API",
     version="1.0.0",
-    description="Assistant IA pour facturation RAMQ - Version Locale"
+    description="Assistant IA pour facturation RAMQ - Version Locale",
+    default_response_class=FastJSONResponse,
 )
 
 # CORS pour frontend
@@ -34,32 +74,318 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialiser base de données au démarrage
-@app.on_event("startup")
-async def startup_event():
-    """Initialisation au démarrage"""
-    print("🚀 Démarrage RAMQ Billing Assistant API")
-    
+# Métriques Prometheus (/metrics), sans service externe
+metrics = MetricsRegistry()
+http_requests_total = metrics.counter(
+    "ramq_http_requests_total", "Requêtes HTTP par route", ("method", "route", "status")
+)
+http_request_seconds = metrics.histogram(
+    "ramq_http_request_duration_seconds",
+    "Latence des requêtes HTTP par route",
+    ("method", "route"),
+)
+http_in_flight = metrics.gauge(
+    "ramq_http_requests_in_flight", "Requêtes HTTP en cours de traitement"
+)
+sqlite_query_seconds = metrics.histogram(
+    "ramq_sqlite_query_duration_seconds",
+    "Durée des requêtes SQLite par type",
+    ("statement",),
+)
+
+
+# Compression gzip/brotli des réponses texte (au-delà de RAMQ_COMPRESS_MIN_BYTES)
+def _record_compression(encoding: str, size: int, compressed: int):
+    instrumentation.count(f"responses_compressed_{encoding}")
+    instrumentation.count("compression_bytes_saved", size - compressed)
+
+
+if COMPRESSION_ENABLED:
+    app.add_middleware(CompressionMiddleware, on_compress=_record_compression)
+
+app.add_middleware(
+    MetricsMiddleware,
+    requests_total=http_requests_total,
+    request_seconds=http_request_seconds,
+    in_flight=http_in_flight,
+)
+
+
+def _observe_sqlite_query(sql, params, elapsed, cursor, failed):
+    sqlite_query_seconds.labels(db.statement_kind(sql)).observe(elapsed)
+
+
+db.add_query_observer(_observe_sqlite_query)
+db.add_query_observer(query_log.observe)
+
+# Moteur partagé par les routes (créé au démarrage ou par warm_up avant fork)
+# RAMQ_ENGINE=hybrid: LLM distant compatible OpenAI avec repli local
+RAMQ_ENGINE = os.getenv("RAMQ_ENGINE", "local").lower()
+
+# RAMQ_MINIMAL=1: règles et recherche lexicale seulement (moteur local, aucun
+# embedding ni client distant): ni NumPy ni httpx importés, démarrage le plus court
+MINIMAL_MODE = os.getenv("RAMQ_MINIMAL", "0").lower() in ("1", "true", "yes")
+ai_engine: Optional[LocalAIEngine] = None
+
+# Requêtes /api/analyze concurrentes regroupées en lots (analyze_batch)
+COALESCE_ANALYZE = os.getenv("RAMQ_COALESCE_ANALYZE", "1").lower() in (
+    "1",
+    "true",
+    "yes",
+)
+analyze_coalescer: Optional[RequestCoalescer] = None
+
+
+def _engine_ready() -> bool:
+    return globals().get("ai_engine") is not None
+
+
+def _collect_engine_counters():
+    return [
+        ((name,), value)
+        for name, value in sorted(instrumentation.counters_snapshot().items())
+    ]
+
+
+def _collect_cache_hit_ratio():
+    return [((), instrumentation.snapshot()["cache_hit_ratio"])]
+
+
+def _collect_stage_quantiles():
+    samples = []
+    for stage_name, histogram in sorted(instrumentation.histograms_snapshot().items()):
+        for quantile in (50, 95, 99):
+            samples.append(
+                ((stage_name, quantile / 100), histogram.percentile(quantile) / 1e9)
+            )
+    return samples
+
+
+# Comptage de ai_cache (parcours de table): au plus une fois par intervalle,
+# les collectes rapprochées reprennent le dernier résultat
+CACHE_ENTRIES_TTL = float(os.getenv("RAMQ_METRICS_CACHE_ENTRIES_TTL", "10"))
+_cache_entries = {"at": None, "samples": []}
+
+
+def _collect_cache_entries():
+    if not _engine_ready():
+        return []
+    now = time.monotonic()
+    if (
+        _cache_entries["at"] is not None
+        and now - _cache_entries["at"] < CACHE_ENTRIES_TTL
+    ):
+        return _cache_entries["samples"]
+
+    conn = db.connect(ai_engine.db_path)
+    cursor = conn.cursor()
+    cursor.execute(
+        "SELECT COUNT(*), COALESCE(SUM(expires_at > ?), 0) FROM ai_cache",
+        (datetime.now(),),
+    )
+    total, valid = cursor.fetchone()
+    conn.close()
+    _cache_entries["at"] = now
+    _cache_entries["samples"] = [(("all",), total), (("valid",), valid)]
+    return _cache_entries["samples"]
+
+
+def _collect_embedding_state():
+    loaded = _engine_ready() and ai_engine.semantic_available
+    return [((), 1 if loaded else 0)]
+
+
+def _collect_embedding_index_bytes():
+    if not _engine_ready() or ai_engine.embedding_index is None:
+        return []
+    return [((ai_engine.embedding_index.precision,), ai_engine.embedding_index.nbytes)]
+
+
+def _collect_memory_cache_size():
+    return [((), len(ai_engine.memory_cache))] if _engine_ready() else []
+
+
+def _collect_remote_budget():
+    if not isinstance(ai_engine, HybridAIEngine):
+        return []
+    return [((), ai_engine.budget.snapshot()["spent_total"])]
+
+
+def _collect_breaker_state():
+    if not isinstance(ai_engine, HybridAIEngine):
+        return []
+    return [((), 1 if ai_engine.breaker.state != "closed" else 0)]
+
+
+def _collect_catalog_size():
+    return [((), len(ai_engine.catalog))] if _engine_ready() else []
+
+
+def _collect_catalog_version():
+    return [((), ai_engine.catalog_version)] if _engine_ready() else []
+
+
+metrics.callback(
+    "ramq_engine_events_total",
+    "Événements du moteur (cache par niveau...)",
+    _collect_engine_counters,
+    ("event",),
+    kind="counter",
+)
+metrics.callback(
+    "ramq_cache_hit_ratio",
+    "Taux de succès du cache d'analyse",
+    _collect_cache_hit_ratio,
+)
+metrics.callback(
+    "ramq_engine_stage_seconds",
+    "Quantiles de latence par étape (RAMQ_INSTRUMENTATION=1)",
+    _collect_stage_quantiles,
+    ("stage", "quantile"),
+)
+metrics.callback(
+    "ramq_cache_entries",
+    "Entrées de la table ai_cache",
+    _collect_cache_entries,
+    ("state",),
+)
+metrics.callback(
+    "ramq_embedding_model_loaded",
+    "Modèle d'embeddings chargé (1) ou non (0)",
+    _collect_embedding_state,
+)
+metrics.callback(
+    "ramq_embedding_index_bytes",
+    "Taille des vecteurs de score par précision",
+    _collect_embedding_index_bytes,
+    ("precision",),
+)
+metrics.callback(
+    "ramq_memory_cache_entries",
+    "Entrées du cache mémoire de ce worker",
+    _collect_memory_cache_size,
+)
+metrics.callback(
+    "ramq_remote_budget_spent_usd",
+    "Dépenses LLM du jour (tous workers, dernier état écrit)",
+    _collect_remote_budget,
+)
+metrics.callback(
+    "ramq_remote_breaker_open",
+    "Disjoncteur LLM ouvert ou mi-ouvert (1) ou fermé (0)",
+    _collect_breaker_state,
+)
+metrics.callback(
+    "ramq_catalog_codes", "Nombre de codes RAMQ en mémoire", _collect_catalog_size
+)
+metrics.callback(
+    "ramq_catalog_version", "Version du catalogue chargé", _collect_catalog_version
+)
+
+# Profilage à la demande (désactivé par défaut)
+profile_store = ProfileStore(os.getenv("PROFILE_DIR", "data/profiles"))
+sampling_profiler = SamplingProfiler(profile_store)
+
+
+def _record_analyze_batch(size: int):
+    instrumentation.count("analyze_batches")
+    instrumentation.count("analyze_batch_items", size)
+
+
+def warm_up(
+    db_path: str = "data/ramq.db", load_embeddings: bool = False
+) -> LocalAIEngine:
+    """
+    Prépare la base et le moteur (catalogue, index, embeddings optionnels)
+    Appelé par le serveur multi-workers avant fork: l'état chargé est partagé
+    en copie sur écriture par tous les workers
+    """
+    global ai_engine, analyze_coalescer
+
+    # Chemin résolu une fois: les routes lisent ai_engine.db_path, quel que
+    # soit le dossier courant ensuite (même base pour la migration, le moteur et l'API)
+    db_path = str(Path(db_path).resolve())
+
     # Créer DB si elle n'existe pas
-    db_path = "data/ramq.db"
     if not Path(db_path).exists():
         print("📦 Première exécution - Initialisation base de données...")
         init_database(db_path)
-    
+    else:
+        migrate_database(db_path)
+
     # Initialiser moteur IA
-    global ai_engine
-    ai_engine = LocalAIEngine(db_path)
-    print("✅ Moteur IA local prêt")
+    if RAMQ_ENGINE == "hybrid" and not MINIMAL_MODE:
+        ai_engine = HybridAIEngine(db_path)
+    else:
+        ai_engine = LocalAIEngine(db_path)
+    if load_embeddings and not MINIMAL_MODE:
+        ai_engine.load_embeddings_model()
+    if COALESCE_ANALYZE and not isinstance(ai_engine, HybridAIEngine):
+        analyze_coalescer = RequestCoalescer(
+            ai_engine.analyze_batch, on_batch=_record_analyze_batch
+        )
+    print("✅ Moteur IA local prêt" + (" (mode minimal)" if MINIMAL_MODE else ""))
+    return ai_engine
+
+
+# Initialiser base de données au démarrage
+@app.on_event("startup")
+async def startup_event():
+    """Initialisation au démarrage (sauf si déjà faite avant fork)"""
+    if ai_engine is not None:
+        print(f"🚀 Worker {os.getpid()} prêt (moteur préchargé)")
+        return
+    print("🚀 Démarrage RAMQ Billing Assistant API")
+    warm_up()
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Arrête le processus d'inférence de ce worker, écrit le budget du moteur hybride"""
+    if ai_engine is not None and ai_engine.inference is not None:
+        ai_engine.inference.shutdown()
+    if isinstance(ai_engine, HybridAIEngine):
+        await ai_engine.close()
+
+
+async def _run_engine(fn, *args, **kwargs):
+    """
+    Appel au moteur depuis une route
+    Inférence déportée: exécution dans le threadpool, pour que les encodages
+    concurrents atteignent le processus d'inférence ensemble (micro-lots)
+    """
+    if ai_engine.inference is not None:
+        return await run_in_threadpool(fn, *args, **kwargs)
+    return fn(*args, **kwargs)
+
 
 # Modèles Pydantic
+def check_iso_datetime(value: Optional[str]) -> Optional[str]:
+    """Date/heure ISO valide (422 avant le moteur), conservée telle quelle"""
+
+    if value is not None:
+        try:
+            datetime.fromisoformat(value)
+        except ValueError:
+            raise ValueError(f"Date/heure ISO invalide: {value}")
+    return value
+
+
 class EncounterRequest(BaseModel):
     """Requête d'analyse d'un cas médical"""
+
     triage_level: int = Field(..., ge=1, le=5, description="Niveau de triage (1-5)")
     chief_complaint: str = Field(..., max_length=500, description="Plainte principale")
-    procedures: List[str] = Field(default_factory=list, description="Procédures effectuées")
+    procedures: List[str] = Field(
+        default_factory=list, description="Procédures effectuées"
+    )
     duration_minutes: int = Field(..., ge=1, le=480, description="Durée en minutes")
-    encounter_datetime: Optional[str] = Field(default=None, description="Date/heure ISO format")
-    
+    encounter_datetime: Optional[str] = Field(
+        default=None, description="Date/heure ISO format"
+    )
+
+    _check_datetime = field_validator("encounter_datetime")(check_iso_datetime)
+
     class Config:
         json_schema_extra = {
             "example": {
@@ -67,12 +393,39 @@ class EncounterRequest(BaseModel):
                 "chief_complaint": "Douleur thoracique atypique",
                 "procedures": ["ECG", "Enzymes cardiaques"],
                 "duration_minutes": 75,
-                "encounter_datetime": "2024-11-24T23:30:00"
+                "encounter_datetime": "2024-11-24T23:30:00",
             }
         }
 
+
+class DraftRequest(BaseModel):
+    """Cas en cours de saisie (analyse provisoire): champs partiels acceptés"""
+
+    triage_level: int = Field(
+        default=3, ge=1, le=5, description="Niveau de triage (1-5)"
+    )
+    chief_complaint: str = Field(
+        default="", max_length=500, description="Plainte principale (partielle)"
+    )
+    procedures: List[str] = Field(
+        default_factory=list, description="Procédures cochées"
+    )
+    duration_minutes: int = Field(
+        default=30, ge=1, le=480, description="Durée en minutes"
+    )
+    encounter_datetime: Optional[str] = Field(
+        default=None, description="Date/heure ISO format"
+    )
+    typing: bool = Field(
+        default=False, description="Frappe en cours: le dernier mot inachevé est ignoré"
+    )
+
+    _check_datetime = field_validator("encounter_datetime")(check_iso_datetime)
+
+
 class BillingResponse(BaseModel):
-    """Réponse avec suggestions de facturation"""
+    """Réponse avec suggestions de facturation (schéma OpenAPI de /api/analyze)"""
+
     primary_code: str
     procedure_codes: List[str]
     modifiers: List[str]
@@ -82,6 +435,91 @@ class BillingResponse(BaseModel):
     details: Dict
     from_cache: bool = False
 
+
+def billing_response(result: Dict) -> Dict:
+    """
+    Corps de BillingResponse construit directement (résultat produit par le
+    moteur: pas de validation pydantic à chaque réponse)
+    """
+    return {
+        "primary_code": result.get("primary_code", ""),
+        "procedure_codes": result.get("procedure_codes", []),
+        "modifiers": result.get("modifiers", []),
+        "total_fee": float(result.get("total_fee", 0.0)),
+        "base_fee": float(result.get("base_fee", 0.0)),
+        "confidence": float(result.get("confidence", 0.0)),
+        "details": result,
+        "from_cache": result.get("from_cache", False),
+    }
+
+
+# Succès du cache mémoire: corps de réponse sérialisé une fois, renvoyé tel quel
+analyze_bodies = ResponseBodyCache()
+
+
+def _cached_analyze_response(encounter_data: Dict) -> Optional[Response]:
+    """
+    Réponse d'un succès du cache mémoire du moteur sans décoder ni réencoder
+    le résultat (corps construit au premier succès, puis réutilisé)
+    """
+    key = ai_engine.cache_key(encounter_data)
+    source = ai_engine.memory_cache.get(key)
+    if source is None:
+        return None
+    instrumentation.count("cache_hits_memory")
+
+    body = analyze_bodies.get(key, source)
+    if body is None:
+        result = loads(source)
+        result["from_cache"] = True
+        body = analyze_bodies.put(key, source, dumps(billing_response(result)))
+    else:
+        instrumentation.count("preserialized_hits")
+    return RawJSONResponse(body)
+
+
+# Cache HTTP des lectures du catalogue: ETag (version du catalogue + paramètres)
+# et revalidation à chaque chargement (no-cache), ou fraîcheur de RAMQ_HTTP_MAX_AGE s
+HTTP_MAX_AGE = int(os.getenv("RAMQ_HTTP_MAX_AGE", "0"))
+CATALOG_CACHE_CONTROL = (
+    f"public, max-age={HTTP_MAX_AGE}, must-revalidate"
+    if HTTP_MAX_AGE > 0
+    else "no-cache"
+)
+
+# Réponses sérialisées (et compressées) des lectures fréquentes, par version du catalogue
+read_responses = ResponseCache()
+
+
+def _catalog_headers(catalog_version: int, parts) -> Dict[str, str]:
+    return {
+        "ETag": make_etag(catalog_version, parts),
+        "X-Catalog-Version": str(catalog_version),
+        "Cache-Control": CATALOG_CACHE_CONTROL,
+    }
+
+
+async def _cached_read(
+    request: Request, key: tuple, catalog_version: int, headers: Dict[str, str], build
+) -> Response:
+    """
+    Lecture du catalogue: 304 si l'ETag correspond, sinon corps du cache de
+    réponses (variante compressée selon Accept-Encoding), sinon build() sérialisé
+    """
+    if etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+
+    cached = read_responses.get(key, catalog_version)
+    if cached is None:
+        instrumentation.count("response_cache_misses")
+        cached = read_responses.put(
+            key, catalog_version, dumps(await build()), headers["ETag"]
+        )
+    else:
+        instrumentation.count("response_cache_hits")
+    return cached.response(request.headers.get("accept-encoding"), headers)
+
+
 # Routes API
 @app.get("/")
 async def root():
@@ -91,186 +529,727 @@ async def root():
         "version": "1.0.0",
         "status": "operational",
         "mode": "local",
-        "docs": "/docs"
+        "docs": "/docs",
     }
 
+
 @app.get("/health")
 async def health_check():
     """Vérification santé de l'API"""
     return {
         "status": "healthy",
         "timestamp": datetime.now().isoformat(),
-        "ai_engine": "local_rules_v1"
+        "ai_engine": "local_rules_v1",
+        "minimal": MINIMAL_MODE,
     }
 
+
+@app.get("/metrics")
+async def get_metrics():
+    """
+    Métriques au format d'exposition Prometheus
+    Collecte dans le threadpool: les lectures SQLite ne bloquent pas la boucle
+    """
+    return Response(
+        content=await run_in_threadpool(metrics.exposition), media_type=CONTENT_TYPE
+    )
+
+
 @app.post("/api/analyze", response_model=BillingResponse)
-async def analyze_encounter(request: EncounterRequest):
+async def analyze_encounter(
+    request: EncounterRequest,
+    http_request: Request,
+    timings: bool = False,
+    speculative: Optional[bool] = None,
+):
     """
     Analyse un encounter et retourne suggestions de facturation
-    
+
     - **triage_level**: 1 (réanimation) à 5 (non urgent)
     - **chief_complaint**: Raison de consultation
     - **procedures**: Liste des procédures effectuées
     - **duration_minutes**: Durée de la consultation
     - **encounter_datetime**: Date/heure (optionnel, défaut = maintenant)
+    - **timings** (query): Ajoute la durée de chaque étape dans `details.timings_ms`
+    - **X-Profile: 1** (en-tête): Profile cette requête avec cProfile (PROFILING_ENABLED=1)
+    - **speculative** (query, moteur hybride): Réponse locale immédiate, raffinement
+      distant en arrière-plan (`details.refinement.id`, défaut RAMQ_SPECULATIVE)
     """
     try:
         # Convertir en dict pour traitement
         encounter_data = request.dict()
-        
+
         # Analyser avec moteur IA
-        result = ai_engine.analyze_encounter(encounter_data)
-        
-        # Formater réponse
-        response = BillingResponse(
-            primary_code=result.get("primary_code", ""),
-            procedure_codes=result.get("procedure_codes", []),
-            modifiers=result.get("modifiers", []),
-            total_fee=result.get("total_fee", 0.0),
-            base_fee=result.get("base_fee", 0.0),
-            confidence=result.get("confidence", 0.0),
-            details=result,
-            from_cache=result.get("from_cache", False)
+        stage_timings = {} if timings else None
+        headers = {}
+        profiled = PROFILING_ENABLED and http_request.headers.get("x-profile") == "1"
+        speculative = isinstance(ai_engine, HybridAIEngine) and (
+            speculative if speculative is not None else SPECULATIVE_REFINEMENT
         )
-        
-        return response
-        
+
+        # Succès du cache mémoire: corps déjà sérialisé (le mode spéculatif peut
+        # lancer un raffinement même sur un succès: chemin complet)
+        if stage_timings is None and not profiled and not speculative:
+            cached_response = _cached_analyze_response(encounter_data)
+            if cached_response is not None:
+                return cached_response
+
+        if profiled:
+            result, profiler = profile_call(
+                ai_engine.analyze_encounter, encounter_data, timings=stage_timings
+            )
+            profile_name = profile_store.save_pstats(profiler, "analyze")
+            result["profile"] = profile_name
+            headers["X-Profile-Id"] = profile_name
+        elif isinstance(ai_engine, HybridAIEngine) and stage_timings is None:
+            if speculative:
+                result = await ai_engine.analyze_speculative(encounter_data)
+                if result.get("refinement"):
+                    headers["X-Refinement-Id"] = result["refinement"]["id"]
+            else:
+                result = await ai_engine.analyze_encounter_async(encounter_data)
+        elif analyze_coalescer is not None and stage_timings is None:
+            result = await analyze_coalescer.submit(encounter_data)
+        else:
+            result = await _run_engine(
+                ai_engine.analyze_encounter, encounter_data, timings=stage_timings
+            )
+        if stage_timings is not None:
+            result["timings_ms"] = stage_timings
+
+        # Formater réponse
+        return FastJSONResponse(billing_response(result), headers=headers)
+
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erreur analyse: {str(e)}")
 
+
+@app.post("/api/analyze/draft")
+async def analyze_draft(request: DraftRequest):
+    """
+    Analyse provisoire pendant la saisie (codes et tarifs estimés)
+
+    À appeler à chaque modification du formulaire: seules les étapes dont
+    l'entrée a changé sont recalculées (`reused`: procédures, embedding et
+    correspondances sémantiques servis par les mémos). Pendant la frappe
+    (`typing`), le mot inachevé de la plainte est ignoré. Rien n'est mis en
+    cache: l'analyse définitive reste `/api/analyze`.
+    """
+    try:
+        result = await _run_engine(ai_engine.drafts.analyze, request.dict())
+        return FastJSONResponse(result)
+    except Exception as e:
+        raise HTTPException(
+            status_code=500, detail=f"Erreur analyse provisoire: {str(e)}"
+        )
+
+
+async def _require_refinement(refinement_id: str) -> Dict:
+    status = (
+        await ai_engine.refinement_status(refinement_id)
+        if isinstance(ai_engine, HybridAIEngine)
+        else None
+    )
+    if status is None:
+        raise HTTPException(status_code=404, detail="Raffinement introuvable ou expiré")
+    return status
+
+
+@app.get("/api/analyze/refinements/{refinement_id}")
+async def get_refinement(refinement_id: str):
+    """
+    État d'un raffinement distant (mode spéculatif)
+    status: pending, refined (result = analyse distante) ou failed
+    """
+    return await _require_refinement(refinement_id)
+
+
+@app.get("/api/analyze/refinements/{refinement_id}/stream")
+async def stream_refinement(
+    refinement_id: str, timeout: float = Query(default=30.0, gt=0, le=120)
+):
+    """
+    Server-Sent Events: un événement `refinement` à la fin du raffinement
+    (ou à l'échéance, status pending), précédé de commentaires keep-alive
+    """
+    await _require_refinement(refinement_id)
+
+    async def events():
+        deadline = time.monotonic() + timeout
+        status = await ai_engine.refinement_status(refinement_id)
+        while status is not None and status["status"] == "pending":
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            status = await ai_engine.wait_refinement(
+                refinement_id, min(remaining, 10.0)
+            )
+            if status is not None and status["status"] == "pending":
+                yield ": keep-alive\n\n"
+        payload = status or {
+            "id": refinement_id,
+            "status": "expired",
+            "result": None,
+            "error": None,
+        }
+        yield f"event: refinement\ndata: {json.dumps(payload)}\n\n"
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @app.get("/api/codes")
-async def get_codes(category: Optional[str] = None, search: Optional[str] = None):
+async def get_codes(
+    request: Request,
+    category: Optional[str] = None,
+    search: Optional[str] = None,
+    fields: Optional[str] = None,
+    limit: int = Query(default=100, ge=1, le=1000),
+    cursor: Optional[str] = None,
+):
     """
-    Récupère liste des codes RAMQ
-    
+    Récupère liste des codes RAMQ (pagination par curseur)
+
     - **category**: Filtrer par catégorie (urgence, procedure, interpretation)
     - **search**: Recherche dans description
+    - **fields**: Champs retournés, séparés par virgules (code, description, base_fee, category)
+    - **limit**: Nombre maximum de codes par page (1-1000)
+    - **cursor**: Valeur `next_cursor` de la page précédente
+
+    Réponse 304 si `If-None-Match` correspond à l'ETag courant (catalogue inchangé);
+    pages et recherches fréquentes servies par le cache de réponses du serveur
     """
-    import sqlite3
-    from pathlib import Path
-    
     try:
-        # Utiliser le chemin correct de la base de données
-        db_path = Path(__file__).parent.parent / "data" / "ramq.db"
-        conn = sqlite3.connect(str(db_path))
-        cursor = conn.cursor()
-        
-        if category:
-            cursor.execute(
-                "SELECT code, description, base_fee, category FROM ramq_codes WHERE category = ?",
-                (category,)
+        columns = parse_fields(fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    try:
+        conn = db.connect(ai_engine.db_path)
+        db_cursor = conn.cursor()
+
+        try:
+            catalog_version = get_catalog_version(db_cursor)
+            headers = _catalog_headers(
+                catalog_version, (category, search, ",".join(columns), limit, cursor)
             )
-        elif search:
-            cursor.execute(
-                "SELECT code, description, base_fee, category FROM ramq_codes WHERE description LIKE ? OR code LIKE ?",
-                (f"%{search}%", f"%{search}%")
+
+            async def build():
+                return _codes_page(
+                    db_cursor, catalog_version, columns, category, search, limit, cursor
+                )
+
+            return await _cached_read(
+                request,
+                ("codes", category, search, tuple(columns), limit, cursor),
+                catalog_version,
+                headers,
+                build,
             )
-        else:
-            cursor.execute("SELECT code, description, base_fee, category FROM ramq_codes")
-        
-        codes = [
-            {
-                "code": row[0],
-                "description": row[1],
-                "base_fee": row[2],
-                "category": row[3]
-            }
-            for row in cursor.fetchall()
-        ]
-        
-        conn.close()
-        
-        return {"codes": codes, "count": len(codes)}
-        
+        finally:
+            conn.close()
+
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Erreur récupération codes: {str(e)}")
+        raise HTTPException(
+            status_code=500, detail=f"Erreur récupération codes: {str(e)}"
+        )
+
+
+def _codes_page(
+    db_cursor,
+    catalog_version: int,
+    columns: List[str],
+    category: Optional[str],
+    search: Optional[str],
+    limit: int,
+    cursor: Optional[str],
+) -> Dict:
+    """Page de /api/codes: catalogue en mémoire s'il est à jour, sinon SQL"""
+
+    # Sans recherche texte: page servie par le catalogue en mémoire s'il est à jour
+    if not search and _engine_ready():
+        ai_engine.refresh_catalog_if_changed()
+        catalog = ai_engine.catalog
+        if catalog.version == catalog_version:
+            rows, total, has_more = catalog.page(category, cursor, limit)
+            codes = [catalog.entry(idx, columns) for idx in rows]
+            return {
+                "codes": codes,
+                "count": len(codes),
+                "total": total,
+                "next_cursor": codes[-1]["code"] if has_more else None,
+                "catalog_version": catalog_version,
+            }
+
+    where = []
+    params = []
+    if category:
+        where.append("category = ?")
+        params.append(category)
+    elif search:
+        where.append("(description LIKE ? OR code LIKE ?)")
+        params.extend([f"%{search}%", f"%{search}%"])
+
+    filter_sql = (" WHERE " + " AND ".join(where)) if where else ""
+    db_cursor.execute(f"SELECT COUNT(*) FROM ramq_codes{filter_sql}", params)
+    total = db_cursor.fetchone()[0]
+
+    # Aucun résultat: réessayer avec la requête corrigée ("sutre" -> "suture")
+    corrected_search = None
+    if total == 0 and search and not category:
+        corrected = ai_engine.fuzzy.matcher.correct_query(search)
+        if corrected and corrected != search.lower():
+            params = [f"%{corrected}%", f"%{corrected}%"]
+            db_cursor.execute(f"SELECT COUNT(*) FROM ramq_codes{filter_sql}", params)
+            total = db_cursor.fetchone()[0]
+            corrected_search = corrected
+
+    # Pagination keyset sur code (index unique): pas d'OFFSET à parcourir
+    if cursor:
+        where.append("code > ?")
+        params.append(cursor)
+    page_sql = (" WHERE " + " AND ".join(where)) if where else ""
+    db_cursor.execute(
+        f"SELECT {', '.join(columns)} FROM ramq_codes{page_sql} ORDER BY code LIMIT ?",
+        params + [limit + 1],
+    )
+    rows = db_cursor.fetchall()
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    codes = [dict(zip(columns, row)) for row in rows]
+
+    content = {
+        "codes": codes,
+        "count": len(codes),
+        "total": total,
+        "next_cursor": codes[-1]["code"] if has_more else None,
+        "catalog_version": catalog_version,
+    }
+    if corrected_search:
+        content["corrected_search"] = corrected_search
+    return content
+
+
+@app.get("/api/codes/suggest")
+async def suggest_codes(
+    request: Request,
+    q: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(default=10, ge=1, le=50),
+):
+    """
+    Suggestions par préfixe pendant la saisie (index en mémoire)
+
+    - **q**: Début d'un numéro de code ("08.4") ou de mots de la description ("sut")
+    - **limit**: Nombre maximum de suggestions (1-50)
+    """
+    ai_engine.refresh_catalog_if_changed()
+
+    catalog_version = ai_engine.catalog_version
+    headers = _catalog_headers(catalog_version, ("suggest", q, limit))
+    if etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+
+    started = time.perf_counter()
+    suggestions = ai_engine.typeahead.suggest(q, limit)
+    took_ms = (time.perf_counter() - started) * 1000
+
+    return FastJSONResponse(
+        {
+            "query": q,
+            "suggestions": suggestions,
+            "count": len(suggestions),
+            "catalog_version": catalog_version,
+            "took_ms": round(took_ms, 3),
+        },
+        headers=headers,
+    )
+
+
+@app.get("/api/codes/fuzzy")
+async def fuzzy_codes(
+    request: Request,
+    q: str = Query(..., min_length=1, max_length=200),
+    top_k: int = Query(default=10, ge=1, le=100),
+):
+    """
+    Recherche tolérante aux fautes de frappe ("sutre", "consultaton")
+
+    - **q**: Mots recherchés (distance d'édition bornée à 2 par mot)
+    - **top_k**: Nombre maximum de codes retournés
+    """
+    ai_engine.refresh_catalog_if_changed()
+
+    async def build():
+        results = ai_engine.fuzzy.search(q, top_k)
+        return {
+            "query": q,
+            "corrected_query": ai_engine.fuzzy.matcher.correct_query(q),
+            "results": results,
+            "count": len(results),
+        }
+
+    catalog_version = ai_engine.catalog_version
+    headers = _catalog_headers(catalog_version, ("fuzzy", q, top_k))
+    return await _cached_read(
+        request, ("fuzzy", q, top_k), catalog_version, headers, build
+    )
+
+
+@app.get("/api/search")
+async def search_codes(
+    request: Request,
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(default=10, ge=1, le=100),
+    candidates: int = Query(default=50, ge=1, le=500),
+    lexical_weight: float = Query(default=1.0, ge=0.0),
+    semantic_weight: float = Query(default=1.0, ge=0.0),
+    rrf_k: int = Query(default=DEFAULT_RRF_K, ge=1),
+):
+    """
+    Recherche classée: BM25 + similarité sémantique (fusion RRF)
+
+    - **q**: Texte libre (plainte, procédure, code)
+    - **limit**: Nombre de résultats retournés
+    - **candidates**: Candidats lexicaux re-classés par embeddings
+    - **lexical_weight** / **semantic_weight**: Poids de chaque classement
+    - **rrf_k**: Constante de lissage de la fusion
+    """
+    ai_engine.refresh_catalog_if_changed()
+    semantic = ai_engine.semantic_available
+
+    async def build():
+        try:
+            results = await _run_engine(
+                hybrid_search,
+                ai_engine.catalog,
+                ai_engine.lexical,
+                q,
+                embed_query=ai_engine.embed_query if semantic else None,
+                embedding_index=ai_engine.embedding_index,
+                limit=limit,
+                candidates=candidates,
+                lexical_weight=lexical_weight,
+                semantic_weight=semantic_weight,
+                rrf_k=rrf_k,
+            )
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Erreur recherche: {str(e)}")
+
+        return {
+            "query": q,
+            "results": results,
+            "count": len(results),
+            "semantic": semantic,
+        }
+
+    # Résultats différents avec ou sans embeddings: l'état fait partie de la clé
+    key = (
+        "search",
+        q,
+        limit,
+        candidates,
+        lexical_weight,
+        semantic_weight,
+        rrf_k,
+        semantic,
+    )
+    catalog_version = ai_engine.catalog_version
+    headers = _catalog_headers(catalog_version, key)
+    return await _cached_read(request, key, catalog_version, headers, build)
+
+
+async def _suggest_prefix(q: str, limit: int) -> List[Dict]:
+    ai_engine.refresh_catalog_if_changed()
+    return ai_engine.typeahead.suggest(q, limit)
+
+
+async def _suggest_ranked(q: str, limit: int) -> List[Dict]:
+    results = await _run_engine(
+        hybrid_search,
+        ai_engine.catalog,
+        ai_engine.lexical,
+        q,
+        embed_query=ai_engine.embed_query if ai_engine.semantic_available else None,
+        embedding_index=ai_engine.embedding_index,
+        limit=limit,
+    )
+    # Aucun terme reconnu (faute de frappe): repli sur la recherche tolérante
+    return results or ai_engine.fuzzy.search(q, limit)
+
+
+# Étapes poussées à chaque frappe: préfixes tout de suite, classement après la pause
+SUGGEST_STAGES = [("prefix", _suggest_prefix, False), ("ranked", _suggest_ranked, True)]
+
+
+@app.websocket("/ws/suggest")
+async def suggest_socket(websocket: WebSocket):
+    """
+    Suggestions pendant la saisie sur une seule connexion
+
+    Client -> serveur, à chaque frappe: {"id": 7, "q": "sut", "limit": 10, "category": null}
+    Serveur -> client: {"id": 7, "stage": "prefix" | "ranked", "results": [...], "final": bool}
+    La recherche d'une frappe remplacée est annulée; le classement attend
+    RAMQ_SUGGEST_DEBOUNCE_MS sans nouvelle frappe
+    """
+    await websocket.accept()
+
+    async def send(payload: Dict):
+        await websocket.send_text(dumps_text(payload))
+
+    session = SuggestSession(SUGGEST_STAGES, send, on_event=instrumentation.count)
+    try:
+        while True:
+            message = await websocket.receive_text()
+            try:
+                session.update(loads(message))
+            except ValueError as e:
+                await send({"error": f"Message invalide: {str(e)}"})
+    except WebSocketDisconnect:
+        pass
+    finally:
+        await session.close()
+
 
 @app.get("/api/statistics")
 async def get_statistics():
     """
     Statistiques d'utilisation
     """
-    import sqlite3
-    
     try:
-        conn = sqlite3.connect("data/ramq.db")
+        conn = db.connect(ai_engine.db_path)
         cursor = conn.cursor()
-        
+
         # Stats basiques
         cursor.execute("SELECT COUNT(*) FROM encounters")
         total_encounters = cursor.fetchone()[0]
-        
-        cursor.execute("SELECT AVG(total_fee) FROM encounters WHERE total_fee IS NOT NULL")
+
+        cursor.execute(
+            "SELECT AVG(total_fee) FROM encounters WHERE total_fee IS NOT NULL"
+        )
         avg_fee = cursor.fetchone()[0] or 0
-        
+
         cursor.execute("SELECT COUNT(DISTINCT physician_id) FROM encounters")
         total_physicians = cursor.fetchone()[0]
-        
+
         # Cache stats
-        cursor.execute("SELECT COUNT(*) FROM ai_cache WHERE expires_at > ?", (datetime.now(),))
+        cursor.execute(
+            "SELECT COUNT(*) FROM ai_cache WHERE expires_at > ?", (datetime.now(),)
+        )
         cache_entries = cursor.fetchone()[0]
-        
+
         conn.close()
-        
+
         return {
             "total_encounters": total_encounters,
             "average_fee": round(avg_fee, 2),
             "total_physicians": total_physicians,
             "cache_entries": cache_entries,
+            "catalog": ai_engine.catalog.stats() if _engine_ready() else None,
             "ai_model": "local_rules_v1",
-            "cost": "0$ (100% local)"
+            "cost": "0$ (100% local)",
         }
-        
+
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erreur statistiques: {str(e)}")
 
+
+@app.get("/api/statistics/latency")
+async def get_latency_statistics():
+    """
+    Latence par étape du moteur (p50/p95/p99) et compteurs de cache
+    Activer avec RAMQ_INSTRUMENTATION=1
+    """
+    return instrumentation.snapshot()
+
+
+@app.get("/api/statistics/remote")
+async def get_remote_statistics():
+    """Budget du jour et état du disjoncteur (RAMQ_ENGINE=hybrid)"""
+    if not isinstance(ai_engine, HybridAIEngine):
+        return {"engine": "local"}
+    return {
+        "engine": "hybrid",
+        "remote_enabled": ai_engine.remote_enabled,
+        "model": ai_engine.client.model,
+        "breaker": {
+            "state": ai_engine.breaker.state,
+            "failures": ai_engine.breaker.failures,
+        },
+        "budget": ai_engine.budget.snapshot(),
+    }
+
+
+def _require_profiling():
+    if not PROFILING_ENABLED:
+        raise HTTPException(
+            status_code=403, detail="Profilage désactivé (PROFILING_ENABLED=1)"
+        )
+
+
+@app.get("/api/admin/queries")
+async def get_query_statistics(
+    sort: str = Query(default="total", pattern="^(total|mean|max|count)$"),
+    limit: int = Query(default=50, ge=1, le=500),
+):
+    """
+    Statistiques par requête SQLite et dernières requêtes lentes (EXPLAIN QUERY PLAN)
+    Seuil: SLOW_QUERY_MS (0 = plan de toutes les requêtes)
+
+    - **sort**: total, mean, max ou count
+    """
+    # SQL brut et plans: diagnostic réservé, comme le profilage
+    _require_profiling()
+    return query_log.report(sort=sort, limit=limit)
+
+
+@app.post("/api/admin/queries/reset")
+async def reset_query_statistics():
+    """Remet à zéro les statistiques SQLite"""
+    _require_profiling()
+    query_log.reset()
+    return {"status": "reset"}
+
+
+@app.post("/api/admin/profile")
+async def start_profile_window(
+    seconds: float = Query(default=10.0, gt=0, le=300),
+    interval_ms: float = Query(default=5.0, ge=1, le=1000),
+):
+    """
+    Démarre un profil par échantillonnage de tout le processus (piles repliées)
+
+    - **seconds**: Durée de la fenêtre
+    - **interval_ms**: Intervalle entre deux échantillons
+    """
+    _require_profiling()
+    if not sampling_profiler.start(seconds, interval_ms / 1000):
+        raise HTTPException(
+            status_code=409, detail="Une fenêtre de profilage est déjà active"
+        )
+    return {"status": "started", "seconds": seconds, "interval_ms": interval_ms}
+
+
+@app.get("/api/admin/profiles")
+async def list_profiles():
+    """Liste des profils sauvegardés et état de la fenêtre en cours"""
+    _require_profiling()
+    return {
+        "window_running": sampling_profiler.running,
+        "last_window": sampling_profiler.last_result,
+        "profiles": profile_store.list(),
+    }
+
+
+@app.get("/api/admin/profiles/{name}")
+async def get_profile(name: str, format: str = "raw"):
+    """
+    Télécharge un profil
+
+    - **format**: raw (fichier .prof / .collapsed) ou text (résumé pstats d'un .prof)
+    """
+    _require_profiling()
+    path = profile_store.path(name)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profil introuvable")
+
+    if format == "text" and path.suffix == ".prof":
+        return Response(
+            content=pstats_summary(str(path), limit=40), media_type="text/plain"
+        )
+
+    return FileResponse(str(path), filename=name)
+
+
 @app.post("/api/save-encounter")
 async def save_encounter(
     encounter: EncounterRequest,
     selected_code: str,
     total_fee: float,
-    physician_id: str = "default"
+    physician_id: str = "default",
 ):
     """
     Sauvegarde un encounter pour historique
     """
-    import sqlite3
-    import json
-    
     try:
-        conn = sqlite3.connect("data/ramq.db")
+        conn = db.connect(ai_engine.db_path)
         cursor = conn.cursor()
-        
-        cursor.execute("""
+
+        cursor.execute(
+            """
             INSERT INTO encounters 
             (physician_id, triage_level, chief_complaint, procedures, duration_minutes,
              encounter_datetime, selected_code, total_fee)
             VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-        """, (
-            physician_id,
-            encounter.triage_level,
-            encounter.chief_complaint,
-            json.dumps(encounter.procedures),
-            encounter.duration_minutes,
-            encounter.encounter_datetime or datetime.now().isoformat(),
-            selected_code,
-            total_fee
-        ))
-        
+        """,
+            (
+                physician_id,
+                encounter.triage_level,
+                encounter.chief_complaint,
+                json.dumps(encounter.procedures),
+                encounter.duration_minutes,
+                encounter.encounter_datetime or datetime.now().isoformat(),
+                selected_code,
+                total_fee,
+            ),
+        )
+
         conn.commit()
         encounter_id = cursor.lastrowid
         conn.close()
-        
+
         return {
             "success": True,
             "encounter_id": encounter_id,
-            "message": "Encounter sauvegardé"
+            "message": "Encounter sauvegardé",
         }
-        
+
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erreur sauvegarde: {str(e)}")
 
+
+@app.get("/api/encounters/export")
+async def export_encounters(
+    format: str = "csv",
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    physician_id: Optional[str] = None,
+):
+    """
+    Exporte l'historique des encounters en continu (mémoire constante)
+
+    - **format**: csv, ndjson ou parquet (parquet nécessite pyarrow)
+    - **start**: date/heure ISO incluse (ex: 2024-11-01)
+    - **end**: date/heure ISO exclue (ex: 2024-12-01)
+    - **physician_id**: filtrer par médecin
+    """
+    try:
+        content = stream_export(
+            ai_engine.db_path,
+            export_format=format,
+            start=start,
+            end=end,
+            physician_id=physician_id,
+        )
+    except (ValueError, ImportError) as e:
+        raise HTTPException(status_code=400, detail=f"Erreur export: {str(e)}")
+
+    filename = export_filename(
+        format, {"start": start, "end": end, "physician_id": physician_id}
+    )
+
+    return StreamingResponse(
+        content,
+        media_type=EXPORT_FORMATS[format][0],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
 # Lancement direct
 if __name__ == "__main__":
     import uvicorn
+
     uvicorn.run(app, host="0.0.0.0", port=8080)
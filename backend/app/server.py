@@ -0,0 +1,192 @@
+"""
+RAMQ Billing Assistant - Serveur multi-workers (pré-fork)
+
+Le parent prépare tout une seule fois (migration, catalogue, index, matrice
+d'embeddings en mmap), ouvre le socket d'écoute, puis fork N workers uvicorn
+qui héritent de cet état en copie sur écriture. Chaque worker garde son propre
+cache mémoire (niveau 1) devant le cache SQLite partagé (niveau 2).
+
+Le parent surveille les workers et relance ceux qui meurent.
+Sans os.fork (Windows), démarre un seul processus uvicorn.
+
+Usage (depuis backend/):
+    python -m app.server --workers 4 --port 8080
+"""
+
+import argparse
+import gc
+import os
+import signal
+import socket
+import sys
+import time
+import traceback
+from typing import Dict
+
+# Délai minimal entre deux relances d'un même worker
+RESPAWN_DELAY = 1.0
+
+
+def bind_socket(host: str, port: int, backlog: int = 2048) -> socket.socket:
+    """Socket d'écoute partagé par tous les workers (accept() réparti par le noyau)"""
+
+    sock = socket.socket(
+        socket.AF_INET6 if ":" in host else socket.AF_INET, socket.SOCK_STREAM
+    )
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def run_worker(sock: socket.socket, log_level: str):
+    """Boucle uvicorn d'un worker sur le socket hérité"""
+
+    import uvicorn
+    from app.main import app
+
+    config = uvicorn.Config(app, log_level=log_level, access_log=False)
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+class PreforkServer:
+    """Parent: fork, supervision et arrêt propre des workers"""
+
+    def __init__(self, sock: socket.socket, workers: int, log_level: str = "warning"):
+        self.sock = sock
+        self.workers = workers
+        self.log_level = log_level
+        self.children: Dict[int, int] = {}  # pid -> numéro de worker
+        self.started_at: Dict[int, float] = {}
+        self.stopping = False
+
+    def spawn(self, worker_id: int):
+        pid = os.fork()
+        if pid == 0:
+            # Worker: uvicorn installe ses propres gestionnaires de signaux
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            code = 0
+            try:
+                run_worker(self.sock, self.log_level)
+            except Exception:
+                traceback.print_exc()
+                code = 1
+            finally:
+                os._exit(code)
+
+        self.children[pid] = worker_id
+        self.started_at[worker_id] = time.monotonic()
+        print(f"👷 Worker {worker_id} démarré (pid {pid})")
+
+    def stop(self, signum, frame):
+        if self.stopping:
+            return
+        self.stopping = True
+        print(f"🛑 Arrêt des {len(self.children)} workers...")
+        for pid in list(self.children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def run(self):
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+
+        for worker_id in range(self.workers):
+            self.spawn(worker_id)
+
+        while self.children:
+            try:
+                pid, status = os.wait()
+            except ChildProcessError:
+                break
+
+            worker_id = self.children.pop(pid, None)
+            if worker_id is None or self.stopping:
+                continue
+
+            print(
+                f"⚠️ Worker {worker_id} (pid {pid}) arrêté (statut {status}), relance"
+            )
+            elapsed = time.monotonic() - self.started_at.get(worker_id, 0.0)
+            if elapsed < RESPAWN_DELAY:
+                time.sleep(RESPAWN_DELAY - elapsed)
+            if not self.stopping:
+                self.spawn(worker_id)
+
+        self.sock.close()
+        print("👋 Serveur arrêté")
+
+
+def serve(
+    host: str,
+    port: int,
+    workers: int,
+    db_path: str,
+    load_embeddings: bool,
+    log_level: str,
+):
+    from app import main
+
+    if workers > 1 and not hasattr(os, "fork"):
+        print("⚠️ os.fork indisponible sur cette plateforme: un seul worker")
+        workers = 1
+
+    print(f"🚀 Préchargement avant fork ({workers} workers)")
+    started = time.perf_counter()
+    main.warm_up(db_path, load_embeddings=load_embeddings)
+    print(f"✅ Préchargé en {time.perf_counter() - started:.2f}s")
+
+    sock = bind_socket(host, port)
+
+    if workers == 1:
+        run_worker(sock, log_level)
+        return
+
+    # Le processus d'inférence du parent ne sert à rien après le fork:
+    # chaque worker démarre le sien au premier encodage
+    if main.ai_engine.inference is not None:
+        main.ai_engine.inference.shutdown()
+
+    # Objets préchargés sortis du suivi du GC: les collections des workers
+    # n'écrivent plus dans ces pages, qui restent partagées
+    gc.collect()
+    gc.freeze()
+
+    print(f"🌐 Écoute sur http://{host}:{port}")
+    PreforkServer(sock, workers, log_level).run()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Serveur multi-workers RAMQ Billing Assistant"
+    )
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument(
+        "--workers", type=int, default=os.cpu_count() or 1, help="Nombre de processus"
+    )
+    parser.add_argument("--db", default="data/ramq.db", help="Base SQLite")
+    parser.add_argument(
+        "--no-embeddings",
+        action="store_true",
+        help="Ne pas précharger le modèle d'embeddings",
+    )
+    parser.add_argument("--log-level", default="warning")
+    args = parser.parse_args()
+
+    serve(
+        args.host,
+        args.port,
+        max(1, args.workers),
+        args.db,
+        not args.no_embeddings,
+        args.log_level,
+    )
+
+
+if __name__ == "__main__":
+    sys.exit(main())
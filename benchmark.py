@@ -0,0 +1,1094 @@
+"""
+Suite de benchmarks reproductible - RAMQ Billing Assistant
+Mesure le moteur (LocalAIEngine) et l'API (client de test FastAPI en processus)
+sur une charge synthétique: débit, percentiles de latence, allocations, taux de cache
+
+Usage:
+    python benchmark.py run --n 2000 --seed 42 --output bench_results/base.json
+    python benchmark.py compare bench_results/base.json bench_results/new.json
+    python benchmark.py scaling --workers 1,2,4 --concurrency 64 --duration 15
+    python benchmark.py embeddings --backends minilm,ngram
+    python benchmark.py quantization --rows 20000 --dim 384
+    python benchmark.py startup --modes minimal,local,hybrid --budget-ms 2000 --fail-over-budget
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List
+
+BACKEND_DIR = Path(__file__).parent / "backend"
+sys.path.append(str(BACKEND_DIR))
+
+SOURCE_DB = BACKEND_DIR / "data" / "ramq.db"
+
+# Répartition réaliste des niveaux de triage à l'urgence
+TRIAGE_MIX = {1: 0.02, 2: 0.15, 3: 0.40, 4: 0.30, 5: 0.13}
+
+COMPLAINTS = [
+    "Douleur thoracique atypique",
+    "Douleur abdominale",
+    "Dyspnée",
+    "Céphalée",
+    "Lacération avant-bras",
+    "Lacération cuir chevelu",
+    "Entorse cheville",
+    "Fracture poignet",
+    "Fièvre enfant",
+    "Syncope",
+    "Palpitations",
+    "Lombalgie",
+    "Réaction allergique",
+    "Douleur pelvienne",
+    "Trauma crânien mineur",
+    "Crise d'asthme",
+    "Vertiges",
+    "Infection urinaire",
+    "Cellulite jambe",
+    "Intoxication éthylique",
+    "Idées suicidaires",
+    "Brûlure main",
+]
+
+PROCEDURES = [
+    [],
+    [],
+    [],
+    ["ECG"],
+    ["ECG", "Enzymes cardiaques"],
+    ["Suture simple"],
+    ["Suture complexe avant-bras"],
+    ["Plâtre bras"],
+    ["Plâtre jambe"],
+    ["Radiographie"],
+    ["ECG", "Radiographie"],
+    ["sutre"],
+    ["platre bras"],
+    ["eletrocardiogram"],
+]
+
+# Jours fériés reconnus par le moteur (pour forcer le modificateur FÉRIÉ)
+HOLIDAYS = ["2024-06-24", "2024-07-01", "2024-12-25", "2025-01-01", "2025-09-01"]
+
+
+def generate_encounter(rng: random.Random) -> Dict:
+    """Un encounter synthétique (nuits, fins de semaine et fériés inclus)"""
+
+    triage = rng.choices(list(TRIAGE_MIX), weights=list(TRIAGE_MIX.values()))[0]
+
+    roll = rng.random()
+    if roll < 0.10:
+        day = datetime.fromisoformat(rng.choice(HOLIDAYS))
+    else:
+        day = datetime(2024, 1, 1) + timedelta(days=rng.randrange(730))
+    if rng.random() < 0.30:
+        hour = rng.choice([23, 0, 1, 2, 3, 4, 5, 6])  # Nuit
+    else:
+        hour = rng.randrange(7, 23)
+    moment = day.replace(hour=hour, minute=rng.randrange(60))
+
+    return {
+        "triage_level": triage,
+        "chief_complaint": rng.choice(COMPLAINTS),
+        "procedures": list(rng.choice(PROCEDURES)),
+        "duration_minutes": max(5, int(rng.gauss(40 if triage <= 2 else 25, 15))),
+        "encounter_datetime": moment.isoformat(),
+    }
+
+
+def generate_workload(n: int, seed: int) -> List[Dict]:
+    rng = random.Random(seed)
+    return [generate_encounter(rng) for _ in range(n)]
+
+
+def percentiles(samples_ns: List[int]) -> Dict:
+    """Percentiles de latence en millisecondes"""
+
+    if not samples_ns:
+        return {}
+    ordered = sorted(samples_ns)
+
+    def pick(q):
+        return (
+            ordered[min(len(ordered) - 1, int(round(q / 100 * (len(ordered) - 1))))]
+            / 1e6
+        )
+
+    return {
+        "p50_ms": round(pick(50), 4),
+        "p90_ms": round(pick(90), 4),
+        "p95_ms": round(pick(95), 4),
+        "p99_ms": round(pick(99), 4),
+        "max_ms": round(ordered[-1] / 1e6, 4),
+        "mean_ms": round(sum(ordered) / len(ordered) / 1e6, 4),
+    }
+
+
+@contextmanager
+def isolated_database():
+    """Copie de la base dans un dossier temporaire (cache vidé, schéma migré)"""
+
+    from app.core.init_db import migrate_database
+
+    workdir = Path(tempfile.mkdtemp(prefix="ramq_bench_"))
+    db_path = workdir / "data" / "ramq.db"
+    db_path.parent.mkdir(parents=True)
+    shutil.copy(SOURCE_DB, db_path)
+    migrate_database(str(db_path))
+
+    try:
+        yield workdir, db_path
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def clear_cache(db_path: Path, engine=None):
+    """Vide le cache SQLite et, si fourni, le cache mémoire du moteur"""
+    import sqlite3
+
+    if engine is not None:
+        engine.memory_cache.clear()
+    conn = sqlite3.connect(str(db_path))
+    conn.execute("DELETE FROM ai_cache")
+    conn.commit()
+    conn.close()
+
+
+def _cache_counters(instrumentation) -> Dict[str, int]:
+    counters = instrumentation.counters_snapshot()
+    hits = sum(v for k, v in counters.items() if k.startswith("cache_hits_"))
+    return {"hits": hits, "misses": counters.get("cache_misses", 0)}
+
+
+def _measure(call, workload: List[Dict], instrumentation) -> Dict:
+    """Exécute la charge et retourne débit, latences et taux de cache"""
+
+    before = _cache_counters(instrumentation)
+    samples = []
+    started = time.perf_counter()
+    for encounter in workload:
+        t0 = time.perf_counter_ns()
+        call(encounter)
+        samples.append(time.perf_counter_ns() - t0)
+    elapsed = time.perf_counter() - started
+    after = _cache_counters(instrumentation)
+
+    hits = after["hits"] - before["hits"]
+    misses = after["misses"] - before["misses"]
+    return {
+        "ops": len(workload),
+        "ops_per_s": round(len(workload) / elapsed, 1) if elapsed else None,
+        "latency": percentiles(samples),
+        "cache_hit_rate": round(hits / (hits + misses), 4) if hits + misses else None,
+    }
+
+
+def _measure_allocations(call, workload: List[Dict]) -> Dict:
+    """Allocations Python (tracemalloc) sur un échantillon, hors mesure de temps"""
+
+    tracemalloc.start()
+    baseline, _ = tracemalloc.get_traced_memory()
+    tracemalloc.reset_peak()
+    for encounter in workload:
+        call(encounter)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "sample_ops": len(workload),
+        "peak_kb": round((peak - baseline) / 1024, 1),
+        "retained_kb": round((current - baseline) / 1024, 1),
+    }
+
+
+def bench_engine(workload: List[Dict], alloc_sample: int) -> Dict:
+    """LocalAIEngine.analyze_encounter appelé directement"""
+
+    from app.core.ai_local import LocalAIEngine
+    from app.core.instrumentation import instrumentation
+
+    results = {}
+    with isolated_database() as (_, db_path):
+        engine = LocalAIEngine(str(db_path))
+
+        clear_cache(db_path, engine)
+        results["cold"] = _measure(engine.analyze_encounter, workload, instrumentation)
+        results["warm"] = _measure(engine.analyze_encounter, workload, instrumentation)
+
+        clear_cache(db_path, engine)
+        results["cold"]["allocations"] = _measure_allocations(
+            engine.analyze_encounter, workload[:alloc_sample]
+        )
+        results["warm"]["allocations"] = _measure_allocations(
+            engine.analyze_encounter, workload[:alloc_sample]
+        )
+
+    return results
+
+
+def bench_api(workload: List[Dict], alloc_sample: int) -> Dict:
+    """POST /api/analyze via le client de test FastAPI (sans réseau)"""
+
+    from fastapi.testclient import TestClient
+    from app.core.instrumentation import instrumentation
+
+    results = {}
+    previous_cwd = os.getcwd()
+    with isolated_database() as (workdir, db_path):
+        # L'API ouvre data/ramq.db relativement au dossier courant
+        os.chdir(workdir)
+        try:
+            from app import main
+            from app.main import app
+
+            with TestClient(app) as client:
+
+                def call(encounter):
+                    response = client.post("/api/analyze", json=encounter)
+                    response.raise_for_status()
+
+                clear_cache(db_path, main.ai_engine)
+                results["cold"] = _measure(call, workload, instrumentation)
+                results["warm"] = _measure(call, workload, instrumentation)
+
+                clear_cache(db_path, main.ai_engine)
+                results["cold"]["allocations"] = _measure_allocations(
+                    call, workload[:alloc_sample]
+                )
+                results["warm"]["allocations"] = _measure_allocations(
+                    call, workload[:alloc_sample]
+                )
+
+                results["codes"] = _measure(
+                    lambda _: client.get("/api/codes?limit=100").raise_for_status(),
+                    [None] * 50,
+                    instrumentation,
+                )
+                results["codes"].pop("cache_hit_rate")
+        finally:
+            os.chdir(previous_cwd)
+
+    return results
+
+
+def environment_info(args) -> Dict:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            cwd=Path(__file__).parent,
+        ).stdout.strip()
+    except Exception:
+        commit = None
+
+    return {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "git_commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "n": getattr(args, "n", None),
+        "seed": getattr(args, "seed", None),
+    }
+
+
+def run(args):
+    workload = generate_workload(args.n, args.seed)
+    print(f"🏁 Charge synthétique: {len(workload)} encounters (seed={args.seed})")
+
+    report = {"meta": environment_info(args), "results": {}}
+
+    print("⏱️  Moteur (appel direct)...")
+    report["results"]["engine"] = bench_engine(workload, args.alloc_sample)
+
+    if not args.skip_api:
+        print("⏱️  API (client de test en processus)...")
+        report["results"]["api"] = bench_api(workload, args.alloc_sample)
+
+    print_report(report)
+
+    output = Path(
+        args.output or f"bench_results/bench_{datetime.now():%Y%m%d_%H%M%S}.json"
+    )
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(
+        json.dumps(report, indent=2, ensure_ascii=False), encoding="utf-8"
+    )
+    print(f"\n💾 Résultats: {output}")
+
+
+def _wait_for_server(
+    url: str, process: subprocess.Popen, timeout: float = 60.0, interval: float = 0.2
+):
+    import httpx
+
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(
+                f"Serveur arrêté au démarrage (code {process.returncode})"
+            )
+        try:
+            if httpx.get(f"{url}/health", timeout=1).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(interval)
+    raise RuntimeError("Serveur non disponible")
+
+
+def bench_scaling(args) -> Dict:
+    """
+    Débit en boucle fermée (test de charge HTTP) selon le nombre de workers
+    Le générateur de charge tourne sur la même machine: il consomme lui-même
+    des cœurs, l'efficacité mesurée est donc une borne inférieure
+    """
+
+    import asyncio
+    import signal
+
+    from load_test import parse_mix, run_closed
+
+    mix = parse_mix(args.mix)
+    results = {}
+    baseline = None
+
+    for workers in [int(w) for w in args.workers.split(",")]:
+        with isolated_database() as (workdir, _):
+            port = args.port
+            process = subprocess.Popen(
+                [
+                    sys.executable,
+                    "-m",
+                    "app.server",
+                    "--workers",
+                    str(workers),
+                    "--port",
+                    str(port),
+                    "--host",
+                    "127.0.0.1",
+                    "--no-embeddings",
+                ],
+                cwd=workdir,
+                env={**os.environ, "PYTHONPATH": str(BACKEND_DIR)},
+                stdout=subprocess.DEVNULL,
+            )
+            url = f"http://127.0.0.1:{port}"
+            try:
+                _wait_for_server(url, process)
+                # Réchauffement: caches des workers et connexions
+                asyncio.run(run_closed(url, args.concurrency, 2, mix, args.seed))
+                result = asyncio.run(
+                    run_closed(url, args.concurrency, args.duration, mix, args.seed)
+                )
+            finally:
+                process.send_signal(signal.SIGTERM)
+                process.wait(timeout=30)
+
+        throughput = result["throughput_rps"]
+        baseline = baseline or throughput
+        results[f"workers_{workers}"] = {
+            "workers": workers,
+            "ops_per_s": throughput,
+            "latency": result["latency"],
+            "errors": result["errors"],
+            "speedup": round(throughput / baseline, 2) if baseline else None,
+            "efficiency": round(throughput / baseline / workers, 2)
+            if baseline
+            else None,
+        }
+        print(
+            f"  {workers:>3} workers: {throughput:>8} req/s  p99 {result['latency'].get('p99_ms')}ms  "
+            f"accélération x{results[f'workers_{workers}']['speedup']}"
+        )
+
+    return results
+
+
+def scaling(args):
+    print(
+        f"🏁 Mise à l'échelle: workers {args.workers}, {args.concurrency} clients, {args.duration}s "
+        f"({os.cpu_count()} cœurs)"
+    )
+
+    report = {
+        "meta": environment_info(args),
+        "results": {"scaling": bench_scaling(args)},
+    }
+
+    output = Path(
+        args.output or f"bench_results/scaling_{datetime.now():%Y%m%d_%H%M%S}.json"
+    )
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(
+        json.dumps(report, indent=2, ensure_ascii=False), encoding="utf-8"
+    )
+    print(f"\n💾 Résultats: {output}")
+
+
+def embedding_eval_set(codes: List, seed: int) -> List[Dict]:
+    """
+    Requêtes dérivées du catalogue, avec les codes attendus (même description):
+    description exacte, faute de frappe (une lettre retirée), description partielle
+    """
+
+    rng = random.Random(seed)
+    by_description: Dict[str, List[str]] = {}
+    for code, description, _ in codes:
+        by_description.setdefault(description.lower(), []).append(code)
+
+    queries = []
+    for description, expected in by_description.items():
+        words = description.split()
+        queries.append({"kind": "exact", "query": description, "expected": expected})
+
+        longest = max(range(len(words)), key=lambda i: len(words[i]))
+        if len(words[longest]) >= 5:
+            position = rng.randrange(1, len(words[longest]) - 1)
+            typo = (
+                words[:longest]
+                + [words[longest][:position] + words[longest][position + 1 :]]
+                + words[longest + 1 :]
+            )
+            queries.append(
+                {"kind": "typo", "query": " ".join(typo), "expected": expected}
+            )
+
+        if len(words) >= 3:
+            partial = words[:]
+            del partial[rng.randrange(len(partial))]
+            queries.append(
+                {"kind": "partial", "query": " ".join(partial), "expected": expected}
+            )
+    return queries
+
+
+def _measure_embedder(
+    backend: str, db_path: str, queries: List[str], top_k: int
+) -> Dict:
+    """Exécuté dans un processus neuf: chargement, mémoire (RSS max), latence, classements"""
+
+    import resource
+    import sqlite3
+
+    import numpy as np
+
+    rss_baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    conn = sqlite3.connect(db_path)
+    codes = conn.execute(
+        "SELECT code, description, category FROM ramq_codes"
+    ).fetchall()
+    conn.close()
+    descriptions = [f"{description} {category}" for _, description, category in codes]
+
+    start = time.perf_counter()
+    try:
+        from app.core.embeddings import create_embedder
+
+        embedder = create_embedder(backend)
+    except Exception as e:
+        return {"available": False, "error": f"{type(e).__name__}: {e}"}
+    load_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    embedder.fit(descriptions)
+    matrix = embedder.encode(descriptions)
+    catalog_s = time.perf_counter() - start
+
+    samples, rankings = [], []
+    for query in queries:
+        start = time.perf_counter_ns()
+        similarities = matrix @ embedder.encode([query])[0]
+        top = np.argsort(similarities)[-top_k:][::-1]
+        samples.append(time.perf_counter_ns() - start)
+        rankings.append([codes[i][0] for i in top])
+
+    start = time.perf_counter()
+    embedder.encode(queries)
+    batch_s = time.perf_counter() - start
+
+    return {
+        "available": True,
+        "name": embedder.name,
+        "dim": int(matrix.shape[1]),
+        "load_s": round(load_s, 3),
+        "catalog_encode_s": round(catalog_s, 3),
+        "query": percentiles(samples),
+        "batch_queries_per_s": round(len(queries) / batch_s, 1) if batch_s else None,
+        # ru_maxrss: Ko sous Linux
+        "rss_peak_mb": round(
+            resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1
+        ),
+        "rss_added_mb": round(
+            (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_baseline) / 1024,
+            1,
+        ),
+        "matrix_mb": round(matrix.nbytes / 1e6, 3),
+        "rankings": rankings,
+    }
+
+
+def _ranking_quality(eval_set: List[Dict], rankings: List[List[str]]) -> Dict:
+    """recall@1, recall@5 et MRR, globalement et par type de requête"""
+
+    def score(items):
+        recall_1 = recall_5 = reciprocal = 0.0
+        for item, ranking in items:
+            ranks = [
+                rank for rank, code in enumerate(ranking, 1) if code in item["expected"]
+            ]
+            if ranks:
+                recall_1 += ranks[0] == 1
+                recall_5 += ranks[0] <= 5
+                reciprocal += 1 / ranks[0]
+        n = len(items) or 1
+        return {
+            "recall_at_1": round(recall_1 / n, 3),
+            "recall_at_5": round(recall_5 / n, 3),
+            "mrr": round(reciprocal / n, 3),
+            "queries": len(items),
+        }
+
+    pairs = list(zip(eval_set, rankings))
+    quality = {"all": score(pairs)}
+    for kind in sorted({item["kind"] for item in eval_set}):
+        quality[kind] = score([pair for pair in pairs if pair[0]["kind"] == kind])
+    return quality
+
+
+def bench_embeddings(args) -> Dict:
+    """Qualité / latence / mémoire de chaque embedder (un processus neuf chacun)"""
+
+    import multiprocessing
+    import sqlite3
+
+    conn = sqlite3.connect(str(SOURCE_DB))
+    codes = conn.execute(
+        "SELECT code, description, category FROM ramq_codes"
+    ).fetchall()
+    conn.close()
+
+    eval_set = embedding_eval_set(codes, args.seed)
+    clinical = sorted(
+        {
+            f"{complaint} {' '.join(procedures)}".strip()
+            for complaint in COMPLAINTS
+            for procedures in PROCEDURES
+        }
+    )
+    queries = [item["query"] for item in eval_set] + clinical
+
+    results, clinical_rankings = {}, {}
+    context = multiprocessing.get_context("spawn")
+    for backend in args.backends.split(","):
+        with context.Pool(1) as pool:
+            result = pool.apply(
+                _measure_embedder, (backend, str(SOURCE_DB), queries, args.top_k)
+            )
+        results[backend] = result
+        if not result["available"]:
+            print(f"  {backend:<8} indisponible: {result['error']}")
+            continue
+
+        rankings = result.pop("rankings")
+        result["quality"] = _ranking_quality(eval_set, rankings[: len(eval_set)])
+        clinical_rankings[backend] = rankings[len(eval_set) :]
+        quality = result["quality"]["all"]
+        print(
+            f"  {backend:<8} r@1 {quality['recall_at_1']:.3f}  r@5 {quality['recall_at_5']:.3f}  "
+            f"requête p50 {result['query']['p50_ms']}ms  chargement {result['load_s']}s  "
+            f"RSS +{result['rss_added_mb']} Mo"
+        )
+
+    # Accord des top-k sur des requêtes cliniques (plaintes + procédures), par rapport au premier
+    available = list(clinical_rankings)
+    for name in available[1:]:
+        overlaps = [
+            len(set(a) & set(b)) / args.top_k
+            for a, b in zip(clinical_rankings[available[0]], clinical_rankings[name])
+        ]
+        results[name][f"top{args.top_k}_overlap_vs_{available[0]}"] = round(
+            sum(overlaps) / len(overlaps), 3
+        )
+
+    return results
+
+
+def embeddings(args):
+    print(f"🏁 Embedders: {args.backends} (top {args.top_k}, seed={args.seed})")
+
+    report = {
+        "meta": environment_info(args),
+        "results": {"embeddings": bench_embeddings(args)},
+    }
+
+    output = Path(
+        args.output or f"bench_results/embeddings_{datetime.now():%Y%m%d_%H%M%S}.json"
+    )
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(
+        json.dumps(report, indent=2, ensure_ascii=False), encoding="utf-8"
+    )
+    print(f"\n💾 Résultats: {output}")
+
+
+def synthetic_embeddings(rows: int, dim: int, queries: int, seed: int):
+    """
+    Vecteurs normalisés groupés autour de centres (comme des descriptions
+    voisines d'un catalogue) et requêtes bruitées tirées de ces groupes
+    """
+    import numpy as np
+
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((max(1, rows // 20), dim)).astype(np.float32)
+    matrix = centers[rng.integers(len(centers), size=rows)] + 0.6 * rng.standard_normal(
+        (rows, dim)
+    ).astype(np.float32)
+    matrix /= np.linalg.norm(matrix, axis=1, keepdims=True)
+    picks = matrix[rng.integers(rows, size=queries)]
+    query_matrix = (
+        picks
+        + 0.5
+        * rng.standard_normal((queries, dim)).astype(np.float32)
+        / np.sqrt(dim)
+        * 4
+    )
+    query_matrix /= np.linalg.norm(query_matrix, axis=1, keepdims=True)
+    return matrix, query_matrix.astype(np.float32)
+
+
+def bench_quantization(args) -> Dict:
+    """Recall@k par rapport au float32 exact, débit top-k et mémoire par précision"""
+
+    import numpy as np
+
+    from app.core.vector_index import EmbeddingIndex
+
+    matrix, queries = synthetic_embeddings(args.rows, args.dim, args.queries, args.seed)
+    exact = EmbeddingIndex.from_matrix(matrix, "float32")
+    truth = [set(indices.tolist()) for indices, _ in exact.top_k_many(queries, args.k)]
+
+    variants = [("float32", 0), ("int8", 0), ("int8", args.rerank)]
+
+    results = {}
+    for precision, rerank in variants:
+        index = EmbeddingIndex.from_matrix(matrix, precision, rerank_factor=rerank)
+
+        found = index.top_k_many(queries, args.k)
+        recall = np.mean(
+            [
+                len(truth[i] & set(indices.tolist())) / args.k
+                for i, (indices, _) in enumerate(found)
+            ]
+        )
+
+        samples = []
+        for query in queries:
+            start = time.perf_counter_ns()
+            index.top_k(query, args.k)
+            samples.append(time.perf_counter_ns() - start)
+
+        start = time.perf_counter()
+        index.top_k_many(queries, args.k)
+        batch_s = time.perf_counter() - start
+
+        name = precision if not rerank else f"{precision}_rerank{rerank}"
+        results[name] = {
+            "recall_at_k": round(float(recall), 4),
+            "bytes": index.nbytes,
+            "memory_ratio": round(matrix.nbytes / index.nbytes, 2),
+            "query": percentiles(samples),
+            "single_queries_per_s": round(len(samples) / (sum(samples) / 1e9), 1),
+            "batch_queries_per_s": round(len(queries) / batch_s, 1),
+        }
+        print(
+            f"  {name:<18} recall@{args.k} {recall:.4f}  {index.nbytes / 1e6:>7.2f} Mo  "
+            f"p50 {results[name]['query']['p50_ms']}ms  lot {results[name]['batch_queries_per_s']} req/s"
+        )
+
+    return results
+
+
+def quantization(args):
+    print(
+        f"🏁 Quantification: {args.rows} x {args.dim}, {args.queries} requêtes, top {args.k} "
+        f"(re-classement x{args.rerank})"
+    )
+
+    report = {
+        "meta": environment_info(args),
+        "results": {"quantization": bench_quantization(args)},
+    }
+
+    output = Path(
+        args.output or f"bench_results/quantization_{datetime.now():%Y%m%d_%H%M%S}.json"
+    )
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(
+        json.dumps(report, indent=2, ensure_ascii=False), encoding="utf-8"
+    )
+    print(f"\n💾 Résultats: {output}")
+
+
+# Modes de démarrage mesurés (variables d'environnement de l'API)
+STARTUP_MODES = {
+    "minimal": {"RAMQ_MINIMAL": "1"},
+    "local": {},
+    "hybrid": {"RAMQ_ENGINE": "hybrid"},
+}
+
+# Modules lourds qui ne doivent pas être importés sans la fonctionnalité qui les utilise
+HEAVY_MODULES = [
+    "numpy",
+    "httpx",
+    "torch",
+    "sentence_transformers",
+    "pandas",
+    "multiprocessing",
+]
+
+STARTUP_PROBE = """
+import json, sys
+import app.main as main
+main.warm_up()
+print(json.dumps([name for name in %r if name in sys.modules]))
+""" % (
+    HEAVY_MODULES,
+)
+
+
+def parse_importtime(stderr: str) -> List[Dict]:
+    """Lignes de -X importtime: module, profondeur, temps propre et cumulé (µs)"""
+
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:") :].split("|", 2)
+        entries.append(
+            {
+                "module": name.strip(),
+                "depth": (len(name) - len(name.lstrip()) - 1) // 2,
+                "self_us": int(self_us),
+                "cumulative_us": int(cumulative_us),
+            }
+        )
+    return entries
+
+
+def import_report(entries: List[Dict], root: str = "app.main", top: int = 10) -> Dict:
+    """Temps d'import de root et temps propre cumulé par paquet de premier niveau"""
+
+    total = next((e["cumulative_us"] for e in entries if e["module"] == root), 0)
+    by_package: Dict[str, int] = {}
+    for entry in entries:
+        package = entry["module"].split(".")[0]
+        by_package[package] = by_package.get(package, 0) + entry["self_us"]
+    heaviest = sorted(by_package.items(), key=lambda item: -item[1])[:top]
+    return {
+        "import_ms": round(total / 1000, 1),
+        "modules": len(entries),
+        "top_packages_ms": {package: round(us / 1000, 1) for package, us in heaviest},
+    }
+
+
+def _measure_startup(mode: str, workdir: Path, port: int) -> Dict:
+    import signal
+
+    env = {
+        key: value
+        for key, value in os.environ.items()
+        if key not in ("RAMQ_MINIMAL", "RAMQ_ENGINE")
+    }
+    env.update(STARTUP_MODES[mode], PYTHONPATH=str(BACKEND_DIR))
+
+    # Graphe d'imports (processus neuf: aucun module déjà en cache)
+    traced = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        cwd=workdir,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    report = import_report(parse_importtime(traced.stderr))
+
+    # Modules lourds chargés après l'import et la préparation du moteur
+    probe = subprocess.run(
+        [sys.executable, "-c", STARTUP_PROBE],
+        cwd=workdir,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    report["heavy_modules"] = json.loads(probe.stdout.strip().splitlines()[-1])
+
+    # Lancement du processus jusqu'au premier /health (import + démarrage + socket)
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "uvicorn",
+            "app.main:app",
+            "--host",
+            "127.0.0.1",
+            "--port",
+            str(port),
+            "--log-level",
+            "warning",
+        ],
+        cwd=workdir,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        _wait_for_server(f"http://127.0.0.1:{port}", process, interval=0.01)
+        report["ready_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    finally:
+        process.send_signal(signal.SIGTERM)
+        process.wait(timeout=30)
+    return report
+
+
+def bench_startup(args) -> Dict:
+    """
+    Démarrage à froid de l'API par mode: import de app.main (-X importtime),
+    modules lourds chargés, délai jusqu'au premier /health (médiane des répétitions)
+    """
+
+    results = {}
+    with isolated_database() as (workdir, _):
+        for mode in args.modes.split(","):
+            runs = [
+                _measure_startup(mode, workdir, args.port) for _ in range(args.repeat)
+            ]
+            report = runs[-1]
+            for key in ("import_ms", "ready_ms"):
+                report[key] = sorted(run[key] for run in runs)[len(runs) // 2]
+            results[mode] = report
+
+            top = ", ".join(
+                f"{package} {ms}ms"
+                for package, ms in list(report["top_packages_ms"].items())[:4]
+            )
+            print(
+                f"  {mode:<8} import {report['import_ms']:>7}ms  prêt {report['ready_ms']:>7}ms  "
+                f"lourds: {', '.join(report['heavy_modules']) or '-'}  ({top})"
+            )
+
+    return results
+
+
+def startup(args):
+    print(
+        f"🏁 Démarrage: modes {args.modes}, {args.repeat} répétitions, budget {args.budget_ms}ms"
+    )
+
+    results = bench_startup(args)
+    report = {"meta": environment_info(args), "results": {"startup": results}}
+
+    output = Path(
+        args.output or f"bench_results/startup_{datetime.now():%Y%m%d_%H%M%S}.json"
+    )
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(
+        json.dumps(report, indent=2, ensure_ascii=False), encoding="utf-8"
+    )
+    print(f"\n💾 Résultats: {output}")
+
+    # Budget: délai de démarrage de chaque mode; le mode minimal n'importe aucun module lourd
+    failures = [
+        f"{mode}: prêt en {stats['ready_ms']}ms"
+        for mode, stats in results.items()
+        if stats["ready_ms"] > args.budget_ms
+    ]
+    if results.get("minimal", {}).get("heavy_modules"):
+        failures.append(
+            f"minimal: modules lourds importés ({', '.join(results['minimal']['heavy_modules'])})"
+        )
+    for failure in failures:
+        print(f"❌ Budget dépassé - {failure}")
+    if not failures:
+        print(f"✅ Tous les modes démarrent sous {args.budget_ms}ms")
+    sys.exit(1 if failures and args.fail_over_budget else 0)
+
+
+def print_report(report: Dict):
+    print("\n" + "=" * 72)
+    for target, phases in report["results"].items():
+        for phase, stats in phases.items():
+            if not isinstance(stats, dict) or "latency" not in stats:
+                continue
+            latency = stats["latency"]
+            hit_rate = stats.get("cache_hit_rate")
+            hit = f"{hit_rate * 100:5.1f}%" if hit_rate is not None else "   - "
+            print(
+                f"{target:>7} {phase:<6} {stats['ops_per_s']:>10} ops/s  "
+                f"p50 {latency['p50_ms']:>8}ms  p99 {latency['p99_ms']:>8}ms  cache {hit}"
+            )
+    print("=" * 72)
+
+
+def _flatten(prefix: str, value, out: Dict):
+    if isinstance(value, dict):
+        for key, item in value.items():
+            _flatten(f"{prefix}.{key}" if prefix else key, item, out)
+    elif isinstance(value, (int, float)) and not isinstance(value, bool):
+        out[prefix] = value
+
+
+def compare(args):
+    """Affiche l'écart relatif entre deux fichiers de résultats"""
+
+    base = json.loads(Path(args.baseline).read_text(encoding="utf-8"))
+    new = json.loads(Path(args.candidate).read_text(encoding="utf-8"))
+
+    base_flat, new_flat = {}, {}
+    _flatten("", base["results"], base_flat)
+    _flatten("", new["results"], new_flat)
+
+    print(f"Base: {base['meta'].get('git_commit')} ({base['meta']['timestamp']})")
+    print(f"Nouveau: {new['meta'].get('git_commit')} ({new['meta']['timestamp']})\n")
+
+    regressions = 0
+    for key in sorted(base_flat):
+        if key not in new_flat or not base_flat[key] or key.endswith("ops"):
+            continue
+        delta = (new_flat[key] - base_flat[key]) / base_flat[key] * 100
+        # Débit: plus haut = mieux; latences et mémoire: plus bas = mieux
+        worse = delta < -args.threshold if "per_s" in key else delta > args.threshold
+        marker = "❌" if worse else "  "
+        regressions += worse
+        print(
+            f"{marker} {key:<55} {base_flat[key]:>12} → {new_flat[key]:>12} ({delta:+.1f}%)"
+        )
+
+    print(f"\n{regressions} régression(s) au-delà de {args.threshold}%")
+    sys.exit(1 if regressions and args.fail_on_regression else 0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks RAMQ Billing Assistant")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_run = sub.add_parser("run", help="Moteur + API, cache froid et chaud")
+    p_run.add_argument("--n", type=int, default=2000, help="Nombre d'encounters")
+    p_run.add_argument("--seed", type=int, default=42)
+    p_run.add_argument(
+        "--alloc-sample",
+        type=int,
+        default=200,
+        help="Encounters mesurés avec tracemalloc",
+    )
+    p_run.add_argument("--skip-api", action="store_true")
+    p_run.add_argument("--output", help="Fichier JSON de résultats")
+    p_run.set_defaults(func=run)
+
+    p_cmp = sub.add_parser("compare", help="Compare deux fichiers de résultats")
+    p_cmp.add_argument("baseline")
+    p_cmp.add_argument("candidate")
+    p_cmp.add_argument(
+        "--threshold", type=float, default=10.0, help="Écart toléré en %%"
+    )
+    p_cmp.add_argument("--fail-on-regression", action="store_true")
+    p_cmp.set_defaults(func=compare)
+
+    p_scale = sub.add_parser(
+        "scaling", help="Débit HTTP selon le nombre de workers (app.server)"
+    )
+    p_scale.add_argument(
+        "--workers", default="1,2,4", help="Nombres de workers à comparer"
+    )
+    p_scale.add_argument(
+        "--concurrency", type=int, default=64, help="Clients simultanés"
+    )
+    p_scale.add_argument(
+        "--duration", type=float, default=15, help="Durée par mesure (s)"
+    )
+    p_scale.add_argument(
+        "--mix", default="analyze=8,codes=2", help="Pondération des scénarios"
+    )
+    p_scale.add_argument("--port", type=int, default=8097)
+    p_scale.add_argument("--seed", type=int, default=42)
+    p_scale.add_argument("--output", help="Fichier JSON de résultats")
+    p_scale.set_defaults(func=scaling)
+
+    p_emb = sub.add_parser(
+        "embeddings", help="Compare les embedders (qualité, latence, mémoire)"
+    )
+    p_emb.add_argument(
+        "--backends",
+        default="minilm,ngram",
+        help="Embedders à comparer (le premier sert de référence)",
+    )
+    p_emb.add_argument("--top-k", type=int, default=5)
+    p_emb.add_argument("--seed", type=int, default=42)
+    p_emb.add_argument("--output", help="Fichier JSON de résultats")
+    p_emb.set_defaults(func=embeddings)
+
+    p_quant = sub.add_parser(
+        "quantization", help="float32 / int8: recall, débit top-k, mémoire"
+    )
+    p_quant.add_argument(
+        "--rows", type=int, default=20000, help="Lignes de la matrice synthétique"
+    )
+    p_quant.add_argument("--dim", type=int, default=384)
+    p_quant.add_argument("--queries", type=int, default=500)
+    p_quant.add_argument("--k", type=int, default=5)
+    p_quant.add_argument(
+        "--rerank",
+        type=int,
+        default=4,
+        help="Facteur de candidats re-classés en float32",
+    )
+    p_quant.add_argument("--seed", type=int, default=42)
+    p_quant.add_argument("--output", help="Fichier JSON de résultats")
+    p_quant.set_defaults(func=quantization)
+
+    p_start = sub.add_parser(
+        "startup",
+        help="Démarrage à froid: imports (-X importtime) et délai jusqu'à /health",
+    )
+    p_start.add_argument(
+        "--modes",
+        default="minimal,local,hybrid",
+        help="Modes comparés (minimal, local, hybrid)",
+    )
+    p_start.add_argument(
+        "--repeat", type=int, default=3, help="Répétitions par mode (médiane)"
+    )
+    p_start.add_argument(
+        "--budget-ms",
+        type=float,
+        default=2000,
+        help="Délai de démarrage maximal par mode",
+    )
+    p_start.add_argument(
+        "--fail-over-budget",
+        action="store_true",
+        help="Code de sortie 1 si le budget est dépassé",
+    )
+    p_start.add_argument("--port", type=int, default=8098)
+    p_start.add_argument("--output", help="Fichier JSON de résultats")
+    p_start.set_defaults(func=startup)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Export de l'historique des encounters (CSV / NDJSON / Parquet)
+Usage:
+    python export_encounters.py --format csv --start 2024-11-01 --end 2024-12-01
+    python export_encounters.py --format parquet --physician 12345 -o novembre.parquet
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent / "backend"))
+
+from app.core.export import EXPORT_FORMATS, stream_export
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export des encounters RAMQ")
+    parser.add_argument(
+        "--db", default="backend/data/ramq.db", help="Base de données SQLite"
+    )
+    parser.add_argument(
+        "--format",
+        default="csv",
+        choices=sorted(EXPORT_FORMATS),
+        help="Format de sortie",
+    )
+    parser.add_argument("--start", help="Date/heure ISO incluse (ex: 2024-11-01)")
+    parser.add_argument("--end", help="Date/heure ISO exclue (ex: 2024-12-01)")
+    parser.add_argument("--physician", help="Identifiant du médecin")
+    parser.add_argument(
+        "-o", "--output", help="Fichier de sortie (défaut: sortie standard)"
+    )
+    args = parser.parse_args()
+
+    try:
+        chunks = stream_export(
+            args.db,
+            export_format=args.format,
+            start=args.start,
+            end=args.end,
+            physician_id=args.physician,
+        )
+    except (ValueError, ImportError) as e:
+        print(f"❌ {e}", file=sys.stderr)
+        sys.exit(1)
+
+    total = 0
+    out = open(args.output, "wb") if args.output else sys.stdout.buffer
+    try:
+        for chunk in chunks:
+            out.write(chunk)
+            total += len(chunk)
+    finally:
+        if args.output:
+            out.close()
+
+    if args.output:
+        print(
+            f"✅ Export {args.format} terminé: {args.output} ({total} octets)",
+            file=sys.stderr,
+        )
+
+
+if __name__ == "__main__":
+    main()
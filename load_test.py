@@ -0,0 +1,356 @@
+"""
+Test de charge - RAMQ Billing Assistant
+Clients concurrents (asyncio + httpx) contre un serveur uvicorn démarré
+
+Modes:
+    closed: N clients en boucle (chaque client attend sa réponse)
+    open:   arrivées de Poisson à débit fixe (RPS), indépendantes des réponses
+    sweep:  boucle fermée à concurrence croissante jusqu'à saturation
+
+Usage:
+    python load_test.py closed --concurrency 16 --duration 30
+    python load_test.py open --rps 200 --duration 30 --mix analyze=7,codes=2,save=1
+    python load_test.py sweep --max-concurrency 128 --duration 10
+
+⚠️ Le scénario "save" écrit dans la table encounters du serveur ciblé.
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import httpx
+
+from benchmark import generate_encounter, percentiles
+
+DEFAULT_MIX = "analyze=7,codes=2,save=1"
+
+
+def parse_mix(text: str) -> List[Tuple[str, float]]:
+    """ "analyze=7,codes=2" -> [("analyze", 7.0), ("codes", 2.0)]"""
+
+    mix = []
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in SCENARIOS:
+            raise ValueError(
+                f"Scénario inconnu: {name} (choix: {', '.join(SCENARIOS)})"
+            )
+        mix.append((name, float(weight or 1)))
+    return mix
+
+
+async def scenario_analyze(
+    client: httpx.AsyncClient, rng: random.Random
+) -> httpx.Response:
+    return await client.post("/api/analyze", json=generate_encounter(rng))
+
+
+async def scenario_codes(
+    client: httpx.AsyncClient, rng: random.Random
+) -> httpx.Response:
+    params = rng.choice(
+        [
+            {"limit": 100},
+            {
+                "search": rng.choice(
+                    ["suture", "consultation", "urgence", "plâtre", "visite"]
+                )
+            },
+            {"category": "actes techniques"},
+        ]
+    )
+    return await client.get("/api/codes", params=params)
+
+
+async def scenario_save(
+    client: httpx.AsyncClient, rng: random.Random
+) -> httpx.Response:
+    return await client.post(
+        "/api/save-encounter",
+        json=generate_encounter(rng),
+        params={
+            "selected_code": "9301.0",
+            "total_fee": 65.4,
+            "physician_id": f"load-test-{rng.randrange(20)}",
+        },
+    )
+
+
+SCENARIOS = {
+    "analyze": scenario_analyze,
+    "codes": scenario_codes,
+    "save": scenario_save,
+}
+
+
+class Recorder:
+    """Latences par scénario (ns) et erreurs"""
+
+    def __init__(self):
+        self.samples: Dict[str, List[int]] = {}
+        self.errors: Dict[str, int] = {}
+        self.started = time.perf_counter()
+        self.finished = None
+
+    def record(self, name: str, latency_ns: int, ok: bool):
+        self.samples.setdefault(name, []).append(latency_ns)
+        if not ok:
+            self.errors[name] = self.errors.get(name, 0) + 1
+
+    def summary(self) -> Dict:
+        elapsed = (self.finished or time.perf_counter()) - self.started
+        all_samples = [s for samples in self.samples.values() for s in samples]
+        return {
+            "duration_s": round(elapsed, 2),
+            "requests": len(all_samples),
+            "throughput_rps": round(len(all_samples) / elapsed, 1) if elapsed else 0,
+            "errors": sum(self.errors.values()),
+            "latency": percentiles(all_samples),
+            "by_scenario": {
+                name: {
+                    "requests": len(samples),
+                    "errors": self.errors.get(name, 0),
+                    "latency": percentiles(samples),
+                }
+                for name, samples in sorted(self.samples.items())
+            },
+        }
+
+
+async def _issue(client, name, rng, recorder: Recorder, intended_start: float = None):
+    """
+    Exécute un scénario; en boucle ouverte la latence part de l'instant prévu
+    (évite l'omission coordonnée quand le serveur prend du retard)
+    """
+
+    started = intended_start if intended_start is not None else time.perf_counter()
+    try:
+        response = await SCENARIOS[name](client, rng)
+        ok = response.status_code < 400
+    except httpx.HTTPError:
+        ok = False
+    recorder.record(name, int((time.perf_counter() - started) * 1e9), ok)
+
+
+async def run_closed(
+    base_url: str, concurrency: int, duration: float, mix, seed: int
+) -> Dict:
+    names = [name for name, _ in mix]
+    weights = [weight for _, weight in mix]
+    recorder = Recorder()
+    deadline = time.perf_counter() + duration
+    limits = httpx.Limits(
+        max_connections=concurrency, max_keepalive_connections=concurrency
+    )
+
+    async with httpx.AsyncClient(
+        base_url=base_url, timeout=30, limits=limits
+    ) as client:
+
+        async def worker(worker_id: int):
+            rng = random.Random(seed + worker_id)
+            while time.perf_counter() < deadline:
+                name = rng.choices(names, weights=weights)[0]
+                await _issue(client, name, rng, recorder)
+
+        await asyncio.gather(*(worker(i) for i in range(concurrency)))
+
+    recorder.finished = time.perf_counter()
+    return {"mode": "closed", "concurrency": concurrency, **recorder.summary()}
+
+
+async def run_open(
+    base_url: str, rps: float, duration: float, mix, seed: int, max_in_flight: int
+) -> Dict:
+    names = [name for name, _ in mix]
+    weights = [weight for _, weight in mix]
+    rng = random.Random(seed)
+    recorder = Recorder()
+    limits = httpx.Limits(
+        max_connections=max_in_flight, max_keepalive_connections=max_in_flight
+    )
+    tasks = set()
+    dropped = 0
+
+    async with httpx.AsyncClient(
+        base_url=base_url, timeout=30, limits=limits
+    ) as client:
+        start = time.perf_counter()
+        next_arrival = start
+        while next_arrival < start + duration:
+            delay = next_arrival - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+            if len(tasks) >= max_in_flight:
+                # Serveur saturé: la requête est comptée comme perdue
+                dropped += 1
+            else:
+                name = rng.choices(names, weights=weights)[0]
+                task = asyncio.create_task(
+                    _issue(
+                        client,
+                        name,
+                        random.Random(rng.random()),
+                        recorder,
+                        intended_start=next_arrival,
+                    )
+                )
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+
+            next_arrival += rng.expovariate(rps)
+
+        if tasks:
+            await asyncio.gather(*tasks)
+
+    recorder.finished = time.perf_counter()
+    return {"mode": "open", "target_rps": rps, "dropped": dropped, **recorder.summary()}
+
+
+async def run_sweep(
+    base_url: str,
+    max_concurrency: int,
+    duration: float,
+    mix,
+    seed: int,
+    min_gain: float,
+) -> Dict:
+    """
+    Double la concurrence tant que le débit progresse d'au moins `min_gain`
+    Le palier retenu donne le débit de saturation et la latence de queue associée
+    """
+
+    steps = []
+    concurrency = 1
+    best = None
+    while concurrency <= max_concurrency:
+        result = await run_closed(base_url, concurrency, duration, mix, seed)
+        steps.append(result)
+        print(
+            f"  concurrence {concurrency:>4}: {result['throughput_rps']:>8} req/s  "
+            f"p99 {result['latency'].get('p99_ms')}ms  erreurs {result['errors']}"
+        )
+        if best and result["throughput_rps"] < best["throughput_rps"] * (1 + min_gain):
+            break
+        if not best or result["throughput_rps"] > best["throughput_rps"]:
+            best = result
+        concurrency *= 2
+
+    return {
+        "mode": "sweep",
+        "saturation_rps": best["throughput_rps"] if best else 0,
+        "saturation_concurrency": best["concurrency"] if best else 0,
+        "saturation_p99_ms": best["latency"].get("p99_ms") if best else None,
+        "steps": steps,
+    }
+
+
+def print_summary(result: Dict):
+    print("\n" + "=" * 72)
+    if result["mode"] == "sweep":
+        print(
+            f"  Saturation: {result['saturation_rps']} req/s à {result['saturation_concurrency']} clients"
+        )
+        print(f"  p99 à saturation: {result['saturation_p99_ms']} ms")
+    else:
+        latency = result["latency"]
+        print(
+            f"  Mode {result['mode']}: {result['requests']} requêtes en {result['duration_s']}s"
+        )
+        print(
+            f"  Débit: {result['throughput_rps']} req/s   Erreurs: {result['errors']}"
+        )
+        if result["mode"] == "open":
+            print(
+                f"  Cible: {result['target_rps']} req/s   Perdues (saturation): {result['dropped']}"
+            )
+        print(
+            f"  Latence p50 {latency.get('p50_ms')}ms  p95 {latency.get('p95_ms')}ms  "
+            f"p99 {latency.get('p99_ms')}ms  max {latency.get('max_ms')}ms"
+        )
+        for name, stats in result["by_scenario"].items():
+            print(
+                f"    {name:<8} {stats['requests']:>7} req  p99 {stats['latency'].get('p99_ms')}ms  erreurs {stats['errors']}"
+            )
+    print("=" * 72)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Test de charge RAMQ Billing Assistant"
+    )
+    parser.add_argument("mode", choices=["closed", "open", "sweep"])
+    parser.add_argument("--url", default="http://localhost:8080", help="URL du serveur")
+    parser.add_argument(
+        "--duration", type=float, default=30, help="Durée par mesure (s)"
+    )
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="Pondération des scénarios")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--concurrency", type=int, default=16, help="Clients (closed)")
+    parser.add_argument("--rps", type=float, default=100, help="Débit cible (open)")
+    parser.add_argument(
+        "--max-in-flight",
+        type=int,
+        default=1000,
+        help="Requêtes simultanées max (open)",
+    )
+    parser.add_argument(
+        "--max-concurrency", type=int, default=256, help="Concurrence max (sweep)"
+    )
+    parser.add_argument(
+        "--min-gain",
+        type=float,
+        default=0.05,
+        help="Gain de débit minimal par palier (sweep)",
+    )
+    parser.add_argument("--output", help="Fichier JSON de résultats")
+    args = parser.parse_args()
+
+    try:
+        mix = parse_mix(args.mix)
+    except ValueError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+
+    print(f"🚀 Test de charge {args.mode} sur {args.url} (mix: {args.mix})")
+
+    if args.mode == "closed":
+        result = asyncio.run(
+            run_closed(args.url, args.concurrency, args.duration, mix, args.seed)
+        )
+    elif args.mode == "open":
+        result = asyncio.run(
+            run_open(
+                args.url, args.rps, args.duration, mix, args.seed, args.max_in_flight
+            )
+        )
+    else:
+        result = asyncio.run(
+            run_sweep(
+                args.url,
+                args.max_concurrency,
+                args.duration,
+                mix,
+                args.seed,
+                args.min_gain,
+            )
+        )
+
+    print_summary(result)
+
+    if args.output:
+        Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.output).write_text(json.dumps(result, indent=2), encoding="utf-8")
+        print(f"💾 Résultats: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Serveur LLM factice compatible OpenAI (/v1/chat/completions)
+Pour tester et mesurer le moteur hybride sans clé ni coût: latence,
+gigue et taux d'erreur configurables; réponse JSON déterministe selon le triage
+
+Usage:
+    python mock_llm_server.py --port 8090 --latency-ms 300 --jitter-ms 100 --error-rate 0.05
+
+    # Puis, pour l'API:
+    RAMQ_ENGINE=hybrid OPENAI_BASE_URL=http://localhost:8090/v1 python -m uvicorn app.main:app
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import re
+
+from fastapi import FastAPI, HTTPException, Request
+
+app = FastAPI(title="Mock LLM")
+
+# Paramètres modifiables aussi à chaud: POST /admin/config
+CONFIG = {"latency_ms": 200.0, "jitter_ms": 50.0, "error_rate": 0.0}
+
+BASE_CODES = {1: "08.48C", 2: "08.48B", 3: "08.48A", 4: "08.48A", 5: "08.48A"}
+
+
+def _answer(prompt: str) -> dict:
+    triage_match = re.search(r"Triage: P(\d)", prompt)
+    triage = int(triage_match.group(1)) if triage_match else 3
+    lowered = prompt.lower()
+
+    procedure_codes = []
+    if "suture" in lowered:
+        procedure_codes.append("15.01")
+    if "ecg" in lowered:
+        procedure_codes.append("00.44")
+
+    return {
+        "primary_code": BASE_CODES.get(triage, "08.48A"),
+        "procedure_codes": procedure_codes,
+        "reasoning": f"Réponse simulée pour triage P{triage}",
+    }
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+
+    delay = max(0.0, random.gauss(CONFIG["latency_ms"], CONFIG["jitter_ms"])) / 1000
+    await asyncio.sleep(delay)
+
+    if random.random() < CONFIG["error_rate"]:
+        raise HTTPException(status_code=503, detail="Erreur simulée")
+
+    prompt = body["messages"][-1]["content"]
+    content = json.dumps(_answer(prompt), ensure_ascii=False)
+    prompt_tokens = len(" ".join(m["content"] for m in body["messages"]).split()) * 2
+    completion_tokens = len(content.split()) * 2
+
+    return {
+        "id": "mock-completion",
+        "object": "chat.completion",
+        "model": body.get("model", "mock"),
+        "choices": [
+            {
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }
+        ],
+        "usage": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        },
+    }
+
+
+@app.post("/admin/config")
+async def update_config(values: dict):
+    """Change latence / gigue / taux d'erreur sans redémarrer (scénarios de panne)"""
+    for key in CONFIG:
+        if key in values:
+            CONFIG[key] = float(values[key])
+    return CONFIG
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Serveur LLM factice compatible OpenAI"
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--latency-ms", type=float, default=200.0)
+    parser.add_argument("--jitter-ms", type=float, default=50.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    CONFIG.update(
+        latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, error_rate=args.error_rate
+    )
+
+    import uvicorn
+
+    print(f"🤖 LLM factice sur http://{args.host}:{args.port}/v1 ({CONFIG})")
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,6 +4,10 @@ Script de test pour vérifier l'API RAMQ Billing
 
 import requests
 import json
+import os
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
 API_URL = "http://localhost:8080"
@@ -122,6 +126,67 @@ def test_statistics():
         print(f"❌ Erreur: {e}")
         return False
 
+def test_analyze_invalid_datetime():
+    """Test requêtes concurrentes dont une invalide (les autres ne doivent pas échouer)"""
+    print("\n🔍 Test 6: Analyses concurrentes, une date invalide...")
+
+    valid = {
+        "triage_level": 3,
+        "chief_complaint": "Douleur abdominale",
+        "procedures": [],
+        "duration_minutes": 30,
+        "encounter_datetime": datetime.now().isoformat()
+    }
+    invalid = {**valid, "encounter_datetime": "pas une date"}
+
+    try:
+        with ThreadPoolExecutor(max_workers=6) as pool:
+            statuses = list(pool.map(
+                lambda data: requests.post(f"{API_URL}/api/analyze", json=data).status_code,
+                [valid] * 5 + [invalid]
+            ))
+        if statuses == [200] * 5 + [422]:
+            print("✅ Cas valides: 200, cas invalide: 422")
+            return True
+        else:
+            print(f"❌ Statuts inattendus: {statuses}")
+            return False
+    except Exception as e:
+        print(f"❌ Erreur: {e}")
+        return False
+
+def test_analyze_batch_isolation():
+    """Test lot du moteur avec un cas invalide (erreur renvoyée pour ce cas seulement)"""
+    print("\n🔍 Test 7: Lot avec un cas invalide (moteur local)...")
+
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "backend"))
+    from app.core.ai_local import LocalAIEngine
+    from app.core.init_db import init_database
+
+    encounters = [
+        {"triage_level": level, "chief_complaint": "Douleur", "procedures": [],
+         "duration_minutes": 30, "encounter_datetime": "2024-11-24T23:30:00"}
+        for level in range(1, 6)
+    ]
+    encounters.insert(2, {**encounters[0], "chief_complaint": "Fracture",
+                          "encounter_datetime": "pas une date"})
+
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            db_path = os.path.join(tmp, "ramq.db")
+            init_database(db_path)
+            results = LocalAIEngine(db_path).analyze_batch(encounters)
+        errors = [i for i, result in enumerate(results) if isinstance(result, Exception)]
+        if errors == [2] and all("primary_code" in r for i, r in enumerate(results) if i != 2):
+            print("✅ Seul le cas invalide est en erreur")
+            return True
+        else:
+            print(f"❌ Cas en erreur: {errors}")
+            return False
+    except Exception as e:
+        print(f"❌ Erreur: {e}")
+        return False
+
 def run_all_tests():
     """Exécute tous les tests"""
     print("=" * 60)
@@ -143,6 +208,8 @@ def run_all_tests():
     results.append(("Analyse Complexe", test_analyze_complex()))
     results.append(("Codes RAMQ", test_get_codes()))
     results.append(("Statistiques", test_statistics()))
+    results.append(("Date invalide (concurrence)", test_analyze_invalid_datetime()))
+    results.append(("Lot avec cas invalide", test_analyze_batch_isolation()))
     
     # Résumé
     print("\n" + "=" * 60)